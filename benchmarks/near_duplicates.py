@@ -0,0 +1,104 @@
+"""
+Near-duplicate clustering on comment threads flooded by bots.
+
+Generates a thread where most comments are slightly varied copies of a few bot messages, and generates a report about
+it with near-duplicate detection enabled and disabled. The analyzers are mocked, and take a fixed time per comment (or
+sentence) they are sent, so that the report time reflects the size of the analyzer requests.
+
+Usage: python benchmarks/near_duplicates.py [--comments N] [--flood-ratio R] [--delay-per-item SECONDS]
+"""
+import argparse
+import logging
+import random
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from comment_reporter.comment_report_nlg_service import CommentReportNlgService  # noqa: E402
+from comment_reporter.config import get_config  # noqa: E402
+from comment_reporter.resources.comment_batch import CommentBatch  # noqa: E402
+from tests.mocks import FakeAnalyzers, mocked_analyzers, synthetic_comments  # noqa: E402
+
+BOT_MESSAGES = [
+    "Vote for the only candidate who cares about this town. Share this message with everyone you know!",
+    "This article is fake news paid for by the opposition. Do not believe a word of it.",
+    "Earn money from home in just a few hours a day, visit our site today and see how easy it is.",
+    "The referee was bought, everyone who watched the game knows it. Demand a replay now.",
+]
+
+
+def flooded_thread(count: int, flood_ratio: float, seed: int = 0) -> List[str]:
+    """
+    Comments of which `flood_ratio` are copies of the BOT_MESSAGES, most of them with small changes.
+    """
+    rng = random.Random(seed)
+    flood_count = int(count * flood_ratio)
+    comments = synthetic_comments(count - flood_count, seed=seed)
+    for _ in range(flood_count):
+        words = rng.choice(BOT_MESSAGES).split()
+        change = rng.random()
+        if change < 0.3:
+            words.append(rng.choice(["!!", "#truth", "Wake up.", str(rng.randint(1, 999))]))
+        elif change < 0.6:
+            idx = rng.randrange(len(words))
+            words[idx] = words[idx].upper()
+        elif change < 0.8:
+            del words[rng.randrange(len(words))]
+        comments.append(" ".join(words))
+    rng.shuffle(comments)
+    return comments
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure near-duplicate clustering on flood-heavy comment threads.")
+    parser.add_argument("--comments", type=int, default=5000, help="amount of comments in the thread")
+    parser.add_argument("--flood-ratio", type=float, default=0.8, help="fraction of the comments posted by bots")
+    parser.add_argument(
+        "--delay-per-item", type=float, default=0.0005, help="seconds the analyzers take per comment or sentence"
+    )
+    args = parser.parse_args()
+
+    logging.getLogger("root").setLevel(logging.ERROR)
+    comments = flooded_thread(args.comments, args.flood_ratio)
+    print("{} comments, {} unique, {:.0%} posted by bots".format(len(comments), len(set(comments)), args.flood_ratio))
+
+    for enabled in ("false", "true"):
+        analyzers = FakeAnalyzers(delay_per_item=args.delay_per_item)
+        # The analysis cache is disabled, so that both runs query the analyzers for every comment
+        overrides = {"NEAR_DUPLICATES__ENABLED": enabled, "CACHE__ENABLED": "false"}
+        with mocked_analyzers(analyzers, config_overrides=overrides):
+            start = time.perf_counter()
+            clusters = CommentBatch(comments).near_duplicate_clusters()
+            clustering_time = time.perf_counter() - start
+
+            service = CommentReportNlgService(random_seed=1)
+            start = time.perf_counter()
+            report = service.run_pipeline("en", comments, "hr")
+            report_time = time.perf_counter() - start
+            threshold = get_config().near_duplicates.threshold
+
+        items_sent = defaultdict(int)
+        for url, items in analyzers.calls:
+            items_sent[url] += items
+
+        print()
+        print("Near-duplicate detection {}".format("enabled" if enabled == "true" else "disabled"))
+        if enabled == "true":
+            print(
+                "  {} clusters at threshold {}, clustered in {:.3f}s".format(len(clusters), threshold, clustering_time)
+            )
+        print(
+            "  Report generated in {:.3f}s, {} items saved, errors: {}".format(
+                report_time, report.analyzer_items_saved, report.errors or "none"
+            )
+        )
+        for url, items in sorted(items_sent.items()):
+            print("  {:>7} items sent to {}".format(items, url))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Per-request pipeline setup cost.
+
+Before the pipelines were prebuilt, every run_pipeline() call built a body and a headline pipeline out of new instances
+of all components, including a MorphologicalRealizer with new Finnish and English realizers checking for their
+UralicNLP models. That setup is reproduced here and compared to looking up the prebuilt pipelines with _get_pipeline().
+
+The analyzers are mocked. So are the UralicNLP models, unless --real-models is given.
+
+Usage: python benchmarks/pipeline_setup.py [--requests N] [--real-models]
+"""
+import argparse
+import logging
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Iterable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from comment_reporter.comment_report_document_planner import (  # noqa: E402
+    CommentReportBodyDocumentPlanner,
+    CommentReportHeadlineDocumentPlanner,
+)
+from comment_reporter.comment_report_importance_allocator import CommentReportImportanceSelector  # noqa: E402
+from comment_reporter.comment_report_message_generator import CommentReportMessageGenerator  # noqa: E402
+from comment_reporter.comment_report_nlg_service import CommentReportNlgService  # noqa: E402
+from comment_reporter.core.aggregator import Aggregator  # noqa: E402
+from comment_reporter.core.morphological_realizer import MorphologicalRealizer  # noqa: E402
+from comment_reporter.core.pipeline import NLGPipeline, NLGPipelineComponent  # noqa: E402
+from comment_reporter.core.realize_slots import SlotRealizer  # noqa: E402
+from comment_reporter.core.surface_realizer import (  # noqa: E402
+    BodyHTMLSurfaceRealizer,
+    HeadlineHTMLSurfaceRealizer,
+)
+from comment_reporter.core.template_selector import TemplateSelector  # noqa: E402
+from comment_reporter.english_uralicNLP_morphological_realizer import (  # noqa: E402
+    EnglishUralicNLPMorphologicalRealizer,
+)
+from comment_reporter.finnish_uralicNLP_morphological_realizer import (  # noqa: E402
+    FinnishUralicNLPMorphologicalRealizer,
+)
+from tests.mocks import mocked_analyzers, synthetic_comments  # noqa: E402
+
+
+def per_request_components(type: str) -> Iterable[NLGPipelineComponent]:
+    """
+    The components as they used to be created for every request.
+    """
+    yield CommentReportMessageGenerator()
+    yield CommentReportImportanceSelector()
+    yield CommentReportHeadlineDocumentPlanner() if type == "headline" else CommentReportBodyDocumentPlanner()
+    yield TemplateSelector()
+    yield Aggregator()
+    yield SlotRealizer()
+    morphological_realizer = MorphologicalRealizer(
+        {"fi": FinnishUralicNLPMorphologicalRealizer(), "en": EnglishUralicNLPMorphologicalRealizer()}
+    )
+    morphological_realizer.preload()
+    yield morphological_realizer
+    yield HeadlineHTMLSurfaceRealizer() if type == "headline" else BodyHTMLSurfaceRealizer()
+
+
+def measure(function: Callable[[], object], repeats: int) -> List[float]:
+    durations = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def report(name: str, durations: List[float]) -> None:
+    print(
+        "{:<40} mean {:>10.1f} µs   median {:>10.1f} µs".format(
+            name, statistics.mean(durations) * 1e6, statistics.median(durations) * 1e6
+        )
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure the per-request pipeline setup cost.")
+    parser.add_argument("--requests", type=int, default=200, help="amount of requests to measure")
+    parser.add_argument("--real-models", action="store_true", help="use the installed UralicNLP models")
+    args = parser.parse_args()
+
+    logging.getLogger("root").setLevel(logging.WARNING)
+
+    with mocked_analyzers(mock_morphology=not args.real_models):
+        start = time.perf_counter()
+        service = CommentReportNlgService(random_seed=1)
+        print("Service construction (once): {:.3f}s".format(time.perf_counter() - start))
+
+        def setup_before() -> None:
+            for type in ("body", "headline"):
+                NLGPipeline(service.registry, *per_request_components(type), name=type)
+
+        def setup_after() -> None:
+            for type in ("body", "headline"):
+                service._get_pipeline(type, "en")
+
+        comments = synthetic_comments(50)
+
+        report("Per-request setup, built per request", measure(setup_before, args.requests))
+        report("Per-request setup, prebuilt", measure(setup_after, args.requests))
+        report("Whole run_pipeline(), prebuilt", measure(lambda: service.run_pipeline("en", comments, None), 20))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Memory used by the document plan.
+
+A synthetic document plan is built of messages, each with a template of literals and slots, like the templates
+selected for a report, and the memory allocated for it is measured with tracemalloc.
+
+Usage: python benchmarks/plan_memory.py [--messages N]
+"""
+import argparse
+import sys
+import tracemalloc
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from comment_reporter.core.models import (  # noqa: E402
+    DocumentPlanNode,
+    Fact,
+    FactFieldSource,
+    Literal,
+    Message,
+    Slot,
+    Template,
+)
+
+
+def build_plan(message_count: int) -> DocumentPlanNode:
+    source = FactFieldSource("value")
+    paragraphs: List[DocumentPlanNode] = []
+    for idx in range(message_count):
+        message = Message(Fact(idx, "stats:count", 1.0))
+        message.template = Template([Literal("There"), Slot(source), Literal("were"), Slot(source)], [])
+        paragraphs.append(DocumentPlanNode([message]))
+    return DocumentPlanNode(paragraphs)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure the memory used by a document plan.")
+    parser.add_argument("--messages", type=int, default=20000, help="amount of messages in the document plan")
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    document_plan = build_plan(args.messages)
+    after, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    message = document_plan.children[0].children[0]
+    with_dict = [
+        type(obj).__name__
+        for obj in [document_plan, message, message.template] + list(message.template.components)
+        if hasattr(obj, "__dict__")
+    ]
+    print("{} messages: {:.0f} bytes per message".format(args.messages, (after - before) / args.messages))
+    print("Objects with a __dict__: {}".format(", ".join(sorted(set(with_dict))) or "none"))
+
+
+if __name__ == "__main__":
+    main()
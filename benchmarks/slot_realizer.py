@@ -0,0 +1,80 @@
+"""
+Slot realization time as the document plan grows.
+
+Document plans of an increasing amount of messages are realized by the SlotRealizer, which goes through the slots once
+from a worklist, and by the cascading realizer it replaced, which walks the whole document plan again after every walk
+that realized a slot. The time per slot should stay flat for the former.
+
+Usage: python benchmarks/slot_realizer.py [--messages N [N ...]] [--repeats N]
+"""
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from comment_reporter.core.models import Slot  # noqa: E402
+from comment_reporter.core.realize_slots import SlotRealizer  # noqa: E402
+from tests.test_realize_slots import CascadingSlotRealizer, build_plan, render  # noqa: E402
+
+
+def measure(slot_realizer, message_count: int, repeats: int) -> float:
+    total = 0.0
+    for repeat in range(repeats):
+        registry, document_plan = build_plan(repeat, message_count)
+        random = np.random.default_rng(repeat)
+        start = time.perf_counter()
+        slot_realizer.run(registry, random, "en", document_plan)
+        total += time.perf_counter() - start
+    return total / repeats
+
+
+def slot_count(message_count: int) -> int:
+    _, document_plan = build_plan(0, message_count)
+    return sum(
+        isinstance(component, Slot)
+        for node in document_plan.children
+        for message in node.children
+        for component in message.children
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure slot realization time.")
+    parser.add_argument("--messages", type=int, nargs="+", default=[50, 100, 200, 400], help="document plan sizes")
+    parser.add_argument("--repeats", type=int, default=3, help="amount of document plans to realize per size")
+    args = parser.parse_args()
+
+    logging.getLogger("root").setLevel(logging.ERROR)
+
+    for message_count in args.messages:
+        outputs = []
+        for slot_realizer in (CascadingSlotRealizer(), SlotRealizer()):
+            registry, document_plan = build_plan(0, message_count)
+            slot_realizer.run(registry, np.random.default_rng(0), "en", document_plan)
+            outputs.append(render(document_plan))
+        if outputs[0] != outputs[1]:
+            raise AssertionError("The realizers produced different output for {} messages".format(message_count))
+
+    print(
+        "{:>8} {:>8} {:>14} {:>14} {:>14} {:>14}".format(
+            "messages", "slots", "cascading ms", "us/slot", "worklist ms", "us/slot"
+        )
+    )
+    for message_count in args.messages:
+        slots = slot_count(message_count)
+        cascading = measure(CascadingSlotRealizer(), message_count, args.repeats)
+        worklist = measure(SlotRealizer(), message_count, args.repeats)
+        print(
+            "{:>8} {:>8} {:>14.2f} {:>14.2f} {:>14.2f} {:>14.2f}".format(
+                message_count, slots, cascading * 1000, cascading / slots * 1e6, worklist * 1000, worklist / slots * 1e6
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
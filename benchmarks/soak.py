@@ -0,0 +1,116 @@
+"""
+Soak test of a single service instance serving concurrent requests.
+
+Runs run_pipeline() from several threads at once against mocked analyzers, and checks that neither the shared registry,
+the resident memory nor the latency grows with the amount of requests served. Before the registry was made per-request,
+every realized slot appended a NumberRealizer to the shared "slot-realizers" list, so each request was slower than the
+last.
+
+The comments are drawn from a fixed set of reports, so that the analysis caches fill up during the warm-up.
+
+Usage: python benchmarks/soak.py [--requests N] [--threads N] [--windows N]
+
+The default of 10000 requests takes a couple of minutes. Use --requests 100000 for a proper soak.
+
+Exits with a non-zero status if the service did not stay flat.
+"""
+import argparse
+import logging
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from comment_reporter.comment_report_nlg_service import CommentReportNlgService  # noqa: E402
+from comment_reporter.metrics import _resident_memory_bytes  # noqa: E402
+from tests.mocks import mocked_analyzers, synthetic_comments  # noqa: E402
+
+# Latency of the last window may be at most this many times that of the first window after the warm-up
+MAX_LATENCY_GROWTH = 1.5
+# Resident memory may grow at most this many bytes after the warm-up
+MAX_RSS_GROWTH = 32 * 1024 * 1024
+
+
+def registry_sizes(service: CommentReportNlgService) -> Dict[str, int]:
+    return {name: len(service.registry.get(name)) for name in ("message-parsers", "slot-realizers", "templates")}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Soak test a shared service instance.")
+    parser.add_argument("--requests", type=int, default=10000, help="amount of requests to serve")
+    parser.add_argument("--threads", type=int, default=8, help="amount of requests served at the same time")
+    parser.add_argument("--windows", type=int, default=10, help="amount of windows to report the requests in")
+    parser.add_argument("--reports", type=int, default=50, help="amount of different reports requested")
+    args = parser.parse_args()
+
+    logging.getLogger("root").setLevel(logging.ERROR)
+
+    reports = [synthetic_comments(30, seed=seed) for seed in range(args.reports)]
+    window_size = max(1, args.requests // args.windows)
+
+    with mocked_analyzers() as analyzers:
+        service = CommentReportNlgService(random_seed=1)
+        initial_sizes = registry_sizes(service)
+        expected = {}
+
+        failures: List[str] = []
+        failures_lock = threading.Lock()
+
+        def serve(request_idx: int) -> float:
+            comments_idx = request_idx % len(reports)
+            start = time.perf_counter()
+            report = service.run_pipeline("en", reports[comments_idx], None)
+            duration = time.perf_counter() - start
+            # Every request for the same comments must get the same report
+            previous = expected.setdefault(comments_idx, report.body)
+            if report.errors or report.body != previous:
+                with failures_lock:
+                    failures.append("Request {}: {}".format(request_idx, report.errors or "different report"))
+            return duration
+
+        # Warm-up: fills the caches and lets the memory usage settle
+        with ThreadPoolExecutor(max_workers=args.threads) as executor:
+            list(executor.map(serve, range(len(reports) * 2)))
+
+        windows: List[Tuple[float, float, int]] = []
+        print("{:>10} {:>14} {:>14} {:>12}".format("requests", "mean latency", "p99 latency", "RSS MiB"))
+        with ThreadPoolExecutor(max_workers=args.threads) as executor:
+            for window in range(args.windows):
+                first = window * window_size
+                durations = sorted(executor.map(serve, range(first, first + window_size)))
+                # The fake analyzers' own record of the requests would otherwise grow for as long as the test runs
+                analyzers.calls.clear()
+                rss = _resident_memory_bytes() or 0
+                mean, p99 = statistics.mean(durations), durations[int(len(durations) * 0.99) - 1]
+                windows.append((mean, p99, rss))
+                print(
+                    "{:>10} {:>12.2f}ms {:>12.2f}ms {:>12.1f}".format(
+                        first + window_size, mean * 1000, p99 * 1000, rss / 1024 / 1024
+                    )
+                )
+
+        final_sizes = registry_sizes(service)
+
+    if final_sizes != initial_sizes:
+        failures.append("Registry grew from {} to {}".format(initial_sizes, final_sizes))
+    if windows[-1][0] > windows[0][0] * MAX_LATENCY_GROWTH:
+        failures.append(
+            "Mean latency grew from {:.2f}ms to {:.2f}ms".format(windows[0][0] * 1000, windows[-1][0] * 1000)
+        )
+    if windows[0][2] and windows[-1][2] - windows[0][2] > MAX_RSS_GROWTH:
+        failures.append("RSS grew by {:.1f} MiB".format((windows[-1][2] - windows[0][2]) / 1024 / 1024))
+
+    for failure in failures[:20]:
+        print("FAIL:", failure)
+    if failures:
+        sys.exit(1)
+    print("Registry sizes stayed at {}".format(final_sizes))
+
+
+if __name__ == "__main__":
+    main()
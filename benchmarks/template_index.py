@@ -0,0 +1,92 @@
+"""
+Template candidate lookup with and without the TemplateIndex.
+
+The bundled templates are multiplied by --scale, each copy with value_types of its own, as if that many more resources
+were loaded. The templates for the messages of a report are then looked up by scanning all the templates, as
+TemplateMessageChecker used to do, and through the TemplateIndex.
+
+Usage: python benchmarks/template_index.py [--scale N] [--comments N] [--repeats N]
+"""
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Callable, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from comment_reporter.comment_report_nlg_service import CommentReportNlgService  # noqa: E402
+from comment_reporter.core.models import Template  # noqa: E402
+from comment_reporter.core.template_reader import read_templates  # noqa: E402
+from comment_reporter.core.template_selector import TemplateIndex, TemplateMessageChecker  # noqa: E402
+from tests.mocks import mocked_analyzers, synthetic_comments  # noqa: E402
+
+
+def scaled_templates(service: CommentReportNlgService, scale: int) -> List[Template]:
+    """
+    The bundled English templates, with `scale` - 1 additional copies whose value_types are prefixed with "copy<n>-".
+    """
+    templates: List[Template] = []
+    for copy in range(scale):
+        for resource in service.processor_resources:
+            source = resource.templates_string()
+            if copy:
+                source = source.replace("value_type = ", "value_type = copy{}-".format(copy))
+            templates.extend(read_templates(source)[0].get("en", []))
+    return templates
+
+
+def measure(function: Callable[[], object], repeats: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeats):
+        function()
+    return (time.perf_counter() - start) / repeats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Measure template candidate lookup.")
+    parser.add_argument("--scale", type=int, default=10, help="how many times the bundled templates to load")
+    parser.add_argument("--comments", type=int, default=100, help="amount of comments to generate messages from")
+    parser.add_argument("--repeats", type=int, default=20, help="amount of times to look up the templates")
+    args = parser.parse_args()
+
+    logging.getLogger("root").setLevel(logging.ERROR)
+
+    with mocked_analyzers():
+        service = CommentReportNlgService(random_seed=1)
+        (messages,) = service._analysis_pipeline.run(
+            (synthetic_comments(args.comments), "hr"), "en", prng_seed=1, registry=service.registry.child()
+        )
+    templates = scaled_templates(service, args.scale)
+    print("{} templates, {} messages".format(len(templates), len(messages)))
+
+    def full_scan() -> List[List[Template]]:
+        return [[t for t in templates if t.check(message, messages)] for message in messages]
+
+    index_start = time.perf_counter()
+    index = TemplateIndex(templates)
+    index_time = time.perf_counter() - index_start
+
+    def indexed_lookup() -> List[List[Template]]:
+        checker = TemplateMessageChecker(index, messages)
+        return [list(checker.all_templates_for_message(message)) for message in messages]
+
+    if full_scan() != indexed_lookup():
+        raise AssertionError("The index found different templates than the full scan")
+
+    scan_time = measure(full_scan, args.repeats)
+    indexed_time = measure(indexed_lookup, args.repeats)
+    candidates = sum(len(index.candidates(message.main_fact.value_type)) for message in messages)
+    print("Indexing the templates (once): {:.2f} ms".format(index_time * 1000))
+    print(
+        "Full scan:    {:8.3f} ms per report, {} templates checked".format(
+            scan_time * 1000, len(templates) * len(messages)
+        )
+    )
+    print("Indexed:      {:8.3f} ms per report, {} templates checked".format(indexed_time * 1000, candidates))
+    print("Speedup:      {:8.1f}x".format(scan_time / indexed_time))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,12 @@
 import logging
 from typing import List, Optional, Tuple
 
-from .core.document_planner import BodyDocumentPlanner, HeadlineDocumentPlanner
+from .core.document_planner import (
+    AvailableMessages,
+    BodyDocumentPlanner,
+    HeadlineDocumentPlanner,
+    value_type_prefix,
+)
 from .core.models import Message
 
 log = logging.getLogger("root")
@@ -22,36 +27,34 @@ class CommentReportBodyDocumentPlanner(BodyDocumentPlanner):
         super().__init__(new_paragraph_absolute_threshold=NEW_PARAGRAPH_ABSOLUTE_THRESHOLD)
 
     def select_next_nucleus(
-        self, available_message: List[Message], selected_nuclei: List[Message]
+        self, available_messages: AvailableMessages, selected_nuclei: List[Message]
     ) -> Tuple[Message, float]:
-        return _select_next_nucleus(available_message, selected_nuclei)
+        return _select_next_nucleus(available_messages, selected_nuclei)
 
     def new_paragraph_relative_threshold(self, selected_nuclei: List[Message]) -> float:
         return _new_paragraph_relative_threshold(selected_nuclei)
 
-    def select_satellites_for_nucleus(self, nucleus: Message, available_messages: List[Message]) -> List[Message]:
+    def select_satellites_for_nucleus(self, nucleus: Message, available_messages: AvailableMessages) -> List[Message]:
         return _select_satellites_for_nucleus(nucleus, available_messages)
 
 
 class CommentReportHeadlineDocumentPlanner(HeadlineDocumentPlanner):
     def select_next_nucleus(
-        self, available_message: List[Message], selected_nuclei: List[Message]
+        self, available_messages: AvailableMessages, selected_nuclei: List[Message]
     ) -> Tuple[Message, float]:
-        return _select_next_nucleus(available_message, selected_nuclei)
+        return _select_next_nucleus(available_messages, selected_nuclei)
 
 
 def _select_next_nucleus(
-    available_messages: List[Message], selected_nuclei: List[Message]
+    available_messages: AvailableMessages, selected_nuclei: List[Message]
 ) -> Tuple[Optional[Message], float]:
 
     log.debug("Starting a new paragraph")
 
-    available_messages.sort(key=lambda message: message.score, reverse=True)
-
-    if not available_messages:
+    next_nucleus = available_messages.best()
+    if next_nucleus is None:
         return None, 0
 
-    next_nucleus = available_messages[0]
     log.debug(
         "Most interesting thing is {} (int={}), selecting it as a nucleus".format(next_nucleus, next_nucleus.score)
     )
@@ -63,24 +66,16 @@ def _new_paragraph_relative_threshold(selected_nuclei: List[Message]) -> float:
     return float("-inf")
 
 
-def _select_satellites_for_nucleus(nucleus: Message, available_messages: List[Message]) -> List[Message]:
+def _select_satellites_for_nucleus(nucleus: Message, available_messages: AvailableMessages) -> List[Message]:
     log.debug("Selecting satellites for {} from among {} options".format(nucleus, len(available_messages)))
+    if not available_messages:
+        return []
+
+    # All remaining messages on the same topic as the nucleus are included, most interesting first
     satellites: List[Message] = []
-    available_messages = available_messages[:]  # Copy, s.t. we can modify in place
-
-    while True:
-        scored_available = [
-            (message.score, message)
-            for message in available_messages
-            if message.score > 0
-            and message.main_fact.value_type.split(":")[0] == nucleus.main_fact.value_type.split(":")[0]
-        ]
-        scored_available.sort(key=lambda pair: pair[0], reverse=True)
-
-        if not scored_available:
-            return satellites
-
-        score, selected_satellite = scored_available[0]
-        satellites.append(selected_satellite)
-        log.debug("Added satellite {} (temp_score={})".format(selected_satellite, score))
-        available_messages = [message for message in available_messages if message != selected_satellite]
+    for satellite in available_messages.with_prefix(value_type_prefix(nucleus)):
+        if satellite.score <= 0:
+            break
+        satellites.append(satellite)
+        log.debug("Added satellite {} (temp_score={})".format(satellite, satellite.score))
+    return satellites
@@ -1,38 +1,71 @@
 import logging
-from typing import Callable, List, Tuple
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Callable, Iterator, List, Optional, Tuple
 
 from numpy.random import Generator
 
 from .core.message_generator import NoMessagesForSelectionException
 from .core.models import Message
 from .core.pipeline import NLGPipelineComponent, Registry
+from .core.timings import Timings, current_timings, timings_scope
+from .resources.comment_batch import CommentBatch
+from .resources.http_client import AnalyzerUnavailableError, deadline_scope
 
 log = logging.getLogger("root")
 
+MessageParser = Callable[[str, List[str]], List[Message]]
+
 
 class CommentReportMessageGenerator(NLGPipelineComponent):
+    def __init__(self, concurrent: bool = True, max_workers: Optional[int] = None) -> None:
+        """
+        :param concurrent: if True, all message parsers are run in parallel in a thread pool. Otherwise they are ran
+            one after another.
+        :param max_workers: upper limit on the amount of parsers ran at the same time. Defaults to the amount of
+            registered parsers.
+        """
+        self.concurrent = concurrent
+        self.max_workers = max_workers
+
     def run(
         self, registry: Registry, random: Generator, output_language: str, comments: List[str], comment_language: str
     ) -> Tuple[List[Message]]:
         """
         Run this pipeline component.
+
+        If a "deadline" (a time.monotonic() timestamp) is registered, parsers that have not finished by then, or that
+        fail because their analyzer is unavailable, are left out. Their names are listed in the registered
+        "omitted-sections" list.
         """
-        message_parsers: List[Callable[[str, List[str]], List[Message]]] = registry.get("message-parsers")
+        message_parsers: List[MessageParser] = registry.get("message-parsers")
+        deadline: Optional[float] = registry.get("deadline") if "deadline" in registry else None
+        omitted: List[str] = registry.get("omitted-sections") if "omitted-sections" in registry else []
+
+        # Collapse exact duplicates, so that each distinct comment is only analyzed once. The batch is registered so
+        # that the amount of saved analyzer work can be reported once the pipeline has finished.
+        comments = CommentBatch(comments)
+        log.info("{} of {} comments are duplicates".format(comments.duplicate_count, len(comments)))
+        registry.register("comment-batch", comments)
+
+        timings = current_timings()
+        if self.concurrent and len(message_parsers) > 1:
+            parser_outputs = self._run_parsers_concurrently(
+                message_parsers, comment_language, comments, deadline, omitted, timings
+            )
+        else:
+            parser_outputs = self._run_parsers_sequentially(
+                message_parsers, comment_language, comments, deadline, omitted, timings
+            )
 
         messages: List[Message] = []
         generation_succeeded = False
-        for message_parser in message_parsers:
-            log.debug(f"Trying parser {message_parser}")
-            try:
-                new_messages = message_parser(comment_language, comments)
-                for message in new_messages:
-                    log.debug("Parsed message {}".format(message))
-                if new_messages:
-                    generation_succeeded = True
-                    messages.extend(new_messages)
-            except Exception as ex:
-                log.error("Message parser crashed: {}".format(ex), exc_info=True)
-                raise
+        for new_messages in parser_outputs:
+            for message in new_messages:
+                log.debug("Parsed message {}".format(message))
+            if new_messages:
+                generation_succeeded = True
+                messages.extend(new_messages)
 
         if not generation_succeeded:
             log.error("Failed to parse any Message from input")
@@ -51,3 +84,86 @@ class CommentReportMessageGenerator(NLGPipelineComponent):
             raise NoMessagesForSelectionException()
 
         return (messages,)
+
+    def _run_parsers_sequentially(
+        self,
+        message_parsers: List[MessageParser],
+        language: str,
+        comments: List[str],
+        deadline: Optional[float],
+        omitted: List[str],
+        timings: Optional[Timings],
+    ) -> Iterator[List[Message]]:
+        for message_parser in message_parsers:
+            try:
+                yield self._run_parser(message_parser, language, comments, deadline, timings)
+            except AnalyzerUnavailableError as ex:
+                _omit(omitted, message_parser, ex)
+
+    def _run_parsers_concurrently(
+        self,
+        message_parsers: List[MessageParser],
+        language: str,
+        comments: List[str],
+        deadline: Optional[float],
+        omitted: List[str],
+        timings: Optional[Timings],
+    ) -> List[List[Message]]:
+        max_workers = self.max_workers or len(message_parsers)
+        executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="message-parser")
+        try:
+            futures: List[Future] = [
+                executor.submit(self._run_parser, message_parser, language, comments, deadline, timings)
+                for message_parser in message_parsers
+            ]
+            done, _ = wait(futures, timeout=None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+            # Results are collected in registration order, rather than in order of completion, so that the output is
+            # deterministic regardless of which analyzer happens to respond first. Omitted parsers are only recorded
+            # here, in the requesting thread: whatever a parser does after the deadline is ignored.
+            outputs: List[List[Message]] = []
+            for message_parser, future in zip(message_parsers, futures):
+                if future not in done:
+                    future.cancel()
+                    log.error("Message parser {} did not finish before the deadline".format(message_parser))
+                    omitted.append("{} (deadline exceeded)".format(_parser_name(message_parser)))
+                elif isinstance(future.exception(), AnalyzerUnavailableError):
+                    _omit(omitted, message_parser, future.exception())
+                else:
+                    outputs.append(future.result())
+            return outputs
+        finally:
+            # Don't wait for parsers that missed the deadline. Their requests are limited by the same deadline, so the
+            # threads finish shortly anyway.
+            executor.shutdown(wait=False)
+
+    @staticmethod
+    def _run_parser(
+        message_parser: MessageParser,
+        language: str,
+        comments: List[str],
+        deadline: Optional[float],
+        timings: Optional[Timings],
+    ) -> List[Message]:
+        log.debug(f"Trying parser {message_parser}")
+        try:
+            with deadline_scope(deadline), timings_scope(timings):
+                return message_parser(language, comments)
+        except AnalyzerUnavailableError:
+            raise
+        except Exception as ex:
+            log.error("Message parser crashed: {}".format(ex), exc_info=True)
+            raise
+
+
+def _omit(omitted: List[str], message_parser: MessageParser, ex: AnalyzerUnavailableError) -> None:
+    log.error("Message parser {} omitted: {}".format(message_parser, ex))
+    omitted.append("{} ({})".format(_parser_name(message_parser), ex))
+
+
+def _parser_name(message_parser: MessageParser) -> str:
+    # Message parsers are usually bound methods of resources, so we name them after the resource
+    owner = getattr(message_parser, "__self__", None)
+    if owner is not None:
+        return owner.__class__.__name__
+    return getattr(message_parser, "__name__", str(message_parser))
@@ -1,24 +1,29 @@
 import logging
 import random
+import time
 from collections import defaultdict
-from typing import Dict, Iterable, List, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
 
 from .resources.general_topic_modeling_resource import GeneralTopicModelingResource
 from .resources.sentiment_stats_resource import SentimentStatsResource
 from .resources.general_summary_resource import GeneralSummaryResource
 from .resources.hate_speech_stats_resource import HateSpeechResource
 from .resources.generic_stats_resource import GenericStatsResource
+from .config import get_config, resolve_path
 from .constants import CONJUNCTIONS, get_error_message
 from .core.aggregator import Aggregator
 from .core.document_planner import NoInterestingMessagesException
-from .core.models import Template
-from .core.morphological_realizer import MorphologicalRealizer
+from .core.models import Message, Template
+from .core.morphological_realizer import MorphologicalRealizer, MorphologyCache
 from .core.pipeline import NLGPipeline, NLGPipelineComponent
 from .core.realize_slots import SlotRealizer
 from .core.registry import Registry
 from .core.surface_realizer import BodyHTMLSurfaceRealizer, HeadlineHTMLSurfaceRealizer
+from .core import template_cache
 from .core.template_reader import read_templates
-from .core.template_selector import TemplateSelector
+from .core.template_selector import TemplateIndex, TemplateSelector
+from .core.timings import Timings, timings_scope
 from .comment_report_document_planner import CommentReportBodyDocumentPlanner, CommentReportHeadlineDocumentPlanner
 from .comment_report_importance_allocator import CommentReportImportanceSelector
 from .comment_report_message_generator import CommentReportMessageGenerator, NoMessagesForSelectionException
@@ -29,18 +34,30 @@ from .resources.processor_resource import ProcessorResource
 log = logging.getLogger("root")
 
 
+class Report(NamedTuple):
+    body: str
+    errors: List[str]
+    # Amount of comments not sent to analyzers, as they were duplicates or near-duplicates of other comments
+    analyzer_items_saved: int = 0
+    # Only generated if requested
+    headline: Optional[str] = None
+    # Time spent on the pipeline components, resources and analyzer queries, as returned by Timings.as_dict()
+    timings: Optional[Dict[str, Any]] = None
+
+
 class CommentReportNlgService(object):
 
     processor_resources: List[ProcessorResource] = []
 
-    # These are (re)initialized every time run_pipeline is called
-    body_pipeline = None
-    headline_pipeline = None
+    PIPELINE_TYPES = ("body", "headline")
 
-    def __init__(self, random_seed: int = None) -> None:
+    def __init__(self, random_seed: int = None, force_cache_refresh: bool = False) -> None:
         """
         :param random_seed: seed for random number generation, for repeatability
+        :param force_cache_refresh: whether to parse the templates even if they are in the template cache, and rewrite
+            the cache
         """
+        init_start = time.perf_counter()
 
         # New registry and result importer
         self.registry = Registry()
@@ -55,7 +72,12 @@ class CommentReportNlgService(object):
         ]
 
         # Templates
-        self.registry.register("templates", self._load_templates())
+        templates = self._load_templates(force_cache_refresh)
+        self.registry.register("templates", templates)
+        self.registry.register(
+            "template-index",
+            {language: TemplateIndex(language_templates) for language, language_templates in templates.items()},
+        )
 
         # Misc language data
         self.registry.register("CONJUNCTIONS", CONJUNCTIONS)
@@ -66,7 +88,7 @@ class CommentReportNlgService(object):
         # Message Parsers
         self.registry.register("message-parsers", [])
         for processor_resource in self.processor_resources:
-            self.registry.get("message-parsers").append(processor_resource.generate_messages)
+            self.registry.get("message-parsers").append(processor_resource.bounded_generate_messages)
 
         # Slot Realizers Components
         self.registry.register("slot-realizers", [])
@@ -74,19 +96,87 @@ class CommentReportNlgService(object):
             components = [component(self.registry) for component in processor_resource.slot_realizer_components()]
             self.registry.get("slot-realizers").extend(components)
 
-    def _load_templates(self) -> Dict[str, List[Template]]:
+        # From here on the registry is shared by all requests, and must not be modified. Per-request state is kept in
+        # a child registry created for each run of a pipeline.
+        self.registry = self.registry.snapshot()
+
+        # Pipelines are built once and reused for every request. Analysis (message generation and importance
+        # selection) is shared by all types of outputs, so it is ran only once per request by its own pipeline. The
+        # selected messages are then realized by a separate pipeline for each type of output and language.
+        self._analysis_pipeline = NLGPipeline(self.registry, *self._get_analysis_components(), name="analysis")
+        self._morphology_cache = self._load_morphology_cache()
+        self._morphological_realizer = MorphologicalRealizer(
+            {
+                "fi": FinnishUralicNLPMorphologicalRealizer(self._morphology_cache),
+                "en": EnglishUralicNLPMorphologicalRealizer(self._morphology_cache),
+            }
+        )
+        # Load the morphology models now rather than while serving the first requests, failing if they are missing
+        self._morphological_realizer.preload()
+        self._pipelines: Dict[Tuple[str, str], NLGPipeline] = {}
+        log.info("Configuring NLG pipelines")
+        start = time.perf_counter()
+        for language in self.get_languages():
+            for pipeline_type in self.PIPELINE_TYPES:
+                self._pipelines[(pipeline_type, language)] = NLGPipeline(
+                    self.registry, *self._get_components(pipeline_type), name=pipeline_type
+                )
+        log.info("Configured {} NLG pipelines in {:.3f}s".format(len(self._pipelines), time.perf_counter() - start))
+        log.info("Initialized the NLG service in {:.3f}s".format(time.perf_counter() - init_start))
+
+    def _load_templates(self, force_cache_refresh: bool) -> Dict[str, List[Template]]:
         log.info("Loading templates")
+        start = time.perf_counter()
+        sources = [resource.templates_string() for resource in self.processor_resources]
+
+        cache_path = get_config().templates.cache_path
+        key = template_cache.cache_key(sources)
+        if cache_path and not force_cache_refresh:
+            cached_templates = template_cache.load(resolve_path(cache_path), key)
+            if cached_templates is not None:
+                log.info("Loaded templates from cache in {:.3f}s".format(time.perf_counter() - start))
+                return cached_templates
+
         templates: Dict[str, List[Template]] = defaultdict(list)
-        for resource in self.processor_resources:
-            for language, new_templates in read_templates(resource.templates_string())[0].items():
+        for source in sources:
+            for language, new_templates in read_templates(source)[0].items():
                 templates[language].extend(new_templates)
+        log.info("Parsed templates in {:.3f}s".format(time.perf_counter() - start))
+
+        if cache_path:
+            template_cache.save(resolve_path(cache_path), key, templates)
         return templates
 
     @staticmethod
-    def _get_components(type: str) -> Iterable[NLGPipelineComponent]:
+    def _load_morphology_cache() -> MorphologyCache:
+        config = get_config().morphology
+        cache = MorphologyCache(config.cache_maxsize)
+        if config.cache_path:
+            cache.load(resolve_path(config.cache_path))
+        return cache
+
+    def save_morphology_cache(self) -> None:
+        """
+        Saves the morphological realizations to the configured file, if any, to be loaded at the next startup.
+        """
+        cache_path = get_config().morphology.cache_path
+        if cache_path:
+            self._morphology_cache.save(resolve_path(cache_path))
+
+    def _get_pipeline(self, type: str, language: str) -> NLGPipeline:
+        pipeline = self._pipelines.get((type, language))
+        if pipeline is None:
+            # Not cached, as the language is not one we have templates for. The pipeline will fail with an error.
+            log.warning("No prebuilt {} pipeline for language {}".format(type, language))
+            pipeline = NLGPipeline(self.registry, *self._get_components(type), name=type)
+        return pipeline
+
+    @staticmethod
+    def _get_analysis_components() -> Iterable[NLGPipelineComponent]:
         yield CommentReportMessageGenerator()
         yield CommentReportImportanceSelector()
 
+    def _get_components(self, type: str) -> Iterable[NLGPipelineComponent]:
         if type == "headline":
             yield CommentReportHeadlineDocumentPlanner()
         else:
@@ -96,9 +186,7 @@ class CommentReportNlgService(object):
         yield Aggregator()
         yield SlotRealizer()
 
-        yield MorphologicalRealizer(
-            {"fi": FinnishUralicNLPMorphologicalRealizer(), "en": EnglishUralicNLPMorphologicalRealizer()}
-        )
+        yield self._morphological_realizer
 
         if type == "headline":
             yield HeadlineHTMLSurfaceRealizer()
@@ -106,37 +194,133 @@ class CommentReportNlgService(object):
             yield BodyHTMLSurfaceRealizer()
 
     def run_pipeline(
-        self, output_language: str, comments: List[str], comment_language: Optional[str]
-    ) -> Tuple[str, List[str]]:
-        log.info("Configuring Body NLG Pipeline")
-        self.body_pipeline = NLGPipeline(self.registry, *self._get_components("body"))
-        self.headline_pipeline = NLGPipeline(self.registry, *self._get_components("headline"))
+        self,
+        output_language: str,
+        comments: List[str],
+        comment_language: Optional[str],
+        latency_budget: Optional[float] = None,
+        headline: bool = False,
+    ) -> Report:
+        """
+        :param latency_budget: seconds the analyzers may spend on this report. Resources that don't finish in time are
+            left out of the report and listed in the errors. Defaults to the configured budget.
+        :param headline: whether to also generate a headline. The headline is realized from the same messages as the
+            body, so it does not cause any additional analyzer queries.
+        """
+        reports = self.run_pipelines([output_language], comments, comment_language, latency_budget, headline)
+        return reports[output_language]
+
+    def run_pipelines(
+        self,
+        output_languages: List[str],
+        comments: List[str],
+        comment_language: Optional[str],
+        latency_budget: Optional[float] = None,
+        headline: bool = False,
+    ) -> Dict[str, Report]:
+        """
+        Generates a report about the comments in each of the output languages. The comments are analyzed only once,
+        after which the reports are realized in parallel, one thread per language.
+
+        See run_pipeline() for the parameters.
+        """
+        # Drop duplicates, keeping the order
+        output_languages = list(dict.fromkeys(output_languages))
 
         if not comment_language:
             comment_language = "all"
 
-        errors: List[str] = []
+        if latency_budget is None:
+            latency_budget = get_config().report.latency_budget
+
+        timings = Timings()
+        registry = self.registry.child()
+        if latency_budget > 0:
+            registry.register("deadline", time.monotonic() + latency_budget)
+        omitted_sections: List[str] = []
+        registry.register("omitted-sections", omitted_sections)
+
+        analysis_errors: List[str] = []
+        messages: Optional[List[Message]] = None
+        analysis_error_identifier: Optional[str] = None
+        log.info("Running analysis NLG pipeline")
+        try:
+            # Analysis does not depend on the output language
+            with timings_scope(timings):
+                (messages,) = self._analysis_pipeline.run(
+                    (comments, comment_language),
+                    output_languages[0],
+                    prng_seed=self.registry.get("seed"),
+                    registry=registry,
+                )
+            log.info("Analysis pipeline complete")
+        except Exception as ex:
+            analysis_error_identifier = self._handle_pipeline_error(ex, analysis_errors)
+
+        def realize_report(language: str) -> Tuple[str, Optional[str], List[str]]:
+            errors: List[str] = []
+            if messages is None:
+                return get_error_message(language, analysis_error_identifier), None, errors
+            with timings_scope(timings):
+                body = self._realize("body", language, messages, registry, errors)
+                headline_text = self._realize("headline", language, messages, registry, errors) if headline else None
+            return body, headline_text, errors
+
+        if len(output_languages) > 1:
+            with ThreadPoolExecutor(max_workers=len(output_languages), thread_name_prefix="realization") as executor:
+                realized = list(executor.map(realize_report, output_languages))
+        else:
+            realized = [realize_report(language) for language in output_languages]
+
+        omitted_errors = ["OmittedSection: {}".format(section) for section in list(omitted_sections)]
+        analyzer_items_saved = registry.get("comment-batch").items_saved if "comment-batch" in registry else 0
+        timings_dict = timings.as_dict()
+        return {
+            language: Report(
+                body, analysis_errors + errors + omitted_errors, analyzer_items_saved, headline_text, timings_dict
+            )
+            for language, (body, headline_text, errors) in zip(output_languages, realized)
+        }
+
+    def _realize(self, type: str, language: str, messages: List[Message], registry: Registry, errors: List[str]) -> str:
+        """
+        Realizes the analyzed messages as text with the pipeline of the given type. Each pipeline gets its own copies
+        of the messages, as the pipelines attach templates to the messages they realize.
 
-        log.info("Running Body NLG pipeline: language={}".format(output_language))
+        Realization does not use the PRNG state consumed by analysis, so reseeding here gives the same output as
+        running all components in a single pipeline.
+        """
+        pipeline = self._get_pipeline(type, language)
+        log.info("Running {} NLG pipeline: language={}".format(type.capitalize(), language))
         try:
-            body = self.body_pipeline.run(
-                (comments, comment_language), output_language, prng_seed=self.registry.get("seed")
+            output = pipeline.run(
+                ([message.copy() for message in messages],),
+                language,
+                prng_seed=self.registry.get("seed"),
+                registry=registry,
             )
-            log.info("Body pipeline complete")
-        except NoMessagesForSelectionException as ex:
+            log.info("{} pipeline complete".format(type.capitalize()))
+            return output
+        except Exception as ex:
+            return get_error_message(language, self._handle_pipeline_error(ex, errors))
+
+    @staticmethod
+    def _handle_pipeline_error(ex: Exception, errors: List[str]) -> str:
+        """
+        Logs an exception raised by a pipeline and records it in the errors. Returns the identifier of the error
+        message to show in place of the pipeline's output.
+        """
+        if isinstance(ex, NoMessagesForSelectionException):
             log.error("%s", ex)
-            body = get_error_message(output_language, "no-messages-for-selection")
             errors.append("NoMessagesForSelectionException")
-        except NoInterestingMessagesException as ex:
+            return "no-messages-for-selection"
+        if isinstance(ex, NoInterestingMessagesException):
             log.info("%s", ex)
-            body = get_error_message(output_language, "no-interesting-messages-for-selection")
             errors.append("NoInterestingMessagesException")
-        except Exception as ex:
-            log.exception("%s", ex)
-            body = get_error_message(output_language, "general-error")
-            errors.append("{}: {}".format(ex.__class__.__name__, str(ex)))
-
-        return body, errors
+            return "no-interesting-messages-for-selection"
+        log.exception("%s", ex)
+        errors.append("{}: {}".format(ex.__class__.__name__, str(ex)))
+        return "general-error"
 
     def _set_seed(self, seed_val: Optional[int] = None) -> None:
         log.info("Selecting seed for NLG pipeline")
@@ -147,5 +331,13 @@ class CommentReportNlgService(object):
             log.info("Using preset seed {}".format(seed_val))
         self.registry.register("seed", seed_val)
 
+    def get_cache_stats(self) -> Dict[str, Dict[str, float]]:
+        stats = {}
+        for resource in self.processor_resources:
+            resource_stats = resource.cache_stats()
+            if resource_stats is not None:
+                stats[resource.__class__.__name__] = resource_stats
+        return stats
+
     def get_languages(self) -> List[str]:
         return list(self.registry.get("templates").keys())
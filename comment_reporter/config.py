@@ -0,0 +1,221 @@
+"""
+Service configuration.
+
+The configuration is read from config.ini once, and then cached. Any value in the file can be overridden with an
+environment variable named COMMENT_REPORTER__<SECTION>__<KEY>, e.g. COMMENT_REPORTER__HATESPEECH__ALL. Variables for
+sections or keys not present in the file add new values.
+
+If watching is enabled in the [CONFIG] section, the file's modification time is checked at most once every
+watch_interval seconds and the configuration is reloaded when the file has changed.
+"""
+import configparser
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Mapping, NamedTuple, Optional, Type, TypeVar
+
+log = logging.getLogger("root")
+
+# Relative paths in the configuration are relative to the repository root, where config.ini is
+ROOT_PATH = Path(__file__).parent / ".."
+DEFAULT_CONFIG_PATH = ROOT_PATH / "config.ini"
+ENVIRONMENT_PREFIX = "COMMENT_REPORTER__"
+TRUE_VALUES = ("1", "true", "yes", "on")
+
+
+class ConfigurationError(Exception):
+    pass
+
+
+class HttpConfig(NamedTuple):
+    connect_timeout: float = 3.05
+    read_timeout: float = 60.0
+    retries: int = 2
+    backoff_factor: float = 0.5
+    pool_connections: int = 10
+    pool_maxsize: int = 10
+    max_in_flight: int = 8
+    circuit_failure_threshold: int = 5
+    circuit_reset_timeout: float = 30.0
+
+
+class ReportConfig(NamedTuple):
+    # Seconds the analyzers may take in total to generate the messages of a single report. Resources that do not
+    # finish in time are left out of the report. Zero means no limit.
+    latency_budget: float = 30.0
+
+
+class CacheConfig(NamedTuple):
+    enabled: bool = True
+    maxsize: int = 100000
+    ttl: float = 3600.0
+
+
+class TemplatesConfig(NamedTuple):
+    # File the parsed templates are cached in, see resolve_path(). Empty means no caching.
+    cache_path: str = "cache/templates.pickle"
+
+
+class MorphologyConfig(NamedTuple):
+    # Largest amount of morphological realizations kept in memory
+    cache_maxsize: int = 10000
+    # File the realizations are loaded from at startup and saved to at exit, see resolve_path(). Empty means no
+    # persistence.
+    cache_path: str = ""
+
+
+class ChunkingConfig(NamedTuple):
+    # Largest amount of comments sent to an analyzer in a single request, unless overridden for the analyzer. Zero
+    # means no limit.
+    default_chunk_size: int = 0
+    # Largest amount of chunks of a single analyzer call being sent at the same time
+    max_parallel_chunks: int = 4
+
+
+class NearDuplicatesConfig(NamedTuple):
+    enabled: bool = True
+    threshold: float = 0.8
+    num_perm: int = 128
+    bands: int = 16
+    shingle_size: int = 5
+
+
+T = TypeVar("T")
+
+
+class Config(object):
+    def __init__(
+        self,
+        values: Mapping[str, Mapping[str, str]],
+        path: Optional[Path] = None,
+        mtime: Optional[float] = None,
+        watch: bool = False,
+        watch_interval: float = 5.0,
+    ) -> None:
+        self._values = {group.upper(): dict(group_values) for (group, group_values) in values.items()}
+        self.path = path
+        self.mtime = mtime
+        self.watch = watch
+        self.watch_interval = watch_interval
+        self.report = self._read_section("REPORT", ReportConfig)
+        self.http = self._read_section("HTTP", HttpConfig)
+        self.cache = self._read_section("CACHE", CacheConfig)
+        self.templates = self._read_section("TEMPLATES", TemplatesConfig)
+        self.morphology = self._read_section("MORPHOLOGY", MorphologyConfig)
+        self.chunking = self._read_section("CHUNKING", ChunkingConfig)
+        self.near_duplicates = self._read_section("NEAR_DUPLICATES", NearDuplicatesConfig)
+
+    def get(self, group: str, key: str) -> Optional[str]:
+        return self._values.get(group.upper(), {}).get(key.lower())
+
+    def get_language_value(self, group: str, language: str) -> Optional[str]:
+        """
+        Returns the value for the given language, falling back to the value for "all" languages.
+        """
+        value = self.get(group, language)
+        if not value:
+            value = self.get(group, "all")
+        return value or None
+
+    def get_chunk_size(self, analyzer: str) -> int:
+        """
+        Returns the largest amount of comments to send to the analyzer configured in group `analyzer` at once.
+        """
+        value = self.get("CHUNKING", analyzer)
+        if value is None:
+            return self.chunking.default_chunk_size
+        try:
+            return int(value)
+        except ValueError:
+            raise ConfigurationError("Invalid chunk size '{}' for '{}'".format(value, analyzer))
+
+    def _read_section(self, group: str, section_type: Type[T]) -> T:
+        """
+        Reads a section into a NamedTuple, using the types of the NamedTuple's default values to parse the fields.
+        """
+        values: Dict[str, Any] = {}
+        for (field, default) in section_type._field_defaults.items():
+            value = self.get(group, field)
+            if value is None:
+                continue
+            try:
+                if isinstance(default, bool):
+                    values[field] = value.strip().lower() in TRUE_VALUES
+                else:
+                    values[field] = type(default)(value)
+            except ValueError:
+                raise ConfigurationError("Invalid value '{}' for '{}' in group '{}'".format(value, field, group))
+        return section_type(**values)
+
+
+def resolve_path(path: str) -> Path:
+    """
+    Resolves a path read from the configuration. Relative paths are relative to the repository root, rather than to the
+    working directory, so that the same files are used wherever the service is started from.
+    """
+    resolved = Path(path)
+    if not resolved.is_absolute():
+        resolved = ROOT_PATH / resolved
+    return resolved
+
+
+def load_config(path: Path = DEFAULT_CONFIG_PATH, environ: Optional[Mapping[str, str]] = None) -> Config:
+    if environ is None:
+        environ = os.environ
+
+    parser = configparser.ConfigParser()
+    mtime = None
+    if path.exists():
+        parser.read(str(path))
+        mtime = path.stat().st_mtime
+    else:
+        log.warning("Configuration file {} does not exist".format(path))
+
+    values: Dict[str, Dict[str, str]] = {section.upper(): dict(parser[section]) for section in parser.sections()}
+
+    for (variable, value) in environ.items():
+        if not variable.startswith(ENVIRONMENT_PREFIX):
+            continue
+        group, separator, key = variable[len(ENVIRONMENT_PREFIX) :].partition("__")
+        if not separator or not group or not key:
+            log.warning("Ignoring malformed configuration override {}".format(variable))
+            continue
+        values.setdefault(group.upper(), {})[key.lower()] = value
+
+    watch_values = values.get("CONFIG", {})
+    watch = watch_values.get("watch", "false").strip().lower() in TRUE_VALUES
+    watch_interval = float(watch_values.get("watch_interval", 5.0))
+
+    return Config(values, path=path, mtime=mtime, watch=watch, watch_interval=watch_interval)
+
+
+_config: Optional[Config] = None
+_config_checked_at = 0.0
+_config_lock = threading.Lock()
+
+
+def get_config() -> Config:
+    """
+    Returns the cached service configuration, loading it on first use.
+    """
+    global _config, _config_checked_at
+
+    config = _config
+    if config is not None and not config.watch:
+        return config
+
+    now = time.monotonic()
+    if config is not None and now - _config_checked_at < config.watch_interval:
+        return config
+
+    with _config_lock:
+        if _config is None:
+            log.info("Loading configuration from {}".format(DEFAULT_CONFIG_PATH))
+            _config = load_config()
+        elif _config.path is not None and _config.path.exists() and _config.path.stat().st_mtime != _config.mtime:
+            log.info("Configuration file {} changed, reloading".format(_config.path))
+            _config = load_config(_config.path)
+        _config_checked_at = now
+        return _config
@@ -0,0 +1,52 @@
+"""
+Thread-safe caches with hit and miss statistics.
+
+The caches of the service (analyzer results, morphological realizations) are shared by all requests, and thus used from
+several threads at once. cachetools' caches are not thread-safe, so every access goes through a lock.
+"""
+import threading
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+from cachetools import Cache
+
+
+class ThreadSafeCache(object):
+    """
+    A cachetools cache guarded by a lock, counting the hits and misses of lookups.
+    """
+
+    def __init__(self, cache: Cache) -> None:
+        self._cache = cache
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        return self.get_many([key])[0]
+
+    def get_many(self, keys: Iterable[Hashable]) -> List[Optional[Any]]:
+        with self._lock:
+            values = [self._cache.get(key) for key in keys]
+            hits = sum(1 for value in values if value is not None)
+            self._hits += hits
+            self._misses += len(values) - hits
+        return values
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self.set_many([(key, value)])
+
+    def set_many(self, items: Iterable[Tuple[Hashable, Any]]) -> None:
+        with self._lock:
+            for key, value in items:
+                self._cache[key] = value
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "size": len(self._cache),
+                "maxsize": self._cache.maxsize,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_ratio": self._hits / lookups if lookups else 0.0,
+            }
@@ -1,6 +1,9 @@
+import heapq
 import logging
+import sys
 from abc import abstractmethod
-from typing import List, Tuple
+from collections import defaultdict
+from typing import Dict, List, Optional, Set, Tuple
 
 from numpy.random import Generator
 
@@ -15,6 +18,74 @@ class NoInterestingMessagesException(Exception):
     pass
 
 
+def value_type_prefix(message: Message) -> str:
+    """
+    The first part of the message's value_type, e.g. "sentiment" for "sentiment:mean". Messages sharing the prefix are
+    about the same topic.
+    """
+    return sys.intern(message.main_fact.value_type.split(":")[0])
+
+
+class AvailableMessages(object):
+    """
+    The messages not yet included in a document plan, ordered by decreasing score. Messages with equal scores are kept
+    in their original order, as a stable sort by score would.
+
+    The messages are kept in a heap, and in a sorted list per value_type prefix, so that the best remaining message is
+    found in logarithmic time and the messages with a given prefix without going through all messages. Removed messages
+    are dropped from the heap and the lists lazily.
+    """
+
+    def __init__(self, messages: List[Message]) -> None:
+        self._heap: List[Tuple[float, int, Message]] = []
+        self._by_prefix: Dict[str, List[Tuple[float, int, Message]]] = defaultdict(list)
+        # Positions of the messages, by message identity
+        self._positions: Dict[int, int] = {}
+        self._removed: Set[int] = set()
+        self._remaining = len(messages)
+
+        for position, message in enumerate(messages):
+            entry = (-message.score, position, message)
+            self._heap.append(entry)
+            self._by_prefix[value_type_prefix(message)].append(entry)
+            self._positions[id(message)] = position
+        heapq.heapify(self._heap)
+        for entries in self._by_prefix.values():
+            entries.sort()
+
+    def __len__(self) -> int:
+        return self._remaining
+
+    def best(self) -> Optional[Message]:
+        """
+        The remaining message with the highest score, or None if there are no messages left.
+        """
+        return self._peek(self._heap)
+
+    def with_prefix(self, prefix: str) -> List[Message]:
+        """
+        The remaining messages with the given value_type prefix, in order.
+        """
+        entries = self._by_prefix.get(prefix)
+        if not entries:
+            return []
+        # The list stays sorted when the removed messages are dropped from it
+        entries = [entry for entry in entries if entry[1] not in self._removed]
+        self._by_prefix[prefix] = entries
+        return [message for _, _, message in entries]
+
+    def remove(self, message: Optional[Message]) -> None:
+        position = self._positions.get(id(message))
+        if position is not None and position not in self._removed:
+            self._removed.add(position)
+            self._remaining -= 1
+
+    def _peek(self, heap: List[Tuple[float, int, Message]]) -> Optional[Message]:
+        while heap and heap[0][1] in self._removed:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+
 class DocumentPlanner(NLGPipelineComponent):
     @abstractmethod
     def run(
@@ -36,7 +107,7 @@ class HeadlineDocumentPlanner(DocumentPlanner):
         # Root contains a sequence of children
         document_plan = DocumentPlanNode(children=[], relation=Relation.SEQUENCE)
 
-        headline_message, _ = self.select_next_nucleus(scored_messages, [])
+        headline_message, _ = self.select_next_nucleus(AvailableMessages(scored_messages), [])
         all_messages = scored_messages
 
         document_plan.children.append(DocumentPlanNode(children=[headline_message], relation=Relation.SEQUENCE))
@@ -45,7 +116,7 @@ class HeadlineDocumentPlanner(DocumentPlanner):
 
     @abstractmethod
     def select_next_nucleus(
-        self, available_message: List[Message], selected_nuclei: List[Message]
+        self, available_messages: AvailableMessages, selected_nuclei: List[Message]
     ) -> Tuple[Message, float]:
         raise NotImplementedError
 
@@ -62,7 +133,7 @@ class BodyDocumentPlanner(DocumentPlanner):
         # Root contains a sequence of children
         document_plan = DocumentPlanNode(children=[], relation=Relation.SEQUENCE)
 
-        available_messages = scored_messages[:]  # Make a copy s.t. we can modify in place
+        available_messages = AvailableMessages(scored_messages)
         selected_nuclei: List[Message] = []
 
         while True:
@@ -80,19 +151,20 @@ class BodyDocumentPlanner(DocumentPlanner):
             selected_nuclei.append(nucleus)
 
             # Messages are only allowed in the DP once
-            available_messages = [m for m in available_messages if m != nucleus]
+            available_messages.remove(nucleus)
 
             # Get a suitable amount of satellites
             satellites: List[Message] = self.select_satellites_for_nucleus(nucleus, available_messages)
 
             # Messages are only allowed in the DP once
-            available_messages = [m for m in available_messages if m not in satellites]
+            for satellite in satellites:
+                available_messages.remove(satellite)
 
             document_plan.children.append(DocumentPlanNode([nucleus] + satellites, Relation.SEQUENCE))
 
     @abstractmethod
     def select_next_nucleus(
-        self, available_message: List[Message], selected_nuclei: List[Message]
+        self, available_messages: AvailableMessages, selected_nuclei: List[Message]
     ) -> Tuple[Message, float]:
         raise NotImplementedError
 
@@ -101,5 +173,5 @@ class BodyDocumentPlanner(DocumentPlanner):
         raise NotImplementedError
 
     @abstractmethod
-    def select_satellites_for_nucleus(self, nucleus: Message, available_messages: List[Message]) -> List[Message]:
+    def select_satellites_for_nucleus(self, nucleus: Message, available_messages: AvailableMessages) -> List[Message]:
         raise NotImplementedError
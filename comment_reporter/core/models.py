@@ -1,10 +1,11 @@
+import heapq
 import logging
 import operator
 import re
 from abc import ABC, abstractmethod
-from collections import namedtuple
+from collections import defaultdict, namedtuple
 from enum import Enum
-from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple, Union
 
 log = logging.getLogger("root")
 
@@ -42,6 +43,10 @@ class DocumentPlanNode(object):
     A Node in the document plan. Has an ordered list of children, collectively connected by a Relation.
     """
 
+    # The document plans of all reports consist of a large amount of nodes and template components. Defining __slots__
+    # on these classes keeps them from each carrying a __dict__ of their own.
+    __slots__ = ("_children", "_relation")
+
     def __init__(
         self, children: Optional[List["DocumentPlanNode"]] = None, relation: Relation = Relation.SEQUENCE
     ) -> None:
@@ -134,6 +139,16 @@ class Message(DocumentPlanNode):
 
     """
 
+    __slots__ = (
+        "_facts",
+        "_main_fact",
+        "_template",
+        "importance_coefficient",
+        "score",
+        "polarity",
+        "prevent_aggregation",
+    )
+
     def __init__(
         self,
         facts: Union[List["Fact"], "Fact"],
@@ -187,6 +202,16 @@ class Message(DocumentPlanNode):
         else:
             return []
 
+    def copy(self) -> "Message":
+        """
+        Makes a copy of this Message that can be planned and realized independently of the original, e.g. when the
+        same messages are realized as both a headline and a body. The copy does not contain a template.
+        """
+        message = Message(list(self._facts), self.importance_coefficient, self.score, self.polarity)
+        message._main_fact = self._main_fact
+        message.prevent_aggregation = self.prevent_aggregation
+        return message
+
     def __repr__(self) -> str:
         if self.template:
             return "<Message: " + self.template.__repr__() + ">"
@@ -209,21 +234,35 @@ class Template(DocumentPlanNode):
     using the template.
     """
 
+    __slots__ = ("_rules", "_compiled_rules", "_facts", "_slot_map", "_components", "_variant_count", "_slots")
+
     def __init__(
         self,
         components: List["TemplateComponent"],
         rules: Optional[List[Tuple[List["Matcher"], List[int]]]] = None,
         slot_map: Optional[Dict[str, "Slot"]] = None,
+        compiled_rules: Optional[List["CompiledRule"]] = None,
     ) -> None:
+        """
+        :param compiled_rules: the matchers of each rule compiled with compile_rule(). Compiled here if not given.
+        """
 
         super().__init__()
 
         self._rules = rules if rules is not None else []
+        if compiled_rules is None:
+            compiled_rules = [compile_rule(matchers) for (matchers, _) in self._rules]
+        self._compiled_rules = compiled_rules
         self._facts = []
         self._slot_map = slot_map if slot_map is not None else {}
         self._components = components
+        self._variant_count = 1
         for c in self._components:
-            c.parent = self
+            # Literals are shared by the copies of a template, so they can't belong to any one of them
+            if not isinstance(c, Literal):
+                c.parent = self
+            if isinstance(c, Choice):
+                self._variant_count *= len(c.options)
         self._slots = None
 
     def get_slot(self, slot_type: str) -> "Slot":
@@ -256,11 +295,32 @@ class Template(DocumentPlanNode):
     def components(self) -> List["TemplateComponent"]:
         return self._components
 
+    @property
+    def rules(self) -> List[Tuple[List["Matcher"], List[int]]]:
+        return self._rules
+
+    @property
+    def compiled_rules(self) -> List["CompiledRule"]:
+        return self._compiled_rules
+
     @property
     def facts(self) -> List[Fact]:
         return self._facts
 
-    def check(self, primary_message: Message, all_messages: List[Message], fill_slots: bool = False) -> List[Fact]:
+    @property
+    def variant_count(self) -> int:
+        """
+        The amount of versions of this template, given by the Choices among its components.
+        """
+        return self._variant_count
+
+    def check(
+        self,
+        primary_message: Message,
+        all_messages: List[Message],
+        fill_slots: bool = False,
+        message_index: Optional["MessageIndex"] = None,
+    ) -> List[Fact]:
         """
         Like fill(), but doesn't modify the template data structure, just checks whether the given message,
         with the support from other messages, is compatible with the template.
@@ -268,6 +328,7 @@ class Template(DocumentPlanNode):
         :param primary_message: The message that the first rule in the template should match
         :param all_messages: A list of other available messages
         :param fill_slots:
+        :param message_index: index of `all_messages`, used to only try the messages that may match each rule
         :return: True, if the template can be used for the primary_message. False otherwise.
         """
         # ToDo: Could we somehow cache the information about which messages to use in addition to the primary, so
@@ -282,7 +343,7 @@ class Template(DocumentPlanNode):
         used_facts = []
 
         # The first rule has to match the primary message
-        if not all(matcher(primary_fact, used_facts) for matcher in self._rules[0][0]):
+        if not self._compiled_rules[0].matches(primary_fact, used_facts):
             return []
 
         if fill_slots:
@@ -295,10 +356,14 @@ class Template(DocumentPlanNode):
 
         # Check the other rules
         if len(self._rules) > 1:
-            for (matchers, slot_indices) in self._rules[1:]:
+            for (_, slot_indices), rule in zip(self._rules[1:], self._compiled_rules[1:]):
                 # Try each message in turn
-                for mess in all_messages:
-                    if all(matcher(mess.main_fact, used_facts) for matcher in matchers):
+                if message_index is not None:
+                    candidates = message_index.candidates(rule.value_types)
+                else:
+                    candidates = all_messages
+                for mess in candidates:
+                    if rule.matches(mess.main_fact, used_facts):
                         # Found a suitable message: fill the slots
                         if fill_slots:
                             for slot_index in slot_indices:
@@ -318,17 +383,20 @@ class Template(DocumentPlanNode):
 
         return used_facts
 
-    def fill(self, primary_message: Message, all_messages: List[Message]) -> List[Fact]:
+    def fill(
+        self, primary_message: Message, all_messages: List[Message], message_index: Optional["MessageIndex"] = None
+    ) -> List[Fact]:
         """
         Search for messages needed to fulfill all of the rules in the template, and link the Slot components to the
         matching Facts
 
         :param primary_message: The message that the first rule in the template should match
         :param all_messages: A list of other available messages
+        :param message_index: index of `all_messages`, see check()
         :return: A list of the Facts that match the rules in the template
         """
 
-        return self.check(primary_message, all_messages, fill_slots=True)
+        return self.check(primary_message, all_messages, fill_slots=True, message_index=message_index)
 
     @property
     def slots(self) -> List["Slot"]:
@@ -346,9 +414,50 @@ class Template(DocumentPlanNode):
             return False
 
     def copy(self) -> "Template":
-        """Makes a deep copy of this Template. The copy does not contain any messages."""
+        """
+        Makes a deep copy of this Template, except for its Literals, which are shared with the original. The copy does
+        not contain any messages.
+        """
         component_copy = [c.copy() for c in self.components]
-        return Template(component_copy, self._rules)
+        return Template(component_copy, self._rules, compiled_rules=self._compiled_rules)
+
+    def resolve(self, variant: int) -> "Template":
+        """
+        Makes a copy of this Template, like copy(), with an option chosen for each of the Choices among its components.
+        Templates need to be resolved before they are filled.
+
+        :param variant: which version of the template to make, from 0 to variant_count - 1. Versions are numbered by
+            the options chosen, the first Choice varying the slowest.
+        """
+        if self._variant_count == 1:
+            return self.copy()
+
+        components: List[TemplateComponent] = []
+        # The rules refer to slots by their index in the components, with each Choice replaced by the components of
+        # all of its options. Map those indices to the indices in the resolved components.
+        resolved_indices: Dict[int, int] = {}
+        idx = 0
+        remaining_variants = self._variant_count
+        for component in self._components:
+            if not isinstance(component, Choice):
+                resolved_indices[idx] = len(components)
+                components.append(component.copy())
+                idx += 1
+                continue
+            remaining_variants //= len(component.options)
+            chosen = (variant // remaining_variants) % len(component.options)
+            for option_idx, option in enumerate(component.options):
+                for option_component in option:
+                    if option_idx == chosen:
+                        resolved_indices[idx] = len(components)
+                        components.append(option_component.copy())
+                    idx += 1
+
+        rules = [
+            (matchers, [resolved_indices[idx] for idx in slot_indices if idx in resolved_indices])
+            for (matchers, slot_indices) in self._rules
+        ]
+        return Template(components, rules, compiled_rules=self._compiled_rules)
 
     def __str__(self) -> str:
         return "<Template: {}>".format(self.display_template())
@@ -362,6 +471,8 @@ class Template(DocumentPlanNode):
 
 
 class DefaultTemplate(Template):
+    __slots__ = ()
+
     def __init__(self, canned_text: str) -> None:
         super().__init__(components=[Literal(canned_text)])
 
@@ -369,6 +480,8 @@ class DefaultTemplate(Template):
 class TemplateComponent(object):
     """An abstract TemplateComponent. Should not be used directly."""
 
+    __slots__ = ("_parent",)
+
     def __init__(self) -> None:
         self._parent = None
 
@@ -401,6 +514,8 @@ class Slot(TemplateComponent):
     requirements.
     """
 
+    __slots__ = ("attributes", "_to_value", "fact", "_realized", "_realized_value")
+
     # Todo: Are the values in "attributes" of a known type?
     def __init__(
         self, to_value: "SlotSource", attributes: Optional[Dict[str, Any]] = None, fact: Optional[Fact] = None
@@ -414,6 +529,9 @@ class Slot(TemplateComponent):
         self.attributes = attributes or {}
         self._to_value = to_value
         self.fact = fact
+        # Set by realize(), after which the value no longer depends on the fact
+        self._realized = False
+        self._realized_value = None  # type: Any
 
     @property
     def slot_type(self) -> str:
@@ -421,18 +539,36 @@ class Slot(TemplateComponent):
 
     @property
     def value(self) -> Union[str, int, float]:
+        if self._realized:
+            return self._realized_value
         return self._to_value(self.fact)
 
     @value.setter
     def value(self, f: Callable) -> None:
         self._to_value = f
+        self._realized = False
+        self._realized_value = None
+
+    @property
+    def realized(self) -> bool:
+        return self._realized
+
+    def realize(self, value: Any) -> None:
+        """
+        Sets the value of this slot as realized by one of the realization steps. Later steps see it as the slot's value.
+        """
+        self._realized = True
+        self._realized_value = value
 
     def copy(self, include_fact=False) -> "Slot":
         # TODO: Is it intended that Fact is not copied over?
         if not include_fact:
-            return Slot(self._to_value, self.attributes.copy())
+            slot = Slot(self._to_value, self.attributes.copy())
         else:
-            return Slot(self._to_value, self.attributes.copy(), self.fact)
+            slot = Slot(self._to_value, self.attributes.copy(), self.fact)
+        slot._realized = self._realized
+        slot._realized_value = self._realized_value
+        return slot
 
     def __str__(self) -> str:
         try:
@@ -443,12 +579,16 @@ class Slot(TemplateComponent):
 
 
 class LiteralSlot(Slot):
+    __slots__ = ()
+
     def __init__(self, value: str, attributes: Optional[Dict[str, str]] = None) -> None:
         super().__init__(LiteralSource(value), attributes)
 
 
 class Literal(TemplateComponent):
-    """A string literal."""
+    """A string literal. Literals are shared between the copies of a template, and have no parent."""
+
+    __slots__ = ("_string",)
 
     def __init__(self, string: str) -> None:
         super().__init__()
@@ -463,12 +603,32 @@ class Literal(TemplateComponent):
         return self._string
 
     def copy(self) -> "Literal":
-        return Literal(self.value)
+        # Literals are never modified, so copies of a template share them. Their parent is never set, see Template.
+        return self
 
     def __str__(self) -> str:
         return self.value
 
 
+class Choice(TemplateComponent):
+    """
+    Alternative sequences of components, one of which is used when the Template is resolved. An optional part of a
+    template is a Choice between the part and nothing.
+    """
+
+    __slots__ = ("options",)
+
+    def __init__(self, options: List[List[TemplateComponent]]) -> None:
+        super().__init__()
+        self.options = options
+
+    def copy(self) -> "Choice":
+        return Choice([[c.copy() for c in option] for option in self.options])
+
+    def __str__(self) -> str:
+        return "[{}]".format(" | ".join(" ".join(str(c) for c in option) for option in self.options))
+
+
 class SlotSource(ABC):
     """ Source of the slot value """
 
@@ -604,6 +764,53 @@ class Matcher(object):
         # Perform the relevant comparison operator
         return Matcher.OPERATORS[self.op](result, value)
 
+    def compile(self) -> "FactPredicate":
+        """
+        Returns a function equivalent to calling this Matcher. The operator and the LHS expression are resolved, and
+        constant RHS values prepared, ahead of time, so that nothing needs to be interpreted on each call.
+        """
+        op = Matcher.OPERATORS[self.op]
+        lhs = self.lhs
+        value = self.value
+
+        if callable(value):
+            # The RHS refers to the facts, and has to be evaluated on each call
+            return lambda fact, all_facts: op(lhs(fact, all_facts), value(fact, all_facts))
+
+        if isinstance(lhs, FactField):
+            get_lhs = operator.attrgetter(lhs.field_name)
+        else:
+            get_lhs = None
+
+        if self.op == "=" and type(value) is str:
+            if not _regex_special_re.search(value):
+                # The regex "^value$" matches exactly the value itself, optionally followed by a newline
+                alternatives = frozenset([value, value + "\n"])
+                if get_lhs is not None:
+                    return lambda fact, all_facts: str(get_lhs(fact)) in alternatives
+                return lambda fact, all_facts: str(lhs(fact, all_facts)) in alternatives
+            try:
+                match = re.compile("^" + value + "$").match
+            except re.error:
+                # Fail when the matcher is used, just like the uncompiled matcher does
+                return lambda fact, all_facts: op(lhs(fact, all_facts), value)
+            if get_lhs is not None:
+                return lambda fact, all_facts: match(str(get_lhs(fact))) is not None
+            return lambda fact, all_facts: match(str(lhs(fact, all_facts))) is not None
+
+        if self.op == "=":
+            # Non-string values are simply compared for equality
+            op = operator.eq
+
+        if self.op == "in":
+            if get_lhs is not None:
+                return lambda fact, all_facts: get_lhs(fact) in value
+            return lambda fact, all_facts: lhs(fact, all_facts) in value
+
+        if get_lhs is not None:
+            return lambda fact, all_facts: op(get_lhs(fact), value)
+        return lambda fact, all_facts: op(lhs(fact, all_facts), value)
+
     def __str__(self):
         return "lambda msg, all: {} ({})     {}      {} ({})".format(
             self.lhs, type(self.lhs), self.op, self.value, type(self.value)
@@ -611,3 +818,100 @@ class Matcher(object):
 
     def __repr__(self):
         return str(self)
+
+
+FactPredicate = Callable[[Fact, List[Fact]], bool]
+
+# Characters that make a "value_type = ..." constraint a regular expression rather than a plain string
+_regex_special_re = re.compile(r"[.^$*+?{}\[\]\\|()]")
+
+
+class CompiledRule(NamedTuple):
+    # Equivalent to checking that all the matchers of the rule match
+    matches: FactPredicate
+    # The value_types a fact must have one of to match the rule, or None if the rule doesn't limit the value_type to a
+    # fixed set of values
+    value_types: Optional[FrozenSet[str]]
+    # The matchers the rule was compiled from
+    matchers: List[Matcher]
+
+    def __reduce__(self) -> Tuple[Callable[[List[Matcher]], "CompiledRule"], Tuple[List[Matcher]]]:
+        # The compiled functions can't be pickled, so the rule is pickled as its matchers and compiled again when
+        # unpickled
+        return compile_rule, (self.matchers,)
+
+
+def compile_rule(matchers: List[Matcher]) -> CompiledRule:
+    predicates = [matcher.compile() for matcher in matchers]
+
+    if not predicates:
+
+        def matches(fact: Fact, all_facts: List[Fact]) -> bool:
+            return True
+
+    elif len(predicates) == 1:
+        matches = predicates[0]
+    else:
+
+        def matches(fact: Fact, all_facts: List[Fact]) -> bool:
+            for predicate in predicates:
+                if not predicate(fact, all_facts):
+                    return False
+            return True
+
+    return CompiledRule(matches, _required_value_types(matchers), matchers)
+
+
+def _required_value_types(matchers: List[Matcher]) -> Optional[FrozenSet[str]]:
+    """
+    The value_types required by a "value_type = ..." (with a plain string rather than a regex) or a
+    "value_type in {group}" matcher, if there is one.
+    """
+    for matcher in matchers:
+        if not isinstance(matcher.lhs, FactField) or matcher.lhs.field_name != "value_type":
+            continue
+        if matcher.op == "=" and type(matcher.value) is str and not _regex_special_re.search(matcher.value):
+            # See Matcher.compile()
+            return frozenset([matcher.value, matcher.value + "\n"])
+        if (
+            matcher.op == "in"
+            and isinstance(matcher.value, (set, frozenset))
+            and all(type(value) is str for value in matcher.value)
+        ):
+            return frozenset(matcher.value)
+    return None
+
+
+class MessageIndex(object):
+    """
+    Messages grouped by the value_type of their main fact, so that the messages that may match a rule can be found
+    without going through all of them.
+    """
+
+    def __init__(self, messages: List[Message]) -> None:
+        self.messages = messages
+        self._by_value_type: Dict[str, List[Tuple[int, Message]]] = defaultdict(list)
+        # Messages whose value_type is not a string. These are compared as strings by the matchers, so they may match
+        # any rule.
+        self._unindexed: List[Tuple[int, Message]] = []
+        for position, message in enumerate(messages):
+            value_type = message.main_fact.value_type
+            if isinstance(value_type, str):
+                self._by_value_type[value_type].append((position, message))
+            else:
+                self._unindexed.append((position, message))
+
+    def candidates(self, value_types: Optional[FrozenSet[str]]) -> Iterable[Message]:
+        """
+        The messages that may match a rule requiring one of the given value_types, in their original order.
+        """
+        if value_types is None:
+            return self.messages
+        groups = [self._by_value_type[value_type] for value_type in value_types if value_type in self._by_value_type]
+        if self._unindexed:
+            groups.append(self._unindexed)
+        if not groups:
+            return ()
+        if len(groups) == 1:
+            return [message for (_, message) in groups[0]]
+        return [message for (_, message) in heapq.merge(*groups, key=lambda item: item[0])]
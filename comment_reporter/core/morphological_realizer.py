@@ -1,9 +1,15 @@
+import json
 import logging
+import os
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Tuple
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
 
+from cachetools import LRUCache
 from numpy.random import Generator
 
+from .cache import ThreadSafeCache
 from .models import DocumentPlanNode, Message, Slot
 from .pipeline import NLGPipelineComponent
 from .registry import Registry
@@ -11,6 +17,66 @@ from .registry import Registry
 log = logging.getLogger("root")
 
 
+class MorphologyUnavailableError(Exception):
+    """
+    Raised at startup when the resources a morphological realizer needs, such as its models, are not available.
+    """
+
+    pass
+
+
+class MorphologyCache(ThreadSafeCache):
+    """
+    Bounded cache of morphological realizations, keyed by (language, surface form, case). Once full, entries are
+    evicted in least recently used order.
+
+    The cache can be saved to a JSON file and loaded back, so that a restarted service does not need to analyze the
+    same words again.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        super().__init__(LRUCache(maxsize=maxsize))
+
+    def load(self, path: Path) -> None:
+        """
+        Adds the realizations saved in `path` to the cache. A missing or unreadable file is logged and ignored.
+        """
+        if not path.exists():
+            log.info("No morphology cache at {}, starting with an empty cache".format(path))
+            return
+        try:
+            with path.open(encoding="utf-8") as cache_file:
+                entries = json.load(cache_file)
+            with self._lock:
+                for language, surface, case, value in entries:
+                    self._cache[(language, surface, case)] = value
+        except (OSError, ValueError, TypeError) as ex:
+            log.warning("Unable to load morphology cache from {}: {}".format(path, ex))
+            return
+        log.info("Loaded {} morphological realizations from {}".format(len(entries), path))
+
+    def save(self, path: Path) -> None:
+        """
+        Writes the cached realizations of string surface forms to `path`, least recently used first.
+        """
+        with self._lock:
+            entries = [
+                [language, surface, case, value]
+                for (language, surface, case), value in self._cache.items()
+                if isinstance(surface, str)
+            ]
+        # Write to a temporary file first so that a crash never leaves a truncated cache behind
+        tmp_path = path.with_name(path.name + ".tmp")
+        try:
+            with tmp_path.open("w", encoding="utf-8") as cache_file:
+                json.dump(entries, cache_file, ensure_ascii=False)
+            os.replace(str(tmp_path), str(path))
+        except OSError as ex:
+            log.warning("Unable to save morphology cache to {}: {}".format(path, ex))
+            return
+        log.info("Saved {} morphological realizations to {}".format(len(entries), path))
+
+
 class LanguageSpecificMorphologicalRealizer(ABC):
     def __init__(self, language):
         self.language = language
@@ -19,11 +85,108 @@ class LanguageSpecificMorphologicalRealizer(ABC):
     def realize(self, slot: Slot) -> str:
         pass
 
+    def preload(self) -> None:
+        """
+        Loads everything the realizer needs into memory, so that nothing needs to be loaded while realizing. Called
+        once at startup. Raises a MorphologyUnavailableError if something is missing.
+        """
+        pass
+
+    def realize_batch(self, slots: List[Slot]) -> List[str]:
+        """
+        Realizes all the slots of a document at once. Realizers that benefit from processing the slots together
+        should override this.
+        """
+        return [self.realize(slot) for slot in slots]
+
+
+class CachingMorphologicalRealizer(LanguageSpecificMorphologicalRealizer):
+    """
+    A realizer that inflects the slots with a "case" attribute, realizing each distinct surface form and case only once
+    and keeping the realizations in a MorphologyCache shared by all requests. Slots without a case are left as they
+    are.
+    """
+
+    def __init__(self, language: str, cache: Optional[MorphologyCache] = None) -> None:
+        super().__init__(language)
+        self.cache = cache
+
+    @abstractmethod
+    def normalize_case(self, case: str) -> str:
+        pass
+
+    @abstractmethod
+    def analyze(self, surface: str) -> Optional[str]:
+        """
+        The morphological analysis of the surface form to inflect, or None if it has no suitable analysis.
+        """
+        pass
+
+    @abstractmethod
+    def generate(self, analysis: str, case: str) -> str:
+        """
+        Generates the surface form of `analysis`, as returned by analyze(), inflected to `case`, as returned by
+        normalize_case().
+        """
+        pass
+
+    def realize(self, slot: Slot) -> str:
+        return self.realize_batch([slot])[0]
+
+    def realize_batch(self, slots: List[Slot]) -> List[str]:
+        values = [slot.value for slot in slots]
+        keys: List[Optional[Tuple[str, str, str]]] = []
+        for slot, value in zip(slots, values):
+            case: Optional[str] = slot.attributes.get("case")
+            if case is None:
+                keys.append(None)
+                continue
+            normalized_case = self.normalize_case(case)
+            log.debug("Normalized case {} to {}".format(case, normalized_case))
+            keys.append((self.language, value, normalized_case))
+
+        distinct_keys = list(dict.fromkeys(key for key in keys if key is not None))
+        cached = self.cache.get_many(distinct_keys) if self.cache is not None else [None] * len(distinct_keys)
+        realizations: Dict[Tuple[str, str, str], str] = {
+            key: realization for (key, realization) in zip(distinct_keys, cached) if realization is not None
+        }
+        missing = [key for (key, realization) in zip(distinct_keys, cached) if realization is None]
+
+        # The words not found in the cache are first all analyzed, each surface form only once even if it is needed in
+        # several cases, and the inflected forms then generated from the analyses.
+        analyses: Dict[str, Optional[str]] = {}
+        for _, surface, _ in missing:
+            if surface not in analyses:
+                analyses[surface] = self.analyze(surface)
+                if analyses[surface] is None:
+                    log.warning(
+                        "No valid morphological analysis for {}, unable to realize despite case attribute".format(
+                            surface
+                        )
+                    )
+        for key in missing:
+            _, surface, case = key
+            analysis = analyses[surface]
+            realizations[key] = surface if analysis is None else self.generate(analysis, case)
+        if self.cache is not None and missing:
+            self.cache.set_many((key, realizations[key]) for key in missing)
+
+        return [value if key is None else realizations[key] for key, value in zip(keys, values)]
+
 
 class MorphologicalRealizer(NLGPipelineComponent):
     def __init__(self, language_realizers: Dict[str, LanguageSpecificMorphologicalRealizer]) -> None:
         self.language_realizers = language_realizers
 
+    def preload(self) -> None:
+        """
+        Preloads the resources of all language realizers. Raises a MorphologyUnavailableError if any are missing.
+        """
+        for language, language_realizer in self.language_realizers.items():
+            start = time.perf_counter()
+            language_realizer.preload()
+            log.info("Preloaded morphology for {} in {:.3f}s".format(language, time.perf_counter() - start))
+
     def run(
         self, registry: Registry, random: Generator, language: str, document_plan: DocumentPlanNode
     ) -> Tuple[DocumentPlanNode]:
@@ -40,21 +203,27 @@ class MorphologicalRealizer(NLGPipelineComponent):
             log.warning("No morphological realizer for language {}".format(language))
             return (document_plan,)
 
-        self._recurse(language, document_plan)
+        slots: List[Slot] = []
+        self._recurse(document_plan, slots)
+        realized_values = self.language_realizers[language].realize_batch(slots)
+        for slot, realized_value in zip(slots, realized_values):
+            slot.realize(realized_value)
 
         if log.isEnabledFor(logging.DEBUG):
             document_plan.print_tree()
 
         return (document_plan,)
 
-    def _recurse(self, language: str, this: DocumentPlanNode) -> None:
+    def _recurse(self, this: DocumentPlanNode, slots: List[Slot]) -> None:
+        """
+        Collects the slots of the document plan, in order.
+        """
         log.debug("Visiting '{}'".format(this))
         if not isinstance(this, Message):
             for child in this.children:
-                self._recurse(language, child)
+                self._recurse(child, slots)
             return
 
         for template_component in this.template.components:
             if isinstance(template_component, Slot):
-                realized_value = self.language_realizers[language].realize(template_component)
-                template_component.value = lambda x, realized_value=realized_value: realized_value
+                slots.append(template_component)
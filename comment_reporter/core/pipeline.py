@@ -5,6 +5,7 @@ from typing import Any, List, Optional, Tuple, Union
 from numpy import random
 
 from .registry import Registry
+from .timings import timed
 
 log = logging.getLogger("root")
 
@@ -28,9 +29,13 @@ class NLGPipelineComponent(ABC):
 
 
 class NLGPipeline(object):
-    def __init__(self, registry: Registry, *components: NLGPipelineComponent) -> None:
+    def __init__(self, registry: Registry, *components: NLGPipelineComponent, name: str = "pipeline") -> None:
+        """
+        :param name: name of the pipeline, used to identify its components in the timings
+        """
         self._registry = registry
         self._components = components
+        self.name = name
 
     @property
     def registry(self) -> Registry:
@@ -40,16 +45,32 @@ class NLGPipeline(object):
     def components(self) -> Tuple[NLGPipelineComponent]:
         return self._components
 
-    def run(self, initial_inputs: Any, language: str, prng_seed: Optional[int] = None) -> Union[List[Any], Tuple[Any]]:
+    def run(
+        self,
+        initial_inputs: Any,
+        language: str,
+        prng_seed: Optional[int] = None,
+        registry: Optional[Registry] = None,
+    ) -> Union[List[Any], Tuple[Any]]:
+        """
+        Runs all components in order. All per-run state (the PRNG and the registry) is created here and passed to the
+        components, so that a single pipeline can safely be ran by multiple threads at the same time.
+
+        :param registry: per-request registry. Should fall back to the pipeline's own registry. If not given, an empty
+            child of the pipeline's registry is used.
+        """
         log.info("Starting NLG pipeline")
         log.debug("PRNG seed is {}".format(prng_seed))
         prng = random.default_rng(prng_seed)  # type: random.Generator
         log.info("First random is {}".format(prng.integers(0, 1000000)))
+        if registry is None:
+            registry = self.registry.child()
         args = initial_inputs
         for component in self.components:
             log.info("Running component {}".format(component))
             try:
-                output = component.run(self.registry, prng, language, *args)
+                with timed("stages", "{}/{}".format(self.name, component)):
+                    output = component.run(registry, prng, language, *args)
             except Exception as ex:
                 log.exception(ex)
                 raise
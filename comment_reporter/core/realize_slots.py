@@ -2,7 +2,7 @@ import logging
 import re
 from abc import ABC, abstractmethod
 from numbers import Number
-from typing import Callable, Dict, Iterable, List, Optional, Tuple, Union
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
 
 from numpy.random import Generator
 
@@ -14,9 +14,19 @@ log = logging.getLogger("root")
 
 
 class SlotRealizer(NLGPipelineComponent):
+    """
+    Realizes slots with the realizers registered as "slot-realizers", falling back to realizing numbers.
+
+    Every slot is offered to the realizers supporting the language and the type of the slot's value, in order, until
+    one of them succeeds. The slots a realizer replaces a slot with are offered to the realizers again, on the next
+    round, until no more slots of the message are replaced. Slots that could not be realized, or were realized in
+    place, are not offered again.
+
+    Holds no per-run state, so a single instance can be shared by concurrently running pipelines.
+    """
+
     def __init__(self) -> None:
-        self._random = None
-        self._registry = None
+        self._fallback_realizers: Tuple[SlotRealizerComponent, ...] = (NumberRealizer(),)
 
     def run(
         self, registry: Registry, random: Generator, language: str, document_plan: DocumentPlanNode
@@ -25,48 +35,96 @@ class SlotRealizer(NLGPipelineComponent):
         Run this pipeline component.
         """
         log.info("Realizing slots")
-        self._registry = registry
-        self._random = random
-        while self._recurse(document_plan, language.split("-")[0]):
-            pass  # Repeat until no more changes
+        language = language.split("-")[0]
+        slot_realizers = _RealizerDispatch(
+            [
+                slot_realizer
+                for slot_realizer in list(registry.get("slot-realizers")) + list(self._fallback_realizers)
+                if language in slot_realizer.supported_languages() or "ANY" in slot_realizer.supported_languages()
+            ]
+        )
+
+        # Messages are realized one at a time, in document order. Each round realizes the slots produced by the
+        # previous one, in order, so that the realizers consume random numbers in a fixed order.
+        for message in _messages(document_plan):
+            pending = {id(child) for child in message.children if isinstance(child, Slot)}
+            while pending:
+                pending = self._realize_message(slot_realizers, random, language, message, pending)
         return (document_plan,)
 
-    def _recurse(self, this: DocumentPlanNode, language: str) -> bool:
-        if not isinstance(this, Message):
-            log.debug("Visiting '{}'".format(this))
-            return any(self._recurse(child, language) for child in this.children)
-        else:
-            log.debug("Visiting {}".format(this))
-            any_modified = False
-            # Use indexes to iterate through the children since the template slots may be edited, added or replaced
-            # during iteration. Ugly, but will do for now.
-            idx = 0
-            while idx < len(this.children):
-                child = this.children[idx]
-                log.debug("Visiting child {}".format(child))
-                if not isinstance(child, Slot):
-                    idx += 1
-                    continue
-                modified_components = self._realize_slot(language, child)
-                if modified_components != [child]:
-                    any_modified = True
-                this.children[idx : idx + 1] = modified_components
-                idx += len(modified_components)
-            return any_modified
-
-    def _realize_slot(self, language: str, slot: Slot) -> List[TemplateComponent]:
-        slot_realizers = self._registry.get("slot-realizers")
-        slot_realizers.append(NumberRealizer())
-        for slot_realizer in slot_realizers:
-            assert isinstance(slot_realizer, SlotRealizerComponent)
-            if language in slot_realizer.supported_languages() or "ANY" in slot_realizer.supported_languages():
-                success, components = slot_realizer.realize(slot, self._random)
-                if success:
-                    return components
+    def _realize_message(
+        self,
+        slot_realizers: "_RealizerDispatch",
+        random: Generator,
+        language: str,
+        message: Message,
+        pending: Set[int],
+    ) -> Set[int]:
+        """
+        Realizes the slots of the message whose ids are in `pending`. Returns the ids of the slots they were replaced
+        with.
+        """
+        log.debug("Visiting {}".format(message))
+        children = message.children
+        realized_children: List[TemplateComponent] = []
+        new_slots: Set[int] = set()
+        for child in children:
+            if id(child) not in pending:
+                realized_children.append(child)
+                continue
+            log.debug("Visiting child {}".format(child))
+            components = self._realize_slot(slot_realizers, random, language, child)
+            if components != [child]:
+                new_slots.update(id(component) for component in components if isinstance(component, Slot))
+            realized_children.extend(components)
+        children[:] = realized_children
+        return new_slots
+
+    @staticmethod
+    def _realize_slot(
+        slot_realizers: "_RealizerDispatch", random: Generator, language: str, slot: Slot
+    ) -> List[TemplateComponent]:
+        for slot_realizer in slot_realizers.applicable(slot.value):
+            success, components = slot_realizer.realize(slot, random)
+            if success:
+                return components
         log.debug("Unable to realize slot {} in language {} with any realizer".format(slot, language))
         return [slot]
 
 
+class _RealizerDispatch(object):
+    """
+    The realizers applicable to slot values of each type, in their original order.
+    """
+
+    def __init__(self, slot_realizers: List["SlotRealizerComponent"]) -> None:
+        for slot_realizer in slot_realizers:
+            assert isinstance(slot_realizer, SlotRealizerComponent)
+        self._slot_realizers = [
+            (slot_realizer, slot_realizer.supported_value_types()) for slot_realizer in slot_realizers
+        ]
+        self._by_value_type: Dict[type, List[SlotRealizerComponent]] = {}
+
+    def applicable(self, value: Any) -> List["SlotRealizerComponent"]:
+        slot_realizers = self._by_value_type.get(type(value))
+        if slot_realizers is None:
+            slot_realizers = [
+                slot_realizer
+                for slot_realizer, value_types in self._slot_realizers
+                if value_types is None or isinstance(value, value_types)
+            ]
+            self._by_value_type[type(value)] = slot_realizers
+        return slot_realizers
+
+
+def _messages(node: DocumentPlanNode) -> Iterator[Message]:
+    if isinstance(node, Message):
+        yield node
+    else:
+        for child in node.children:
+            yield from _messages(child)
+
+
 class SlotRealizerComponent(ABC):
     @abstractmethod
     def supported_languages(self) -> List[str]:
@@ -76,11 +134,21 @@ class SlotRealizerComponent(ABC):
     def realize(self, slot: Slot, random: Generator) -> Tuple[bool, List[TemplateComponent]]:
         pass
 
+    def supported_value_types(self) -> Optional[Tuple[type, ...]]:
+        """
+        The types of slot values this realizer can realize, or None if not restricted. Slots with values of other types
+        are not offered to the realizer at all.
+        """
+        return None
+
 
 class NumberRealizer(SlotRealizerComponent):
     def supported_languages(self) -> List[str]:
         return ["ANY"]
 
+    def supported_value_types(self) -> Optional[Tuple[type, ...]]:
+        return (Number,)
+
     def realize(self, slot: Slot, random: Generator) -> Tuple[bool, List[TemplateComponent]]:
         value = slot.value
         if not isinstance(value, Number):
@@ -88,12 +156,12 @@ class NumberRealizer(SlotRealizerComponent):
 
         if isinstance(value, (int, float)):
             if int(value) == value:
-                slot.value = lambda x: int(value)
+                slot.realize(int(value))
                 return True, [slot]
 
             for rounding in range(5):
                 if round(value, rounding) != 0:
-                    slot.value = lambda x: round(value, rounding + 1)
+                    slot.realize(round(value, rounding + 1))
                     return True, [slot]
 
         return True, [slot]
@@ -125,6 +193,9 @@ class RegexRealizer(SlotRealizerComponent):
     def supported_languages(self) -> List[str]:
         return self.languages
 
+    def supported_value_types(self) -> Optional[Tuple[type, ...]]:
+        return (str,)
+
     def realize(self, slot: Slot, random: Generator) -> Tuple[bool, List[TemplateComponent]]:
         # We can only parse the slot contents with a regex if the slot contents are a string
         if not isinstance(slot.value, str):
@@ -163,10 +234,7 @@ class RegexRealizer(SlotRealizerComponent):
             for attribute, value in self.add_attributes.get(idx, {}).items():
                 new_slot.attributes[attribute] = value
 
-            # An ugly hack that ensures the lambda correctly binds to the value of realization_token at this
-            # time. Without this, all the lambdas bind to the final value of the realization_token variable, ie.
-            # the final value at the end of the loop.  See https://stackoverflow.com/a/10452819
-            new_slot.value = lambda f, realization_token=realization_token: realization_token
+            new_slot.realize(realization_token)
             components.append(new_slot)
         log.info("Components: {}".format([str(c) for c in components]))
 
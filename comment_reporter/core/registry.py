@@ -1,4 +1,5 @@
-from typing import Any
+from types import MappingProxyType
+from typing import Any, Optional
 
 
 class ComponentNameCollisionError(Exception):
@@ -9,18 +10,63 @@ class UnknownComponentException(Exception):
     pass
 
 
+class FrozenRegistryException(Exception):
+    pass
+
+
 class Registry(object):
-    def __init__(self) -> None:
+    def __init__(self, parent: Optional["Registry"] = None) -> None:
+        """
+        :param parent: registry to fall back to for components not registered in this one. Typically an immutable
+            snapshot shared by all requests, with this registry holding the request-specific components.
+        """
         self._registry = {}
+        self._parent = parent
+        self._frozen = False
+
+    @property
+    def frozen(self) -> bool:
+        return self._frozen
 
     def register(self, name: str, service: Any) -> None:
-        if name in self._registry:
+        if self._frozen:
+            raise FrozenRegistryException("Unable to register '{}', the registry is frozen".format(name))
+        if name in self:
             raise ComponentNameCollisionError("A component of name '{}' already exists".format(name))
         else:
             self._registry[name] = service
 
     def get(self, name: str) -> Any:
-        if name not in self._registry:
-            raise UnknownComponentException("No component named '{}'".format(name))
-        else:
+        if name in self._registry:
             return self._registry[name]
+        if self._parent is not None:
+            return self._parent.get(name)
+        raise UnknownComponentException("No component named '{}'".format(name))
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._registry or (self._parent is not None and name in self._parent)
+
+    def snapshot(self) -> "Registry":
+        """
+        Returns an immutable copy of this registry. New components can not be registered to the snapshot, and lists and
+        dicts registered to this registry are replaced by read-only versions so that they can be shared by concurrently
+        running pipelines.
+        """
+        snapshot = Registry(self._parent)
+        snapshot._registry = {name: _freeze(service) for (name, service) in self._registry.items()}
+        snapshot._frozen = True
+        return snapshot
+
+    def child(self) -> "Registry":
+        """
+        Returns a new, empty and mutable, registry that falls back to this one. Used to hold per-request state.
+        """
+        return Registry(parent=self)
+
+
+def _freeze(service: Any) -> Any:
+    if isinstance(service, list):
+        return tuple(service)
+    if isinstance(service, dict):
+        return MappingProxyType(dict(service))
+    return service
@@ -0,0 +1,73 @@
+"""
+On-disk cache of parsed templates.
+
+Parsing the templates of all resources takes a while, and is repeated by every process started. The parsed templates
+are instead pickled to a file, along with a key computed from the template sources and from the code that parses them
+and defines their structure. The cached templates are only used if the key matches, i.e. if neither the templates nor
+that code have changed since the cache was written.
+"""
+import hashlib
+import logging
+import os
+import pickle
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from . import models, template_reader
+from .models import Template
+
+log = logging.getLogger("root")
+
+# Bump when the cache file format changes
+CACHE_FORMAT_VERSION = 1
+
+
+def cache_key(sources: List[str]) -> str:
+    """
+    :param sources: the template strings the templates are read from, in order
+    """
+    digest = hashlib.sha256()
+    digest.update(str(CACHE_FORMAT_VERSION).encode("utf-8"))
+    for module in (models, template_reader):
+        with open(module.__file__, "rb") as module_file:
+            digest.update(module_file.read())
+    for source in sources:
+        encoded = source.encode("utf-8")
+        # Include the lengths, so that moving text from one source to the next changes the key
+        digest.update(str(len(encoded)).encode("utf-8") + b"\0" + encoded)
+    return digest.hexdigest()
+
+
+def load(path: Path, key: str) -> Optional[Dict[str, List[Template]]]:
+    """
+    Returns the templates cached in `path`, or None if there is no cache or it was written for a different key.
+    """
+    try:
+        with path.open("rb") as cache_file:
+            cached_key, templates = pickle.load(cache_file)
+    except FileNotFoundError:
+        log.info("No template cache at {}".format(path))
+        return None
+    except Exception as ex:
+        # Anything may go wrong when unpickling a cache written by different code
+        log.warning("Unable to read template cache {}: {}".format(path, ex))
+        return None
+    if cached_key != key:
+        log.info("Template cache {} is out of date".format(path))
+        return None
+    return templates
+
+
+def save(path: Path, key: str, templates: Dict[str, List[Template]]) -> None:
+    # Several processes may be writing the cache at the same time. Each writes its own temporary file, which then
+    # atomically replaces the cache.
+    tmp_path = path.with_name("{}.{}.tmp".format(path.name, os.getpid()))
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with tmp_path.open("wb") as cache_file:
+            pickle.dump((key, templates), cache_file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(str(tmp_path), str(path))
+    except OSError as ex:
+        log.warning("Unable to write template cache {}: {}".format(path, ex))
+        return
+    log.info("Wrote template cache {}".format(path))
@@ -25,22 +25,27 @@ using the old format.
 Optional template parts
 =======================
 You can compactly specify alternative versions of a template by enclosing part of it in square brackets.
-When it is read in, it will be expanded out into two templates, one with the optional part and one
-without.
+When it is read in, the optional part is kept as a Choice between the part and nothing, which is resolved
+when the template is used. A template with an optional part thus has two versions, one with the optional
+part and one without.
 
-You may include multiple optional parts in the same template and all combinations will be
-generated in expansion. However, you may not nest brackets.
+You may include multiple optional parts in the same template and all combinations are possible versions
+of it. However, you may not nest brackets.
 
-This is exactly equivalent to putting the expanded templates explicitly on consecutive lines (all with
-the same language specifier).
+This is equivalent to putting the versions explicitly on consecutive lines (all with the same language
+specifier): every version is as likely to be chosen as any other template. Optional parts that are not
+separated from the surrounding text by whitespace, e.g. "{value}[,]", can't be kept as Choices, and are
+instead expanded out into separate templates.
 
 """
+
 import logging
 import re
 import warnings
 from typing import Dict, List, Optional, Tuple
 
 from .models import (
+    Choice,
     FactField,
     FactFieldSource,
     Literal,
@@ -49,7 +54,9 @@ from .models import (
     ReferentialExpr,
     Slot,
     Template,
+    TemplateComponent,
     TimeSource,
+    compile_rule,
 )
 
 log = logging.getLogger("root")
@@ -227,6 +234,9 @@ def read_template_group(
     if len(rules) == 0:
         rules.append([])
 
+    # Compile the rules once, to be shared by all the templates of this group
+    compiled_rules = [compile_rule(matchers) for matchers in rules]
+
     # TEMPLATES
     # Now we parse the template lines themselves
     templates = {}
@@ -245,119 +255,150 @@ def read_template_group(
                 # Otherwise, switch the current language, so it gets used for this template and becomes the default
                 current_language = language
 
-        # Allow alternative versions of a template to be specified using the [] notation for optional parts
-        for expanded_template_line in expand_alternatives(template_line):
-            components = []  # type: List['TemplateComponent']
-
-            # Generate list for mapping rules into template Slots
-            rule_to_slot = []  # type: List[List[int]]
-            for idx in range(len(rules)):
-                rule_to_slot.append([])
-
-            rest = expanded_template_line.strip()
-            while len(rest.strip()):
-                # Look for the next opening brace marking a substitution
-                literal_part, __, rest = rest.partition("{")
-                # Everything up to the brace is a literal
-                if len(literal_part) > 0:
-                    # To make life easier for the aggregator, literals are split on whitespace here
-                    for literal in literal_part.split():
-                        components.append(Literal(literal))
-                # If no brace was found, we're done
-                if len(rest) > 0:
-                    # Look for the closing brace
-                    subst, closer, rest = rest.partition("}")
-                    if not closer:
-                        raise TemplateReadingError("closing brace missing in {}".format(expanded_template_line))
-                    # Split up the substitution spec on commas, to allow various attributes and filters to be included
-                    subst_parts = [p.strip() for p in subst.split(",")]
-
-                    # First check if the first part is actually a literal.
-                    if subst_parts[0][0] in ['"', "'"]:
-                        if subst_parts[0][-1] != subst_parts[0][0]:
-                            raise TemplateReadingError("closing quote missing in {}".format(expanded_template_line))
-                        field_name = subst_parts[0]
-                        rule_ref = None
-                    else:
-                        # The first thing is the base value to substitute, which should be one of the fact fields
-                        # or the new {time} slot, which refers to both when-fields
-                        field_name = subst_parts[0]
-
-                        # It may specify which of the facts it's referring to, though this is not required
-                        # (default to first)
-                        if "." in field_name:
-                            rule_ref, __, field_name = field_name.partition(".")
-                            # Use 1-indexed fact numbering in templates: makes more sense for anyone but
-                            # computer scientists
-                            rule_ref = int(rule_ref) - 1
-                            if rule_ref < 0:
-                                raise TemplateReadingError(
-                                    "Rule references use 1-index numbering. Found reference to rule "
-                                    "0: did you mean 1?"
-                                )
-                        else:
-                            # Default to referring to the first rule, since there's usually only one
-                            rule_ref = 0
-
-                        # Map alternative field names to their canonical form used internally
-                        try:
-                            field_name = FACT_FIELD_MAP[field_name]
-                        except KeyError:
-                            raise TemplateReadingError(
-                                "unknown fact field '{}' used in substitution ({})".format(field_name, subst)
-                            )
-
-                        # Only some of the field names are allowed to be used in templates
-                        # TODO: Remove or reinstate with allowed things received as params from "somewhere"
-                        if field_name not in FACT_FIELDS:
-                            raise TemplateReadingError(
-                                "invalid field name '{}' for use in a template: {}".format(
-                                    field_name, expanded_template_line
-                                )
-                            )
-
-                        if rule_ref >= len(rules):
-                            raise TemplateReadingError(
-                                "Substitution '{}' refers to rule {}, but template only has {} "
-                                "rules".format(subst, rule_ref + 1, len(rules))
-                            )
-
-                    attributes = {}
-                    # Read each of the attribute specifications
-                    for subst_part in subst_parts[1:]:
-                        if "=" in subst_part:
-                            # Attributes specify things like case, to be used in realisation
-                            att, __, val = subst_part.partition("=")
-                            attributes[att.strip()] = val.strip()
-                        else:
-                            raise TemplateReadingError(
-                                "Found an attribute with no value specified. "
-                                "Possibly a leftover old style filter? {}".format(subst_part)
-                            )
-
-                    if field_name[0] in ["'", '"']:
-                        to_value = LiteralSource(field_name[1:-1])
-                    elif field_name == "time":
-                        to_value = TimeSource()
-                    else:
-                        to_value = FactFieldSource(field_name)
-
-                    # Postprocess attributes
-                    attributes = process_attributes(attributes)
-
-                    # len(components) is the index for the next component to be added
-                    if rule_ref is not None:
-                        rule_to_slot[rule_ref].append(len(components))
-                    new_slot = Slot(to_value, attributes=attributes)
-                    components.append(new_slot)
-
-            template = Template(components, list(zip(rules, rule_to_slot)))
-            # Add this template to the list for the relevant language
-            templates.setdefault(current_language, []).append(template)
+        # Allow alternative versions of a template to be specified using the [] notation for optional parts. These are
+        # kept as Choices within a single template, unless they can't be separated from the surrounding words.
+        segments = split_optional_parts(template_line)
+        if segments is None:
+            for expanded_template_line in expand_alternatives(template_line):
+                components, rule_to_slot = parse_template_text(expanded_template_line, rules)
+                template = Template(components, list(zip(rules, rule_to_slot)), compiled_rules=compiled_rules)
+                templates.setdefault(current_language, []).append(template)
+            continue
+
+        components = []  # type: List['TemplateComponent']
+        rule_to_slot = [[] for _ in rules]  # type: List[List[int]]
+        # Slots are mapped to rules by their index in the components, counting the components within all options of
+        # each Choice, see Template.resolve()
+        idx = 0
+        for text, optional in segments:
+            segment_components, segment_rule_to_slot = parse_template_text(multi_space_re.sub(" ", text), rules)
+            for slot_indices, segment_slot_indices in zip(rule_to_slot, segment_rule_to_slot):
+                slot_indices.extend(idx + slot_idx for slot_idx in segment_slot_indices)
+            idx += len(segment_components)
+            if optional:
+                components.append(Choice([segment_components, []]))
+            else:
+                components.extend(segment_components)
+
+        template = Template(components, list(zip(rules, rule_to_slot)), compiled_rules=compiled_rules)
+        # Add this template to the list for the relevant language
+        templates.setdefault(current_language, []).append(template)
 
     return templates, current_language, set(seen_what_types)
 
 
+def parse_template_text(text: str, rules: List[List[Matcher]]) -> Tuple[List[TemplateComponent], List[List[int]]]:
+    """
+    Parse the text of a template, without optional parts, into components.
+
+    :param text: template text, without a language specifier
+    :param rules: the rules of the template
+    :return: the components, and for each rule the indices of the slots that refer to it
+    """
+    components = []  # type: List['TemplateComponent']
+
+    # Generate list for mapping rules into template Slots
+    rule_to_slot = []  # type: List[List[int]]
+    for idx in range(len(rules)):
+        rule_to_slot.append([])
+
+    rest = text.strip()
+    while len(rest.strip()):
+        # Look for the next opening brace marking a substitution
+        literal_part, __, rest = rest.partition("{")
+        # Everything up to the brace is a literal
+        if len(literal_part) > 0:
+            # To make life easier for the aggregator, literals are split on whitespace here
+            for literal in literal_part.split():
+                components.append(Literal(literal))
+        # If no brace was found, we're done
+        if len(rest) > 0:
+            # Look for the closing brace
+            subst, closer, rest = rest.partition("}")
+            if not closer:
+                raise TemplateReadingError("closing brace missing in {}".format(text))
+            # Split up the substitution spec on commas, to allow various attributes and filters to be included
+            subst_parts = [p.strip() for p in subst.split(",")]
+
+            # First check if the first part is actually a literal.
+            if subst_parts[0][0] in ['"', "'"]:
+                if subst_parts[0][-1] != subst_parts[0][0]:
+                    raise TemplateReadingError("closing quote missing in {}".format(text))
+                field_name = subst_parts[0]
+                rule_ref = None
+            else:
+                # The first thing is the base value to substitute, which should be one of the fact fields
+                # or the new {time} slot, which refers to both when-fields
+                field_name = subst_parts[0]
+
+                # It may specify which of the facts it's referring to, though this is not required
+                # (default to first)
+                if "." in field_name:
+                    rule_ref, __, field_name = field_name.partition(".")
+                    # Use 1-indexed fact numbering in templates: makes more sense for anyone but
+                    # computer scientists
+                    rule_ref = int(rule_ref) - 1
+                    if rule_ref < 0:
+                        raise TemplateReadingError(
+                            "Rule references use 1-index numbering. Found reference to rule " "0: did you mean 1?"
+                        )
+                else:
+                    # Default to referring to the first rule, since there's usually only one
+                    rule_ref = 0
+
+                # Map alternative field names to their canonical form used internally
+                try:
+                    field_name = FACT_FIELD_MAP[field_name]
+                except KeyError:
+                    raise TemplateReadingError(
+                        "unknown fact field '{}' used in substitution ({})".format(field_name, subst)
+                    )
+
+                # Only some of the field names are allowed to be used in templates
+                # TODO: Remove or reinstate with allowed things received as params from "somewhere"
+                if field_name not in FACT_FIELDS:
+                    raise TemplateReadingError(
+                        "invalid field name '{}' for use in a template: {}".format(field_name, text)
+                    )
+
+                if rule_ref >= len(rules):
+                    raise TemplateReadingError(
+                        "Substitution '{}' refers to rule {}, but template only has {} "
+                        "rules".format(subst, rule_ref + 1, len(rules))
+                    )
+
+            attributes = {}
+            # Read each of the attribute specifications
+            for subst_part in subst_parts[1:]:
+                if "=" in subst_part:
+                    # Attributes specify things like case, to be used in realisation
+                    att, __, val = subst_part.partition("=")
+                    attributes[att.strip()] = val.strip()
+                else:
+                    raise TemplateReadingError(
+                        "Found an attribute with no value specified. "
+                        "Possibly a leftover old style filter? {}".format(subst_part)
+                    )
+
+            if field_name[0] in ["'", '"']:
+                to_value = LiteralSource(field_name[1:-1])
+            elif field_name == "time":
+                to_value = TimeSource()
+            else:
+                to_value = FactFieldSource(field_name)
+
+            # Postprocess attributes
+            attributes = process_attributes(attributes)
+
+            # len(components) is the index for the next component to be added
+            if rule_ref is not None:
+                rule_to_slot[rule_ref].append(len(components))
+            new_slot = Slot(to_value, attributes=attributes)
+            components.append(new_slot)
+
+    return components, rule_to_slot
+
+
 def parse_matcher_expr(constraint_line: str):
     rest = constraint_line
     while rest.strip():
@@ -534,6 +575,39 @@ def group_indented_lines(seq):
     yield " ".join(group)
 
 
+def split_optional_parts(line: str) -> Optional[List[Tuple[str, bool]]]:
+    """
+    Split a template line into the optional parts delimited by []s and the parts between them, along with whether each
+    part is optional.
+
+    Returns None if an optional part is not made up of whole words and substitutions, e.g. "{value}[,]", as such parts
+    can't be left out without changing the surrounding words. Such lines need to be expanded with
+    expand_alternatives() instead.
+
+    :param line: raw line
+    :return: list of (part, is optional) tuples, or None
+    """
+    segments = []
+    start = 0
+    while True:
+        open_idx = line.find("[", start)
+        if open_idx < 0:
+            segments.append((line[start:], False))
+            return segments
+        close_idx = line.find("]", open_idx + 1)
+        if close_idx < 0:
+            raise TemplateReadingError("unmatched square bracket in template line: {}".format(line))
+        if (
+            (open_idx > 0 and not line[open_idx - 1].isspace())
+            or (close_idx + 1 < len(line) and not line[close_idx + 1].isspace())
+            or line.count("{", 0, open_idx) != line.count("}", 0, open_idx)
+        ):
+            return None
+        segments.append((line[start:open_idx], False))
+        segments.append((line[open_idx + 1 : close_idx], True))
+        start = close_idx + 1
+
+
 def expand_alternatives(line):
     """
     Expand out a template line containing optional parts delimited by []s into multiple template lines
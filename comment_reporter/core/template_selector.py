@@ -1,10 +1,12 @@
+import heapq
 import logging
+from collections import defaultdict
 from functools import lru_cache
-from typing import Iterator, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple, Union
 
 from numpy.random import Generator
 
-from .models import DefaultTemplate, DocumentPlanNode, Message, Template
+from .models import DefaultTemplate, DocumentPlanNode, Message, MessageIndex, Template
 from .pipeline import NLGPipelineComponent
 from .registry import Registry
 
@@ -35,10 +37,13 @@ class TemplateSelector(NLGPipelineComponent):
         if log.isEnabledFor(logging.DEBUG):
             document_plan.print_tree()
 
-        templates = registry.get("templates")[language.lower()]
+        if "template-index" in registry:
+            template_index = registry.get("template-index")[language.lower()]
+        else:
+            template_index = TemplateIndex(registry.get("templates")[language.lower()])
 
-        template_checker = TemplateMessageChecker(templates, all_messages)
-        log.info("Selecting templates from {} templates".format(len(templates)))
+        template_checker = TemplateMessageChecker(template_index, all_messages)
+        log.info("Selecting templates from {} templates".format(len(template_index)))
         self._recurse(random, language, document_plan, all_messages, template_checker, None)
 
         return (document_plan,)
@@ -58,6 +63,9 @@ class TemplateSelector(NLGPipelineComponent):
         # Check all children of this root
         for child in this.children:
             if isinstance(child, Message):
+                # All the candidates from the index are checked, rather than picking one lazily, as the random choice
+                # is made over all the matching templates. This keeps the chosen templates, and thus the output for a
+                # given seed, identical to choosing from the full list of templates.
                 templates = list(template_checker.all_templates_for_message(child))
                 if len(templates) == 0:
                     # If there are no templates, something's gone horribly wrong
@@ -66,9 +74,15 @@ class TemplateSelector(NLGPipelineComponent):
                     log.error("Found no templates to express {}".format(child))
                     raise Exception("No template for message {}".format(child))
                 else:
-                    random.shuffle(templates)
-                    template = templates[0]
-                    self._add_template_to_message(child, template, all_messages)
+                    # Every version of every template is equally likely to be chosen
+                    variant = random.integers(sum(template.variant_count for template in templates))
+                    for template in templates:
+                        if variant < template.variant_count:
+                            break
+                        variant -= template.variant_count
+                    self._add_template_to_message(
+                        child, template, all_messages, template_checker.message_index, variant
+                    )
                     context = child
             else:
                 # This child is NOT a message and we should just recurse
@@ -76,7 +90,13 @@ class TemplateSelector(NLGPipelineComponent):
         return context
 
     @staticmethod
-    def _add_template_to_message(message: Message, template_original: Template, all_messages: List[Message]) -> None:
+    def _add_template_to_message(
+        message: Message,
+        template_original: Template,
+        all_messages: List[Message],
+        message_index: Optional[MessageIndex] = None,
+        variant: int = 0,
+    ) -> None:
         """
         Adds a matching template to a message, also adding the facts used by the template to the message.
 
@@ -84,10 +104,12 @@ class TemplateSelector(NLGPipelineComponent):
         :param template_original: The template to be added to the message.
         :param all_messages: Other available messages, some of which will be needed to match possible secondary rules
                in the template.
+        :param message_index: index of all_messages, for quickly finding the messages matching secondary rules
+        :param variant: the version of the template to use, see Template.resolve()
         :return: Nothing
         """
-        template = template_original.copy()
-        used_facts = template.fill(message, all_messages)
+        template = template_original.resolve(variant)
+        used_facts = template.fill(message, all_messages, message_index)
         if used_facts:
             log.debug("Successfully linked template to message")
         else:
@@ -105,15 +127,18 @@ class TemplateMessageChecker(object):
     Doesn't actually fill in templates, but just checks, for a given message (and a list of other available messages),
     whether there is a template that can be used to realise it.
 
-    Init with templates taken from the registry for the relevant language.
+    Init with templates taken from the registry for the relevant language, either as a list or as a TemplateIndex.
+    Only the templates the index deems candidates for a message are checked.
 
     The checks are cached on message and location_required.
 
     """
 
-    def __init__(self, templates: List[Template], all_messages: List[Message]) -> None:
+    def __init__(self, templates: Union[Sequence[Template], "TemplateIndex"], all_messages: List[Message]) -> None:
         self.all_messages = all_messages
-        self.templates = templates
+        self.index = templates if isinstance(templates, TemplateIndex) else TemplateIndex(templates)
+        self.templates = self.index.templates
+        self.message_index = MessageIndex(all_messages)
         self._cache = {}
 
     @lru_cache(maxsize=1024)
@@ -131,8 +156,51 @@ class TemplateMessageChecker(object):
         return True
 
     def all_templates_for_message(self, message: Message) -> Iterator[Template]:
-        for template in self.templates:
+        for template in self.index.candidates(message.main_fact.value_type):
             # See if the template can express this message (with the help of the other available messages)
-            if template.check(message, self.all_messages):
+            if template.check(message, self.all_messages, message_index=self.message_index):
                 # Got a matching template: this message can be expressed
                 yield template
+
+
+class TemplateIndex(object):
+    """
+    The templates of a language, indexed by the value_type their first rule requires of the primary message, as given
+    by a "value_type = ..." or a "value_type in {group}" constraint. Only the templates indexed under the message's
+    value_type, along with the templates whose first rule doesn't constrain the value_type to fixed values, can ever
+    match the message.
+
+    Candidates are returned in the original order of the templates, so that the index can be used in place of the
+    list of templates.
+    """
+
+    def __init__(self, templates: Sequence[Template]) -> None:
+        self.templates = list(templates)
+
+        buckets: Dict[str, List[int]] = defaultdict(list)
+        unindexed: List[int] = []
+        for position, template in enumerate(self.templates):
+            value_types = template.compiled_rules[0].value_types if template.compiled_rules else None
+            if value_types is None:
+                unindexed.append(position)
+            else:
+                for value_type in value_types:
+                    buckets[value_type].append(position)
+
+        self._unindexed = [self.templates[position] for position in unindexed]
+        self._candidates: Dict[str, List[Template]] = {
+            value_type: [self.templates[position] for position in heapq.merge(positions, unindexed)]
+            for value_type, positions in buckets.items()
+        }
+
+    def candidates(self, value_type: str) -> List[Template]:
+        """
+        The templates whose first rule may match a message with the given value_type.
+        """
+        if not isinstance(value_type, str):
+            # Matchers compare value_types as strings, which the index doesn't account for
+            return self.templates
+        return self._candidates.get(value_type, self._unindexed)
+
+    def __len__(self) -> int:
+        return len(self.templates)
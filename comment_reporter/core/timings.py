@@ -0,0 +1,160 @@
+"""
+Timing instrumentation.
+
+Timed operations (pipeline components, resource calls, analyzer requests, ...) are identified by a category and a name.
+Each measurement is recorded both into the Timings of the current request, if any, and into process-wide histograms.
+
+The Timings of a request are set for the current thread with timings_scope(). Worker threads started within the scope
+need to set them again, just like the analyzer deadline.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+# Upper bounds, in seconds, of the histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Timings(object):
+    """
+    Wall clock and CPU time spent on the timed operations of a single request, summed up per operation.
+    """
+
+    def __init__(self) -> None:
+        self._started = time.perf_counter()
+        # (category, name) -> [calls, wall time, CPU time or None if not measured]
+        self._entries: Dict[Tuple[str, str], List[Any]] = {}
+        self._errors: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+
+    def record(self, category: str, name: str, wall_time: float, cpu_time: Optional[float], failed: bool) -> None:
+        with self._lock:
+            entry = self._entries.setdefault((category, name), [0, 0.0, None])
+            entry[0] += 1
+            entry[1] += wall_time
+            if cpu_time is not None:
+                entry[2] = (entry[2] or 0.0) + cpu_time
+            if failed:
+                self._errors[(category, name)] = self._errors.get((category, name), 0) + 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        :return: dict from category to dict from name to the amount of calls, their total wall time and, if measured,
+            thread CPU time in seconds, and the amount of failed calls, if any. Also contains the time elapsed since
+            the Timings were created as "total_seconds".
+        """
+        output: Dict[str, Any] = {"total_seconds": time.perf_counter() - self._started}
+        with self._lock:
+            for (category, name), (calls, wall_time, cpu_time) in self._entries.items():
+                entry = {"calls": calls, "wall_seconds": wall_time}
+                if cpu_time is not None:
+                    entry["cpu_seconds"] = cpu_time
+                if (category, name) in self._errors:
+                    entry["errors"] = self._errors[(category, name)]
+                output.setdefault(category, {})[name] = entry
+        return output
+
+
+class HistogramSnapshot(NamedTuple):
+    buckets: Tuple[float, ...]
+    # Cumulative count of observations less than or equal to each bucket's upper bound
+    counts: Tuple[int, ...]
+    count: int
+    sum: float
+    errors: int
+
+
+class Histogram(object):
+    """
+    Thread-safe histogram of durations with fixed buckets, along with a count of failed operations.
+    """
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+        self.buckets = tuple(buckets)
+        self._counts = [0] * len(self.buckets)
+        self._count = 0
+        self._sum = 0.0
+        self._errors = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, failed: bool = False) -> None:
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            if idx < len(self._counts):
+                self._counts[idx] += 1
+            self._count += 1
+            self._sum += value
+            if failed:
+                self._errors += 1
+
+    def snapshot(self) -> HistogramSnapshot:
+        with self._lock:
+            counts = []
+            cumulative = 0
+            for count in self._counts:
+                cumulative += count
+                counts.append(cumulative)
+            return HistogramSnapshot(self.buckets, tuple(counts), self._count, self._sum, self._errors)
+
+
+_histograms: Dict[Tuple[str, str], Histogram] = {}
+_histograms_lock = threading.Lock()
+
+_timings_context = threading.local()
+
+
+@contextmanager
+def timings_scope(timings: Optional[Timings]) -> Iterator[None]:
+    """
+    Sets the Timings that operations timed by the current thread within the context are recorded into.
+    """
+    previous = current_timings()
+    _timings_context.timings = timings
+    try:
+        yield
+    finally:
+        _timings_context.timings = previous
+
+
+def current_timings() -> Optional[Timings]:
+    return getattr(_timings_context, "timings", None)
+
+
+def record(category: str, name: str, wall_time: float, cpu_time: Optional[float] = None, failed: bool = False) -> None:
+    timings = current_timings()
+    if timings is not None:
+        timings.record(category, name, wall_time, cpu_time, failed)
+
+    histogram = _histograms.get((category, name))
+    if histogram is None:
+        with _histograms_lock:
+            histogram = _histograms.setdefault((category, name), Histogram())
+    histogram.observe(wall_time, failed)
+
+
+@contextmanager
+def timed(category: str, name: str) -> Iterator[None]:
+    """
+    Records the wall clock time and the CPU time of the current thread spent within the context. CPU time spent by
+    other threads started within the context is not included. The operation is counted as failed if it raises.
+    """
+    start_wall, start_cpu = time.perf_counter(), time.thread_time()
+    failed = False
+    try:
+        yield
+    except BaseException:
+        failed = True
+        raise
+    finally:
+        record(category, name, time.perf_counter() - start_wall, time.thread_time() - start_cpu, failed)
+
+
+def histograms() -> Dict[Tuple[str, str], HistogramSnapshot]:
+    """
+    Snapshots of the process-wide histograms, keyed by (category, name).
+    """
+    with _histograms_lock:
+        items = list(_histograms.items())
+    return {key: histogram.snapshot() for key, histogram in items}
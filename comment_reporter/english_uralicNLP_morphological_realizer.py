@@ -3,42 +3,37 @@ from typing import Dict, Optional
 
 from uralicNLP import uralicApi
 
-from .core.models import Slot
-from .core.morphological_realizer import LanguageSpecificMorphologicalRealizer
+from .core.morphological_realizer import CachingMorphologicalRealizer, MorphologyCache
+from .uralicNLP_models import preload_models
 
 log = logging.getLogger("root")
 
 
-class EnglishUralicNLPMorphologicalRealizer(LanguageSpecificMorphologicalRealizer):
-    def __init__(self):
-        super().__init__("fi")
+class EnglishUralicNLPMorphologicalRealizer(CachingMorphologicalRealizer):
+    def __init__(self, cache: Optional[MorphologyCache] = None):
+        super().__init__("en", cache)
 
         self.case_map: Dict[str, str] = {"genitive": "GEN"}
 
-        if not uralicApi.is_language_installed("eng"):
-            uralicApi.download("eng")
+    def preload(self) -> None:
+        preload_models("eng")
 
-    def realize(self, slot: Slot) -> str:
-        case: Optional[str] = slot.attributes.get("case")
-        if case is None:
-            return slot.value
+    def normalize_case(self, case: str) -> str:
+        return self.case_map.get(case.lower(), case.upper())
 
-        log.debug("Realizing {} to Finnish")
+    def analyze(self, surface: str) -> Optional[str]:
+        log.debug("Analyzing {} in English".format(surface))
 
-        case = self.case_map.get(case.lower(), case.upper())
-        log.debug("Normalized case {} to {}".format(slot.attributes.get("case"), case))
-
-        possible_analyses = uralicApi.analyze(slot.value, "eng")
+        possible_analyses = uralicApi.analyze(surface, "eng")
         log.debug("Identified {} possible analyses".format(len(possible_analyses)))
         if len(possible_analyses) == 0:
-            log.warning(
-                "No valid morphological analysis for {}, unable to realize despite case attribute".format(slot.value)
-            )
-            return slot.value
+            return None
 
         analysis = possible_analyses[0][0]
-        log.debug("Picked {} as the morphological analysis of {}".format(analysis, slot.value))
+        log.debug("Picked {} as the morphological analysis of {}".format(analysis, surface))
+        return analysis
 
+    def generate(self, analysis: str, case: str) -> str:
         analysis = "{}+{}".format(analysis, case)
         log.debug("Modified analysis to {}".format(analysis))
 
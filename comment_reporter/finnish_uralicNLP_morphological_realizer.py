@@ -3,47 +3,42 @@ from typing import Dict, Optional
 
 from uralicNLP import uralicApi
 
-from .core.models import Slot
-from .core.morphological_realizer import LanguageSpecificMorphologicalRealizer
+from .core.morphological_realizer import CachingMorphologicalRealizer, MorphologyCache
+from .uralicNLP_models import preload_models
 
 log = logging.getLogger("root")
 
 
-class FinnishUralicNLPMorphologicalRealizer(LanguageSpecificMorphologicalRealizer):
-    def __init__(self):
-        super().__init__("fi")
+class FinnishUralicNLPMorphologicalRealizer(CachingMorphologicalRealizer):
+    def __init__(self, cache: Optional[MorphologyCache] = None):
+        super().__init__("fi", cache)
         self.case_map: Dict[str, str] = {"ssa": "Ine", "ssä": "Ine", "inessive": "Ine", "genitive": "Gen"}
 
-        if not uralicApi.is_language_installed("fin"):
-            uralicApi.download("fin")
+    def preload(self) -> None:
+        preload_models("fin")
 
-    def realize(self, slot: Slot) -> str:
-        case: Optional[str] = slot.attributes.get("case")
-        if case is None:
-            return slot.value
+    def normalize_case(self, case: str) -> str:
+        return self.case_map.get(case.lower(), case.capitalize())
 
-        log.debug("Realizing {} to Finnish".format(slot.value))
-
-        case = self.case_map.get(case.lower(), case.capitalize())
-        log.debug("Normalized case {} to {}".format(slot.attributes.get("case"), case))
+    def analyze(self, surface: str) -> Optional[str]:
+        log.debug("Analyzing {} in Finnish".format(surface))
 
         possible_analyses = [
             analysis[0]
-            for analysis in uralicApi.analyze(slot.value, "fin")
+            for analysis in uralicApi.analyze(surface, "fin")
             if "Nom" in analysis[0] and "Sg" in analysis[0]
         ]
         log.debug("Identified {} possible analyses".format(len(possible_analyses)))
         for analysis in possible_analyses:
             log.debug("\t{}".format(analysis))
         if len(possible_analyses) == 0:
-            log.warning(
-                "No valid morphological analysis for {}, unable to realize despite case attribute".format(slot.value)
-            )
-            return slot.value
+            return None
 
         analysis = possible_analyses[0]
-        log.debug("Picked {} as the morphological analysis of {}".format(analysis, slot.value))
+        log.debug("Picked {} as the morphological analysis of {}".format(analysis, surface))
+        return analysis
 
+    def generate(self, analysis: str, case: str) -> str:
         # We only want to replace the last occurence of "Nom", as otherwise all parts of compound words, rather than
         # only the last, get transformed to genitive. This is simply wrong for, e.g. "tyvipari". Simply doing a global
         # replacement results in *"tyvenparin", rather than "tyviparin". Unfortunately, python lacks a replace() which
@@ -0,0 +1,200 @@
+"""
+Metrics in the Prometheus text exposition format.
+
+Request metrics are collected by RequestMetrics, which the server updates for every request. Pipeline, resource and
+analyzer latencies come from the process-wide histograms of core.timings.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .core.timings import Histogram, HistogramSnapshot, histograms
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Prometheus metric names for the core.timings categories, the label names of their entries and what they measure
+_TIMING_METRICS = {
+    "stages": ("comment_reporter_pipeline_stage", ("pipeline", "stage"), "pipeline component runs"),
+    "resources": ("comment_reporter_resource", ("resource",), "resource calls, including waiting for a free slot"),
+    "analyzers": ("comment_reporter_analyzer_request", ("endpoint",), "analyzer queries, including retries"),
+}
+
+
+class RequestMetrics(object):
+    """
+    Counts and latencies of the requests served, per endpoint and status, and the amount of requests in flight.
+    """
+
+    def __init__(self) -> None:
+        self._latencies: Dict[Tuple[str, str, int], Histogram] = {}
+        self._in_flight: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def track(self, method: str, endpoint: str) -> Iterator["RequestStatus"]:
+        """
+        Tracks a request while within the context. The status the request was responded with must be set on the
+        yielded RequestStatus.
+        """
+        status = RequestStatus()
+        with self._lock:
+            self._in_flight[endpoint] = self._in_flight.get(endpoint, 0) + 1
+        start = time.perf_counter()
+        try:
+            yield status
+        finally:
+            duration = time.perf_counter() - start
+            with self._lock:
+                self._in_flight[endpoint] -= 1
+                histogram = self._latencies.setdefault((method, endpoint, status.code), Histogram())
+            histogram.observe(duration, failed=status.code >= 500)
+
+    def latencies(self) -> Dict[Tuple[str, str, int], HistogramSnapshot]:
+        with self._lock:
+            items = list(self._latencies.items())
+        return {key: histogram.snapshot() for key, histogram in items}
+
+    def in_flight(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._in_flight)
+
+
+class RequestStatus(object):
+    def __init__(self) -> None:
+        # Anything that fails before the status is set is an internal error
+        self.code = 500
+
+
+def render(request_metrics: RequestMetrics, cache_stats: Dict[str, Dict[str, float]]) -> str:
+    """
+    Renders all metrics in the Prometheus text exposition format.
+
+    :param cache_stats: analysis cache statistics per resource, as returned by CommentReportNlgService.get_cache_stats()
+    """
+    lines: List[str] = []
+
+    latencies = request_metrics.latencies()
+    _add_counter(
+        lines,
+        "comment_reporter_http_requests_total",
+        "Requests served, per endpoint and status.",
+        {
+            _labels(method=method, endpoint=endpoint, status=str(status)): s.count
+            for (method, endpoint, status), s in latencies.items()
+        },
+    )
+    _add_histograms(
+        lines,
+        "comment_reporter_http_request_duration_seconds",
+        "Time taken to serve requests, per endpoint and status.",
+        {
+            _labels(method=method, endpoint=endpoint, status=str(status)): s
+            for (method, endpoint, status), s in latencies.items()
+        },
+    )
+    _add_gauge(
+        lines,
+        "comment_reporter_http_requests_in_flight",
+        "Requests currently being served, per endpoint.",
+        {_labels(endpoint=endpoint): count for endpoint, count in request_metrics.in_flight().items()},
+    )
+
+    snapshots = histograms()
+    for category, (metric, label_names, description) in _TIMING_METRICS.items():
+        entries = {
+            _labels(**dict(zip(label_names, name.split("/", len(label_names) - 1)))): snapshot
+            for (snapshot_category, name), snapshot in snapshots.items()
+            if snapshot_category == category
+        }
+        _add_histograms(lines, metric + "_duration_seconds", "Time taken by {}.".format(description), entries)
+        _add_counter(
+            lines,
+            metric + "_errors_total",
+            "Failed {}.".format(description),
+            {labels: snapshot.errors for labels, snapshot in entries.items()},
+        )
+
+    for stat, metric, metric_type, help_text in (
+        ("size", "comment_reporter_analysis_cache_size", "gauge", "Entries in the analysis cache."),
+        ("hits", "comment_reporter_analysis_cache_hits_total", "counter", "Analysis cache hits."),
+        ("misses", "comment_reporter_analysis_cache_misses_total", "counter", "Analysis cache misses."),
+        ("hit_ratio", "comment_reporter_analysis_cache_hit_ratio", "gauge", "Analysis cache hit ratio."),
+    ):
+        _add_metric(
+            lines,
+            metric,
+            metric_type,
+            help_text,
+            {_labels(resource=resource): stats[stat] for resource, stats in cache_stats.items()},
+        )
+
+    rss = _resident_memory_bytes()
+    if rss is not None:
+        _add_gauge(lines, "process_resident_memory_bytes", "Resident memory size in bytes.", {"": rss})
+
+    return "\n".join(lines) + "\n"
+
+
+def _add_metric(lines: List[str], name: str, metric_type: str, help_text: str, values: Dict[str, float]) -> None:
+    if not values:
+        return
+    lines.append("# HELP {} {}".format(name, help_text))
+    lines.append("# TYPE {} {}".format(name, metric_type))
+    for labels, value in sorted(values.items()):
+        lines.append("{}{} {}".format(name, _braces(labels), _format_value(value)))
+
+
+def _add_counter(lines: List[str], name: str, help_text: str, values: Dict[str, float]) -> None:
+    _add_metric(lines, name, "counter", help_text, values)
+
+
+def _add_gauge(lines: List[str], name: str, help_text: str, values: Dict[str, float]) -> None:
+    _add_metric(lines, name, "gauge", help_text, values)
+
+
+def _add_histograms(lines: List[str], name: str, help_text: str, snapshots: Dict[str, HistogramSnapshot]) -> None:
+    if not snapshots:
+        return
+    lines.append("# HELP {} {}".format(name, help_text))
+    lines.append("# TYPE {} histogram".format(name))
+    for labels, snapshot in sorted(snapshots.items()):
+        for bucket, count in zip(snapshot.buckets, snapshot.counts):
+            bucket_labels = _join_labels(labels, _labels(le=_format_value(bucket)))
+            lines.append("{}_bucket{} {}".format(name, _braces(bucket_labels), count))
+        lines.append("{}_bucket{} {}".format(name, _braces(_join_labels(labels, 'le="+Inf"')), snapshot.count))
+        lines.append("{}_sum{} {}".format(name, _braces(labels), _format_value(snapshot.sum)))
+        lines.append("{}_count{} {}".format(name, _braces(labels), snapshot.count))
+
+
+def _labels(**labels: str) -> str:
+    return ",".join('{}="{}"'.format(key, _escape(value)) for key, value in labels.items())
+
+
+def _join_labels(*labels: str) -> str:
+    return ",".join(label for label in labels if label)
+
+
+def _braces(labels: str) -> str:
+    return "{{{}}}".format(labels) if labels else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float) and value.is_integer():
+        return "{:.1f}".format(value)
+    return repr(value)
+
+
+def _resident_memory_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        # Not on Linux
+        return None
@@ -0,0 +1,22 @@
+import hashlib
+from typing import Hashable
+
+from cachetools import TTLCache
+
+from ..core.cache import ThreadSafeCache
+
+
+class AnalysisCache(ThreadSafeCache):
+    """
+    Bounded cache of per-comment analyzer results.
+
+    Entries are keyed by a hash of the comment's text and language, and are evicted either when they are older than
+    `ttl` seconds or, once the cache is full, in least recently used order.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        super().__init__(TTLCache(maxsize=maxsize, ttl=ttl))
+
+    @staticmethod
+    def key(language: str, comment: str) -> Hashable:
+        return hashlib.blake2b("{}\0{}".format(language, comment).encode("utf-8"), digest_size=16).digest()
@@ -0,0 +1,115 @@
+import threading
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from ..config import NearDuplicatesConfig, get_config
+from .near_duplicates import MinHashLSH
+
+
+class CommentBatch(list):
+    """
+    The list of comments a report is generated about, along with its deduplicated version.
+
+    Behaves exactly like the original list of comments, so resources that need all comments (e.g. for counting) can use
+    it as such. Resources querying analyzers that produce a result per comment should only send the `unique` comments
+    and then `expand()` the results back to cover the whole list.
+
+    Expensive corpus-level analyzers (summarization, topic modeling) can further be given only one representative of
+    each cluster of near-duplicate comments, with `expand_clusters()` mapping per-representative results back. As
+    near-duplicates are clustered transitively, a representative may stand in for comments that are less similar to
+    it than the configured threshold, see near_duplicates.
+    """
+
+    def __init__(self, comments: Iterable[str]) -> None:
+        super().__init__(comments)
+
+        positions: Dict[str, int] = {}
+        self.unique: List[str] = []
+        # For each comment, the index of the comment in `unique`
+        self.inverse: List[int] = []
+        for comment in self:
+            position = positions.get(comment)
+            if position is None:
+                position = len(self.unique)
+                positions[comment] = position
+                self.unique.append(comment)
+            self.inverse.append(position)
+
+        self._clusters: Optional[List[List[int]]] = None
+        self._clusters_lock = threading.Lock()
+        self._items_saved = 0
+        self._lock = threading.Lock()
+
+    @property
+    def duplicate_count(self) -> int:
+        return len(self) - len(self.unique)
+
+    @property
+    def items_saved(self) -> int:
+        """
+        Total amount of comments that were not sent to analyzers because they were duplicates or near-duplicates.
+        """
+        return self._items_saved
+
+    def expand(self, unique_results: Sequence[Any]) -> List[Any]:
+        """
+        Maps a list of per-comment results for the `unique` comments to a list of results for all comments.
+        """
+        if len(unique_results) != len(self.unique):
+            raise ValueError("Expected {} results, got {}".format(len(self.unique), len(unique_results)))
+        return [unique_results[position] for position in self.inverse]
+
+    def near_duplicate_clusters(self) -> List[List[int]]:
+        """
+        Clusters of near-duplicate comments, as lists of indices into this list. Clusters are ordered by their first
+        comment's position, and each cluster contains at least all exact duplicates of its first comment. If
+        near-duplicate detection is disabled, every comment is its own cluster.
+
+        Computed once, on first use.
+        """
+        with self._clusters_lock:
+            if self._clusters is None:
+                config = get_config().near_duplicates
+                if not config.enabled:
+                    self._clusters = [[idx] for idx in range(len(self))]
+                else:
+                    unique_clusters = _minhash_lsh(config).cluster(self.unique)
+                    cluster_of_unique = [0] * len(self.unique)
+                    for cluster_idx, unique_cluster in enumerate(unique_clusters):
+                        for position in unique_cluster:
+                            cluster_of_unique[position] = cluster_idx
+                    self._clusters = [[] for _ in unique_clusters]
+                    for idx, position in enumerate(self.inverse):
+                        self._clusters[cluster_of_unique[position]].append(idx)
+            return self._clusters
+
+    def cluster_representatives(self) -> List[str]:
+        return [self[cluster[0]] for cluster in self.near_duplicate_clusters()]
+
+    def cluster_sizes(self) -> List[int]:
+        return [len(cluster) for cluster in self.near_duplicate_clusters()]
+
+    def expand_clusters(self, representative_results: Sequence[Any]) -> List[Any]:
+        """
+        Maps a list of results for the `cluster_representatives()` to a list of results for all comments, so that
+        statistics computed over the results are weighted by the cluster sizes.
+        """
+        clusters = self.near_duplicate_clusters()
+        if len(representative_results) != len(clusters):
+            raise ValueError("Expected {} results, got {}".format(len(clusters), len(representative_results)))
+        results: List[Any] = [None] * len(self)
+        for cluster, result in zip(clusters, representative_results):
+            for idx in cluster:
+                results[idx] = result
+        return results
+
+    def record_items_saved(self, amount: int) -> None:
+        with self._lock:
+            self._items_saved += amount
+
+
+@lru_cache(maxsize=4)
+def _minhash_lsh(config: NearDuplicatesConfig) -> MinHashLSH:
+    return MinHashLSH(
+        threshold=config.threshold, num_perm=config.num_perm, bands=config.bands, shingle_size=config.shingle_size
+    )
@@ -4,7 +4,6 @@ from typing import List, Type
 import string
 
 from nltk import sent_tokenize
-import requests
 
 from ..core.models import Fact, Message
 from ..core.realize_slots import SlotRealizerComponent
@@ -24,7 +23,12 @@ class GeneralSummaryResource(ProcessorResource):
         return TEMPLATE
 
     def generate_messages(self, language: str, comments: List[str]) -> List[Message]:
-        summary = self._query_model(language, comments)["summary"]
+        # Only one representative of each cluster of near-duplicate comments is summarized, which keeps the request
+        # small when the comments are e.g. flooded by bots.
+        batch = self.as_comment_batch(comments)
+        representatives = batch.cluster_representatives()
+        summary = self._query_model(language, representatives)["summary"]
+        batch.record_items_saved(len(batch) - len(representatives))
         summary = [
             sentence + "." if sentence.strip()[-1] not in string.punctuation else sentence for sentence in summary
         ]
@@ -37,7 +41,7 @@ class GeneralSummaryResource(ProcessorResource):
     def _query_model(self, language: str, comments: List[str]):
         sentences = list(chain(*[sent_tokenize(comment) for comment in comments]))
         log.info(f"comments as sentenced: {sentences}")
-        response = requests.post(
+        response = self.post(
             self.read_config_language_value("SUMMARIZATION", language, allow_none=False),
             json={"comments": sentences, "count": 5},
         )
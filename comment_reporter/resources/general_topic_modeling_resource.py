@@ -4,8 +4,6 @@ from collections import defaultdict
 from itertools import chain
 from typing import List, Type, Optional
 
-import requests
-
 from ..core.models import Fact, Message
 from ..core.realize_slots import SlotRealizerComponent
 from .processor_resource import ProcessorResource
@@ -58,7 +56,11 @@ class GeneralTopicModelingResource(ProcessorResource):
         return None
 
     def _gen_messages_most_common_topic(
-        self, language: str, comments: List[str], labels: List[List[str]]
+        self,
+        language: str,
+        labels: List[List[str]],
+        representatives: List[str],
+        representative_labels: List[List[str]],
     ) -> List[Message]:
         label = self._nth_most_common_label(labels, 0)
         if label is None:
@@ -70,7 +72,9 @@ class GeneralTopicModelingResource(ProcessorResource):
         prevalence_msg = Message(Fact(prevalence, "most_common_topic:prevalence", 6_08))
 
         comments_with_labels = [
-            comment for (comment, comment_labels) in zip(comments, labels) if label in comment_labels
+            comment
+            for (comment, comment_labels) in zip(representatives, representative_labels)
+            if label in comment_labels
         ]
         summary = self._query_summarizer(language, comments_with_labels)
         if summary is not None:
@@ -81,7 +85,11 @@ class GeneralTopicModelingResource(ProcessorResource):
         return [name_msg, prevalence_msg, summary_msg]
 
     def _gen_messages_second_most_common_topic(
-        self, language: str, comments: List[str], labels: List[List[str]]
+        self,
+        language: str,
+        labels: List[List[str]],
+        representatives: List[str],
+        representative_labels: List[List[str]],
     ) -> List[Message]:
         label = self._nth_most_common_label(labels, 1)
         if label is None:
@@ -93,7 +101,9 @@ class GeneralTopicModelingResource(ProcessorResource):
         prevalence_msg = Message(Fact(prevalence, "second_most_common_topic:prevalence", 5_08))
 
         comments_with_labels = [
-            comment for (comment, comment_labels) in zip(comments, labels) if label in comment_labels
+            comment
+            for (comment, comment_labels) in zip(representatives, representative_labels)
+            if label in comment_labels
         ]
         summary = self._query_summarizer(language, comments_with_labels)
         if summary is not None:
@@ -114,18 +124,28 @@ class GeneralTopicModelingResource(ProcessorResource):
         # still does a thing where each label is in the form of "label_top<idx> : <label name>" so we have to remove
         # that first part as extraneous. Optimally, the API would be changed, but I don't have time to arrange for
         # that, so instead we'll stick with this weird stuff.
-        topic_data = self._query_topic_model(language, comments)
+        #
+        # Only one representative of each cluster of near-duplicate comments is sent to the topic model. The labels of
+        # the representatives are then copied over to the whole cluster, so that the prevalences are still computed
+        # over all comments.
+        batch = self.as_comment_batch(comments)
+        representatives = batch.cluster_representatives()
+        topic_data = self._query_topic_model(language, representatives)
         if topic_data is None:
             return []
-        labels = [
+        batch.record_items_saved(len(batch) - len(representatives))
+        representative_labels = [
             [label.split(" : ")[1] for label in json.loads(label_list.replace("'", '"'))]
             for label_list in topic_data["suggested_label"]
         ]
-        # labels now looks like [["label1", "label2"], ["label1", "label3"]]
+        # representative_labels now looks like [["label1", "label2"], ["label1", "label3"]]
+        labels = batch.expand_clusters(representative_labels)
 
         messages: List[Message] = []
-        messages.extend(self._gen_messages_most_common_topic(language, comments, labels))
-        messages.extend(self._gen_messages_second_most_common_topic(language, comments, labels))
+        messages.extend(self._gen_messages_most_common_topic(language, labels, representatives, representative_labels))
+        messages.extend(
+            self._gen_messages_second_most_common_topic(language, labels, representatives, representative_labels)
+        )
         return [m for m in messages if m is not None]
 
     def slot_realizer_components(self) -> List[Type[SlotRealizerComponent]]:
@@ -136,7 +156,7 @@ class GeneralTopicModelingResource(ProcessorResource):
         url = self.read_config_language_value("TOPIC_MODEL", language, allow_none=True)
         if url is None:
             return None
-        response = requests.post(url, json={"texts": comments})
+        response = self.post(url, json={"texts": comments})
         log.info(f"{response}, {response.reason}, {response.text}")
         return response.json()
 
@@ -144,6 +164,6 @@ class GeneralTopicModelingResource(ProcessorResource):
         url = self.read_config_language_value("SUMMARIZATION", language, allow_none=True)
         if url is None:
             return None
-        response = requests.post(url, json={"comments": comments, "count": 1})
+        response = self.post(url, json={"comments": comments, "count": 1})
         log.info(f"{response}, {response.reason}, {response.text}")
         return response.json()["summary"]
@@ -1,8 +1,6 @@
 import logging
 from typing import List, Type, Optional
 
-import requests
-
 from ..core.models import Fact, Message
 from ..core.realize_slots import SlotRealizerComponent
 from .processor_resource import ProcessorResource
@@ -47,11 +45,15 @@ def _generate_hate_speech_blocked_example(
 
 
 class HateSpeechResource(ProcessorResource):
+
+    ANALYZER_CONFIG_GROUP = "HATESPEECH"
+    CACHE_ANALYSIS_RESULTS = True
+
     def templates_string(self) -> str:
         return TEMPLATE
 
     def generate_messages(self, language: str, comments: List[str]) -> List[Message]:
-        hate_speech_data = self._query_model(language, comments)
+        hate_speech_data = self.analyze_comments(language, comments, ("labels", "confidences"), self._query_model)
         labels = hate_speech_data["labels"]
         confidences = hate_speech_data["confidences"]
         messages: List[Message] = [
@@ -67,8 +69,9 @@ class HateSpeechResource(ProcessorResource):
 
     def _query_model(self, language: str, comments: List[str]):
         log.info(f"comments: {comments}")
-        response = requests.post(
-            self.read_config_language_value("HATESPEECH", language, allow_none=False), json={"texts": comments}
+        response = self.post(
+            self.read_config_language_value(self.ANALYZER_CONFIG_GROUP, language, allow_none=False),
+            json={"texts": comments},
         )
         log.info(f"{response}, {response.reason}, {response.text}")
         return response.json()
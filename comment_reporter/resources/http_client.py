@@ -0,0 +1,226 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from ..core.timings import record
+
+log = logging.getLogger("root")
+
+
+class AnalyzerUnavailableError(Exception):
+    """
+    Raised when an analyzer could not be queried successfully. Reports can be generated without the resource that
+    needed the analyzer.
+    """
+
+    pass
+
+
+class DeadlineExceededError(AnalyzerUnavailableError):
+    pass
+
+
+class CircuitOpenError(AnalyzerUnavailableError):
+    pass
+
+
+_deadline_context = threading.local()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[float]) -> Iterator[None]:
+    """
+    Sets the deadline, as a time.monotonic() timestamp, for all analyzer requests made by the current thread within
+    the context. Worker threads started within the context need to set the deadline again.
+    """
+    previous = current_deadline()
+    _deadline_context.deadline = deadline
+    try:
+        yield
+    finally:
+        _deadline_context.deadline = previous
+
+
+def current_deadline() -> Optional[float]:
+    return getattr(_deadline_context, "deadline", None)
+
+
+def remaining_time(deadline: Optional[float]) -> Optional[float]:
+    """
+    Seconds left until the deadline, or None if there is no deadline. Raises a DeadlineExceededError if there is no
+    time left.
+    """
+    if deadline is None:
+        return None
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceededError("Deadline exceeded")
+    return remaining
+
+
+class CircuitBreaker(object):
+    """
+    Stops requests to an analyzer after `failure_threshold` consecutive failed requests. Once `reset_timeout` seconds
+    have passed, a single request is let through: if it succeeds, the circuit is closed again, otherwise it stays open
+    for another `reset_timeout` seconds.
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def before_request(self) -> None:
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError("Circuit breaker is open")
+            # Let this single request through as a trial, keeping the circuit open for everyone else
+            self._opened_at = time.monotonic()
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+
+
+class AnalyzerClient(object):
+    """
+    HTTP client shared by all the analyzer resources.
+
+    Keeps a pool of keep-alive connections per analyzer host, so that consecutive requests to the same analyzer reuse
+    an already open connection. Requests are subject to a connect and a read timeout, and requests that fail due to
+    connection problems, timeouts or a temporarily unavailable analyzer are retried with an exponential backoff.
+
+    Timeouts and retries are further limited by the deadline set with deadline_scope(), if any. Each analyzer endpoint
+    has its own circuit breaker, so that an analyzer that keeps failing is not queried at all for a while.
+
+    The underlying requests.Session is safe to use from multiple threads for the kind of simple POST requests made
+    here.
+    """
+
+    RETRY_STATUSES = frozenset([502, 503, 504])
+
+    def __init__(
+        self,
+        connect_timeout: float = 3.05,
+        read_timeout: float = 60.0,
+        retries: int = 2,
+        backoff_factor: float = 0.5,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        circuit_failure_threshold: int = 5,
+        circuit_reset_timeout: float = 30.0,
+    ) -> None:
+        """
+        :param connect_timeout: seconds to wait for a connection to an analyzer to be established
+        :param read_timeout: seconds to wait for an analyzer to send its response
+        :param retries: how many times a failed request is retried before giving up
+        :param backoff_factor: retry n is made after waiting for backoff_factor * 2 ** n seconds
+        :param pool_connections: number of analyzer hosts to keep connection pools for
+        :param pool_maxsize: maximum number of kept-alive connections per analyzer host
+        :param circuit_failure_threshold: consecutive failed requests after which an endpoint's circuit is opened
+        :param circuit_reset_timeout: seconds after which an open circuit lets a trial request through
+        """
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.circuit_failure_threshold = circuit_failure_threshold
+        self.circuit_reset_timeout = circuit_reset_timeout
+
+        self._circuit_breakers: Dict[str, CircuitBreaker] = {}
+        self._circuit_breakers_lock = threading.Lock()
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def circuit_breaker(self, url: str) -> CircuitBreaker:
+        with self._circuit_breakers_lock:
+            breaker = self._circuit_breakers.get(url)
+            if breaker is None:
+                breaker = CircuitBreaker(self.circuit_failure_threshold, self.circuit_reset_timeout)
+                self._circuit_breakers[url] = breaker
+            return breaker
+
+    def post(self, url: str, json: Dict[str, Any]) -> requests.Response:
+        """
+        Queries the analyzer at `url`. The time taken, including any retries, is recorded in the timings under the
+        "analyzers" category.
+
+        Raises an AnalyzerUnavailableError if the analyzer could not be reached or did not respond with a 2xx status,
+        after any retries.
+        """
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = self._post(url, json)
+            failed = False
+            return response
+        finally:
+            record("analyzers", url, time.perf_counter() - start, failed=failed)
+
+    def _post(self, url: str, json: Dict[str, Any]) -> requests.Response:
+        deadline = current_deadline()
+        breaker = self.circuit_breaker(url)
+        try:
+            breaker.before_request()
+        except CircuitOpenError:
+            raise CircuitOpenError("Circuit breaker for {} is open".format(url))
+
+        attempt = 0
+        while True:
+            remaining = remaining_time(deadline)
+            connect_timeout, read_timeout = self.connect_timeout, self.read_timeout
+            if remaining is not None:
+                connect_timeout, read_timeout = min(connect_timeout, remaining), min(read_timeout, remaining)
+
+            try:
+                response = self._session.post(url, json=json, timeout=(connect_timeout, read_timeout))
+                if 200 <= response.status_code < 300:
+                    breaker.record_success()
+                    return response
+                if response.status_code not in self.RETRY_STATUSES or attempt >= self.retries:
+                    # The response has no usable result, so the analyzer is treated as unavailable just like when it
+                    # can't be reached at all
+                    breaker.record_failure()
+                    raise AnalyzerUnavailableError("Analyzer at {} responded with {}".format(url, response.status_code))
+                log.warning("Analyzer at {} responded with {}".format(url, response.status_code))
+            except (requests.ConnectionError, requests.Timeout) as ex:
+                if attempt >= self.retries:
+                    breaker.record_failure()
+                    if deadline is not None and time.monotonic() >= deadline:
+                        raise DeadlineExceededError("Deadline exceeded while querying {}".format(url)) from ex
+                    raise AnalyzerUnavailableError("Request to {} failed: {}".format(url, ex)) from ex
+                log.warning("Request to analyzer at {} failed: {}".format(url, ex))
+
+            delay = self.backoff_factor * 2 ** attempt
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                breaker.record_failure()
+                raise DeadlineExceededError("Deadline exceeded while retrying request to {}".format(url))
+            attempt += 1
+            log.info("Retrying request to {} in {:.2f}s (retry {}/{})".format(url, delay, attempt, self.retries))
+            time.sleep(delay)
+
+    def close(self) -> None:
+        self._session.close()
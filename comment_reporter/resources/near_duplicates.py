@@ -0,0 +1,114 @@
+"""
+Near-duplicate detection for comments, using MinHash signatures and locality sensitive hashing (LSH).
+
+Each comment is represented by the set of character shingles (n-grams) of its normalized text. The Jaccard similarity
+of two such sets is estimated by the fraction of equal values in the comments' MinHash signatures. To avoid comparing
+all pairs of comments, the signatures are split into bands, and only comments sharing an identical band are compared.
+Comments whose estimated similarity reaches the threshold are joined into the same cluster.
+
+The clustering is an approximation. Within each bucket of comments sharing a band, only the first comment is compared
+with the others. Clusters are then joined transitively: if A is similar to B and B to C, all three end up in the same
+cluster even if A and C are much less similar than the threshold. The comments of a cluster are represented by its
+first comment, e.g. they all get the first comment's topic labels, so a long chain of edits can make a representative
+stand in for comments it no longer resembles.
+"""
+import logging
+import re
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+log = logging.getLogger("root")
+
+# Mersenne prime 2^31 - 1. Shingle hashes are reduced modulo this, so the products in the hash functions fit in 64 bits
+_PRIME = np.uint64((1 << 31) - 1)
+
+_whitespace_re = re.compile(r"\s+")
+
+
+class MinHashLSH(object):
+    def __init__(
+        self, threshold: float = 0.8, num_perm: int = 128, bands: int = 16, shingle_size: int = 5, seed: int = 1
+    ) -> None:
+        """
+        :param threshold: estimated Jaccard similarity at or above which two comments are near-duplicates
+        :param num_perm: amount of hash functions, i.e. length of the MinHash signatures
+        :param bands: amount of LSH bands the signatures are split into. Must divide num_perm.
+        :param shingle_size: length of the character n-grams the comments are split into
+        :param seed: seed for generating the hash functions
+        """
+        if num_perm % bands != 0:
+            raise ValueError("num_perm ({}) must be divisible by bands ({})".format(num_perm, bands))
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, size=num_perm, dtype=np.uint64)[:, None]
+        self._b = rng.integers(0, _PRIME, size=num_perm, dtype=np.uint64)[:, None]
+
+    def shingles(self, text: str) -> np.ndarray:
+        text = _whitespace_re.sub(" ", text.strip().lower())
+        if len(text) <= self.shingle_size:
+            grams = {text}
+        else:
+            grams = {text[idx : idx + self.shingle_size] for idx in range(len(text) - self.shingle_size + 1)}
+        return np.fromiter((zlib.crc32(gram.encode("utf-8")) for gram in grams), dtype=np.uint64) % _PRIME
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = self.shingles(text)
+        return ((self._a * hashes[None, :] + self._b) % _PRIME).min(axis=1)
+
+    def cluster(self, texts: Sequence[str]) -> List[List[int]]:
+        """
+        Groups the texts into clusters of near-duplicates.
+
+        Near-duplicates are joined transitively, so not every pair of texts within a cluster need be similar, see the
+        module docstring.
+
+        :return: clusters as lists of indices into `texts`. Both the clusters and the indices within a cluster are in
+            order of first occurrence, so the first index of each cluster is a natural representative.
+        """
+        if not texts:
+            return []
+
+        signatures = np.vstack([self.signature(text) for text in texts])
+        parents = list(range(len(texts)))
+
+        def find(idx: int) -> int:
+            while parents[idx] != idx:
+                parents[idx] = parents[parents[idx]]
+                idx = parents[idx]
+            return idx
+
+        compared = set()
+        for band in range(self.bands):
+            buckets: Dict[bytes, List[int]] = defaultdict(list)
+            band_signatures = signatures[:, band * self.rows : (band + 1) * self.rows]
+            for idx in range(len(texts)):
+                buckets[band_signatures[idx].tobytes()].append(idx)
+
+            for members in buckets.values():
+                first = members[0]
+                for other in members[1:]:
+                    pair: Tuple[int, int] = (first, other)
+                    if pair in compared:
+                        continue
+                    compared.add(pair)
+                    root_first, root_other = find(first), find(other)
+                    if root_first == root_other:
+                        continue
+                    similarity = float(np.mean(signatures[first] == signatures[other]))
+                    if similarity >= self.threshold:
+                        # Smaller index as the root, so that the root is always the cluster's first occurrence
+                        parents[max(root_first, root_other)] = min(root_first, root_other)
+
+        clusters: Dict[int, List[int]] = {}
+        for idx in range(len(texts)):
+            clusters.setdefault(find(idx), []).append(idx)
+        log.debug("Clustered {} texts into {} near-duplicate clusters".format(len(texts), len(clusters)))
+        return list(clusters.values())
@@ -1,16 +1,45 @@
-import configparser
+import threading
 from abc import ABC, abstractmethod
-from pathlib import Path
-from typing import List, Type, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence, Type
 
+import requests
+
+from ..config import HttpConfig, get_config
 from ..core.models import Message
 from ..core.realize_slots import SlotRealizerComponent
+from ..core.timings import current_timings, timed, timings_scope
+from .analysis_cache import AnalysisCache
+from .comment_batch import CommentBatch
+from .http_client import AnalyzerClient, DeadlineExceededError, current_deadline, deadline_scope, remaining_time
 
 
 class ProcessorResource(ABC):
 
     EPSILON = 0.00000001
 
+    # Config group of the analyzer queried by analyze_comments(). Used to look up the analyzer specific chunk size.
+    ANALYZER_CONFIG_GROUP: Optional[str] = None
+
+    # Whether per-comment analyzer results, as returned by analyze_comments(), are cached between reports
+    CACHE_ANALYSIS_RESULTS = False
+
+    # A single client, and thus a single set of connection pools, is shared by all resources. It is rebuilt if the
+    # HTTP configuration changes.
+    _http_client: Optional[AnalyzerClient] = None
+    _http_client_config: Optional[HttpConfig] = None
+    _http_client_lock = threading.Lock()
+
+    def __init__(self) -> None:
+        # Upper limit on how many generate_messages calls (and thus analyzer queries) of a single resource may be
+        # in flight at the same time, across all concurrently served reports.
+        config = get_config()
+        self._in_flight = threading.BoundedSemaphore(config.http.max_in_flight)
+
+        self._analysis_cache: Optional[AnalysisCache] = None
+        if self.CACHE_ANALYSIS_RESULTS and config.cache.enabled:
+            self._analysis_cache = AnalysisCache(config.cache.maxsize, config.cache.ttl)
+
     @abstractmethod
     def templates_string(self) -> str:
         pass
@@ -19,26 +48,156 @@ class ProcessorResource(ABC):
     def generate_messages(self, language: str, comments: List[str]) -> List[Message]:
         pass
 
+    def bounded_generate_messages(self, language: str, comments: List[str]) -> List[Message]:
+        """
+        Like generate_messages(), but blocks while too many calls to this resource are already running. Gives up with a
+        DeadlineExceededError if the current deadline passes while waiting. The time taken, including the wait, is
+        recorded in the timings under the "resources" category.
+        """
+        with timed("resources", self.__class__.__name__):
+            if not self._in_flight.acquire(timeout=remaining_time(current_deadline())):
+                raise DeadlineExceededError("Deadline exceeded while waiting for {}".format(self.__class__.__name__))
+            try:
+                return self.generate_messages(language, comments)
+            finally:
+                self._in_flight.release()
+
     @abstractmethod
     def slot_realizer_components(self) -> List[Type[SlotRealizerComponent]]:
         pass
 
+    @staticmethod
+    def as_comment_batch(comments: List[str]) -> CommentBatch:
+        return comments if isinstance(comments, CommentBatch) else CommentBatch(comments)
+
+    def analyze_comments(
+        self,
+        language: str,
+        comments: List[str],
+        fields: Sequence[str],
+        query: Callable[[str, List[str]], Dict[str, List[Any]]],
+    ) -> Dict[str, List[Any]]:
+        """
+        Runs an analyzer that produces a result per comment. If `comments` is a CommentBatch, duplicate comments are
+        only sent to the analyzer once. Comments found in the cache are not sent at all.
+
+        :param fields: names of the per-comment result lists in the analyzer's response
+        :param query: function querying the analyzer for the given comments
+        :return: dict from field name to a list of results, in the same order as `comments`
+        """
+        if isinstance(comments, CommentBatch) and comments.duplicate_count:
+            unique_results = self._analyze_unique_comments(language, comments.unique, fields, query)
+            comments.record_items_saved(comments.duplicate_count)
+            return {field: comments.expand(unique_results[field]) for field in fields}
+        return self._analyze_unique_comments(language, comments, fields, query)
+
+    def _analyze_unique_comments(
+        self,
+        language: str,
+        comments: List[str],
+        fields: Sequence[str],
+        query: Callable[[str, List[str]], Dict[str, List[Any]]],
+    ) -> Dict[str, List[Any]]:
+        if self._analysis_cache is None:
+            return self._query_in_chunks(language, comments, fields, query)
+
+        keys = [self._analysis_cache.key(language, comment) for comment in comments]
+        results: List[Optional[tuple]] = self._analysis_cache.get_many(keys)
+        missing = [idx for (idx, result) in enumerate(results) if result is None]
+
+        if missing:
+            response = self._query_in_chunks(language, [comments[idx] for idx in missing], fields, query)
+            new_results = list(zip(*(response[field] for field in fields)))
+            if len(new_results) != len(missing):
+                raise Exception("Analyzer returned {} results for {} comments".format(len(new_results), len(missing)))
+            for idx, result in zip(missing, new_results):
+                results[idx] = result
+            self._analysis_cache.set_many((keys[idx], result) for (idx, result) in zip(missing, new_results))
+
+        return {field: [result[field_idx] for result in results] for (field_idx, field) in enumerate(fields)}
+
+    def _query_in_chunks(
+        self,
+        language: str,
+        comments: List[str],
+        fields: Sequence[str],
+        query: Callable[[str, List[str]], Dict[str, List[Any]]],
+    ) -> Dict[str, List[Any]]:
+        """
+        Splits the comments into chunks of at most the analyzer's configured chunk size, queries the analyzer for the
+        chunks in parallel and concatenates the per-chunk results back together in order.
+        """
+        config = get_config()
+        chunk_size = config.get_chunk_size(self.ANALYZER_CONFIG_GROUP) if self.ANALYZER_CONFIG_GROUP else 0
+        if chunk_size <= 0 or len(comments) <= chunk_size:
+            response = query(language, comments)
+            return {field: response[field] for field in fields}
+
+        chunks = [comments[start : start + chunk_size] for start in range(0, len(comments), chunk_size)]
+        max_workers = max(1, min(config.chunking.max_parallel_chunks, len(chunks)))
+        deadline = current_deadline()
+        timings = current_timings()
+
+        def query_chunk(chunk: List[str]) -> Dict[str, List[Any]]:
+            with deadline_scope(deadline), timings_scope(timings):
+                return query(language, chunk)
+
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analyzer-chunk") as executor:
+            responses = list(executor.map(query_chunk, chunks))
+
+        results: Dict[str, List[Any]] = {field: [] for field in fields}
+        for chunk, response in zip(chunks, responses):
+            for field in fields:
+                if len(response[field]) != len(chunk):
+                    raise Exception(
+                        "Analyzer returned {} {} for {} comments".format(len(response[field]), field, len(chunk))
+                    )
+                results[field].extend(response[field])
+        return results
+
+    def cache_stats(self) -> Optional[Dict[str, float]]:
+        if self._analysis_cache is None:
+            return None
+        return self._analysis_cache.stats()
+
+    @classmethod
+    def http_client(cls) -> AnalyzerClient:
+        http_config = get_config().http
+        client = ProcessorResource._http_client
+        if client is not None and ProcessorResource._http_client_config == http_config:
+            return client
+        with ProcessorResource._http_client_lock:
+            if ProcessorResource._http_client is None or ProcessorResource._http_client_config != http_config:
+                previous_client = ProcessorResource._http_client
+                ProcessorResource._http_client = AnalyzerClient(
+                    connect_timeout=http_config.connect_timeout,
+                    read_timeout=http_config.read_timeout,
+                    retries=http_config.retries,
+                    backoff_factor=http_config.backoff_factor,
+                    pool_connections=http_config.pool_connections,
+                    pool_maxsize=http_config.pool_maxsize,
+                    circuit_failure_threshold=http_config.circuit_failure_threshold,
+                    circuit_reset_timeout=http_config.circuit_reset_timeout,
+                )
+                ProcessorResource._http_client_config = http_config
+                # Release the pooled connections of the client made with the old config. Requests still being made
+                # with it finish, but their connections are not returned to the pool.
+                if previous_client is not None:
+                    previous_client.close()
+            return ProcessorResource._http_client
+
+    def post(self, url: str, json: Dict[str, Any]) -> requests.Response:
+        return self.http_client().post(url, json=json)
+
     def read_config_language_value(self, group: str, key: str, allow_none: bool = False) -> Optional[str]:
-        value = self.read_config_value(group, key, True)
-        if not value:
-            value = self.read_config_value(group, "all", True)
+        value = get_config().get_language_value(group, key)
         if (not value) and (not allow_none):
             raise Exception(f"config.ini missing mandatory value '{key}' for group '{group}'")
         return value
 
     @staticmethod
     def read_config_value(group: str, key: str, allow_none: bool = False) -> Optional[str]:
-        config_path = Path(__file__).parent / ".." / ".." / "config.ini"
-        try:
-            config = configparser.ConfigParser()
-            config.read(str(config_path))
-            return config[group][key]
-        except Exception:
-            if allow_none:
-                return None
+        value = get_config().get(group, key)
+        if value is None and not allow_none:
             raise Exception(f"config.ini missing mandatory value '{key}' for group '{group}'")
+        return value
@@ -1,8 +1,6 @@
 import logging
 from typing import List, Type, Optional
 
-import requests
-
 from ..core.models import Fact, Message
 from ..core.realize_slots import SlotRealizerComponent
 from .processor_resource import ProcessorResource
@@ -53,11 +51,15 @@ def _generate_sentiment_most_positive(sentiments: List[str], comments: List[str]
 
 
 class SentimentStatsResource(ProcessorResource):
+
+    ANALYZER_CONFIG_GROUP = "SENTIMENTANALYSIS"
+    CACHE_ANALYSIS_RESULTS = True
+
     def templates_string(self) -> str:
         return TEMPLATE
 
     def generate_messages(self, language: str, comments: List[str]) -> List[Message]:
-        sentiments = self._query_model(language, comments)["sentiments"]
+        sentiments = self.analyze_comments(language, comments, ("sentiments",), self._query_model)["sentiments"]
         messages: List[Message] = [
             _generate_sentiment_mean(sentiments),
             _generate_sentiment_positive_count(sentiments),
@@ -72,8 +74,8 @@ class SentimentStatsResource(ProcessorResource):
 
     def _query_model(self, language: str, comments: List[str]):
         log.info(f"comments: {comments}")
-        response = requests.post(
-            self.read_config_language_value("SENTIMENTANALYSIS", language, allow_none=False),
+        response = self.post(
+            self.read_config_language_value(self.ANALYZER_CONFIG_GROUP, language, allow_none=False),
             json={"comments": comments},
         )
         log.info(f"{response}, {response.reason}, {response.text}")
@@ -0,0 +1,29 @@
+import logging
+
+from uralicNLP import uralicApi
+
+from .core.morphological_realizer import MorphologyUnavailableError
+
+log = logging.getLogger("root")
+
+
+def preload_models(language: str) -> None:
+    """
+    Loads the uralicNLP analyzer and generator of `language` (e.g. "fin") into uralicNLP's in-memory caches, with the
+    same options uralicApi.analyze() and uralicApi.generate() use by default.
+
+    Models are never downloaded here, as that would make the service depend on the model server being reachable.
+    They must be installed beforehand with uralicApi.download(), as is done when building the docker image.
+    """
+    if not uralicApi.is_language_installed(language):
+        raise MorphologyUnavailableError(
+            "uralicNLP models for {} are not installed. Install them with uralicApi.download('{}')".format(
+                language, language
+            )
+        )
+    try:
+        uralicApi.get_transducer(language, analyzer=True, descriptive=True, dictionary_forms=False)
+        uralicApi.get_transducer(language, analyzer=False, descriptive=False, dictionary_forms=False)
+    except Exception as ex:
+        raise MorphologyUnavailableError("Unable to load uralicNLP models for {}: {}".format(language, ex)) from ex
+    log.debug("Loaded uralicNLP models for {}".format(language))
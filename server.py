@@ -1,15 +1,17 @@
 import argparse
+import atexit
 import logging.handlers
 import sys
 from pathlib import Path
-from typing import Any, Dict, List, Tuple, Optional
+from typing import Any, Dict, List, Optional
 
 import bottle
 import yaml
 from bottle import Bottle, request, response, run
 from bottle_swagger import SwaggerPlugin
 
-from comment_reporter.comment_report_nlg_service import CommentReportNlgService
+from comment_reporter import metrics
+from comment_reporter.comment_report_nlg_service import CommentReportNlgService, Report
 
 #
 # START INIT
@@ -47,7 +49,28 @@ log.addHandler(rotating_file_handler)
 
 # Bottle
 app = Bottle()
-service = CommentReportNlgService(random_seed=4551546)
+service = CommentReportNlgService(random_seed=4551546, force_cache_refresh=args.force_cache_refresh)
+atexit.register(service.save_morphology_cache)
+request_metrics = metrics.RequestMetrics()
+
+
+def track_requests(callback):
+    """ this is a plugin which records the count and latency of requests to all endpoints """
+
+    def wrapper(*args, **kwargs):
+        with request_metrics.track(request.method, request.route.rule) as status:
+            try:
+                body = callback(*args, **kwargs)
+            except bottle.HTTPResponse as ex:
+                status.code = ex.status_code
+                raise
+            status.code = response.status_code
+            return body
+
+    return wrapper
+
+
+app.install(track_requests)
 
 # Swagger
 with open(Path(__file__).parent / "swagger.yml", "r") as file_handle:
@@ -86,8 +109,23 @@ LANGUAGES = ["en"]
 #
 
 
-def generate(output_language: str, comments: List[str], comment_language: Optional[str]) -> Tuple[str, List[str]]:
-    return service.run_pipeline(output_language, comments, comment_language)
+def generate(
+    output_languages: List[str], comments: List[str], comment_language: Optional[str], headline: bool = False
+) -> Dict[str, Report]:
+    return service.run_pipelines(output_languages, comments, comment_language, headline=headline)
+
+
+def report_to_json(output_language: str, report: Report, headline: bool) -> Dict[str, Any]:
+    output = {
+        "output_language": output_language,
+        "body": report.body,
+        "analyzer_items_saved": report.analyzer_items_saved,
+    }
+    if headline:
+        output["headline"] = report.headline
+    if report.errors:
+        output["errors"] = report.errors
+    return output
 
 
 @app.route("/report", method=["POST", "OPTIONS"])
@@ -103,21 +141,37 @@ def api_generate_json() -> Dict[str, Any]:
     comments = parameters.get("comments")
     output_language = parameters.get("output_language")
     comment_language = parameters.get("comment_language")
+    headline = parameters.get("headline", False)
+    include_timings = parameters.get("timings", False)
+
+    # Either a single language, or a list of languages to generate the report in
+    output_languages = output_language if isinstance(output_language, list) else [output_language]
 
     errors = []
 
-    if output_language not in LANGUAGES:
+    if not output_languages or any(language not in LANGUAGES for language in output_languages):
         errors.append("Invalid or missing output_language. Query /languages for valid options.")
     if not comments:
         errors.append("Invalid or missing comment list.")
+    if not isinstance(headline, bool):
+        errors.append("Invalid headline, expected a boolean.")
+    if not isinstance(include_timings, bool):
+        errors.append("Invalid timings, expected a boolean.")
     if errors:
         response.status = 400
         return {"errors": errors}
 
-    body, errors = generate(output_language, comments, comment_language)
-    output = {"output_language": output_language, "body": body}
-    if errors:
-        output["errors"] = errors
+    reports = generate(output_languages, comments, comment_language, headline)
+    if not isinstance(output_language, list):
+        output = report_to_json(output_language, reports[output_language], headline)
+    else:
+        output = {
+            "output_language": output_languages,
+            "reports": [report_to_json(language, report, headline) for language, report in reports.items()],
+        }
+    if include_timings:
+        # All the reports share the same analysis, and thus the same timings
+        output["timings"] = next(iter(reports.values())).timings
     return output
 
 
@@ -130,7 +184,13 @@ def get_languages() -> Dict[str, List[str]]:
 @app.route("/health", method=["GET", "OPTIONS"])
 @allow_cors(["GET", "OPTIONS"])
 def health() -> Dict[str, Any]:
-    return {"version": "1.0.0"}
+    return {"version": "1.0.0", "caches": service.get_cache_stats()}
+
+
+@app.route("/metrics", method=["GET"])
+def get_metrics() -> str:
+    response.content_type = metrics.CONTENT_TYPE
+    return metrics.render(request_metrics, service.get_cache_stats())
 
 
 def main() -> None:
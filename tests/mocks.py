@@ -0,0 +1,154 @@
+"""
+Stand-ins for the analyzers and the UralicNLP models, so that the service can be ran without either.
+
+Used by the tests and by the scripts in benchmarks/.
+"""
+
+import json
+import random
+import re
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+from unittest import mock
+
+import requests
+from requests.models import Response
+from uralicNLP import uralicApi
+
+from comment_reporter import config as config_module
+from comment_reporter.resources import general_summary_resource
+from comment_reporter.resources.processor_resource import ProcessorResource
+
+# Configuration used by default while mocked: no template cache on disk and no waiting between retries
+DEFAULT_CONFIG_OVERRIDES = {
+    "TEMPLATES__CACHE_PATH": "",
+    "HTTP__BACKOFF_FACTOR": "0",
+}
+
+
+class FakeAnalyzers(object):
+    """
+    Answers the requests made to the analyzers configured in config.ini. The answers only depend on the comments, so
+    reports generated from the same comments are identical.
+
+    :param status_codes: status to respond with instead of a result, by a substring of the analyzer URL
+    :param delay: seconds to wait before responding to each request
+    :param delay_per_item: seconds to additionally wait for each comment or sentence in the request
+    """
+
+    def __init__(
+        self, status_codes: Optional[Mapping[str, int]] = None, delay: float = 0.0, delay_per_item: float = 0.0
+    ) -> None:
+        self.status_codes = dict(status_codes or {})
+        self.delay = delay
+        self.delay_per_item = delay_per_item
+        # (url, amount of comments) of each request made
+        self.calls: List[Tuple[str, int]] = []
+        self._lock = threading.Lock()
+
+    def send(self, adapter: requests.adapters.HTTPAdapter, request: requests.PreparedRequest, **kwargs) -> Response:
+        body = json.loads(request.body)
+        items = len(body.get("texts", body.get("comments", [])))
+        with self._lock:
+            self.calls.append((request.url, items))
+        if self.delay or self.delay_per_item:
+            time.sleep(self.delay + self.delay_per_item * items)
+
+        response = Response()
+        response.url = request.url
+        response.request = request
+        for url_part, status_code in self.status_codes.items():
+            if url_part in request.url:
+                response.status_code = status_code
+                response._content = b"<html>Error</html>"
+                return response
+
+        response.status_code = 200
+        response._content = json.dumps(self.respond(request.url, body)).encode("utf-8")
+        return response
+
+    @staticmethod
+    def respond(url: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        if "hate_speech" in url:
+            texts = body["texts"]
+            return {
+                "labels": ["Blocked" if "bad" in text else "Non-Blocked" for text in texts],
+                "confidences": [(len(text) % 7) / 7 for text in texts],
+            }
+        if "analyze" in url:
+            return {"sentiments": [((len(comment) * 37) % 100) / 50 - 1 for comment in body["comments"]]}
+        if "summarize" in url:
+            return {"summary": [comment.strip() for comment in body["comments"][: body["count"]]]}
+        if "topic_model" in url:
+            labels = ["sports", "politics", "weather", "Stopwords"]
+            return {
+                "suggested_label": [
+                    str(["label_top{} : {}".format(i, labels[(len(text) + i) % len(labels)]) for i in range(2)])
+                    for text in body["texts"]
+                ]
+            }
+        raise ValueError("No fake analyzer for {}".format(url))
+
+
+def synthetic_comments(count: int, seed: int = 0) -> List[str]:
+    """
+    Comments of a few sentences each, some of them blocked by the fake hate speech analyzer.
+    """
+    rng = random.Random(seed)
+    words = ["the", "article", "weather", "politics", "bad", "great", "team", "vote", "sunny", "game", "really", "love"]
+    return [
+        " ".join(
+            " ".join(rng.choice(words) for _ in range(rng.randint(3, 10))).capitalize() + "."
+            for _ in range(rng.randint(1, 3))
+        )
+        for _ in range(count)
+    ]
+
+
+def _sent_tokenize(text: str) -> List[str]:
+    # The NLTK sentence tokenizer needs the punkt data, which may not be installed
+    return [sentence for sentence in re.split(r"(?<=[.!?])\s+", text) if sentence]
+
+
+@contextmanager
+def mocked_analyzers(
+    analyzers: Optional[FakeAnalyzers] = None,
+    config_overrides: Optional[Mapping[str, str]] = None,
+    mock_morphology: bool = True,
+) -> Iterator[FakeAnalyzers]:
+    """
+    Within the context, analyzer requests are answered by `analyzers` and the configuration is read from config.ini
+    with `config_overrides` applied on top of DEFAULT_CONFIG_OVERRIDES. The overrides are given like the environment
+    variables, without the prefix.
+
+    :param mock_morphology: whether to replace the UralicNLP models with ones that upper-case their input. Otherwise
+        the models need to be installed.
+    """
+    if analyzers is None:
+        analyzers = FakeAnalyzers()
+    overrides = dict(DEFAULT_CONFIG_OVERRIDES, **(config_overrides or {}))
+    environ = {config_module.ENVIRONMENT_PREFIX + key: value for (key, value) in overrides.items()}
+
+    with ExitStack() as stack:
+        if mock_morphology:
+            for name, replacement in (
+                ("is_language_installed", lambda language: True),
+                ("download", lambda language: None),
+                ("get_transducer", lambda *args, **kwargs: None),
+                ("analyze", lambda word, language: [(word + "+N+Sg+Nom", 0.0)]),
+                ("generate", lambda analysis, language: [(analysis.split("+")[0].upper(), 0.0)]),
+            ):
+                stack.enter_context(mock.patch.object(uralicApi, name, replacement))
+
+        def send(adapter: requests.adapters.HTTPAdapter, request: requests.PreparedRequest, **kwargs) -> Response:
+            return analyzers.send(adapter, request, **kwargs)
+
+        stack.enter_context(mock.patch.object(requests.adapters.HTTPAdapter, "send", send))
+        stack.enter_context(mock.patch.object(general_summary_resource, "sent_tokenize", _sent_tokenize))
+        stack.enter_context(mock.patch.object(config_module, "_config", config_module.load_config(environ=environ)))
+        # Start with a new HTTP client, so that no circuit breaker state is left over from earlier use
+        stack.enter_context(mock.patch.object(ProcessorResource, "_http_client", None))
+        stack.enter_context(mock.patch.object(ProcessorResource, "_http_client_config", None))
+        yield analyzers
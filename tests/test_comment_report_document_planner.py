@@ -0,0 +1,107 @@
+import random as pyrandom
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pytest
+
+from comment_reporter.comment_report_document_planner import (
+    NEW_PARAGRAPH_ABSOLUTE_THRESHOLD,
+    CommentReportBodyDocumentPlanner,
+    CommentReportHeadlineDocumentPlanner,
+)
+from comment_reporter.core.document_planner import AvailableMessages
+from comment_reporter.core.models import DocumentPlanNode, Fact, Message
+from comment_reporter.core.registry import Registry
+
+
+def list_scan_body_plan(scored_messages: List[Message]) -> List[List[Message]]:
+    """
+    The body document plan as planned before the available messages were kept in heaps: the list of available messages
+    is sorted for every nucleus, and scanned for every satellite.
+    """
+    paragraphs: List[List[Message]] = []
+    available_messages = scored_messages[:]
+    while True:
+        nucleus, nucleus_score = list_scan_next_nucleus(available_messages)
+        if nucleus_score < NEW_PARAGRAPH_ABSOLUTE_THRESHOLD and paragraphs:
+            return paragraphs
+        available_messages = [m for m in available_messages if m != nucleus]
+        satellites = list_scan_satellites(nucleus, available_messages)
+        available_messages = [m for m in available_messages if m not in satellites]
+        paragraphs.append([nucleus] + satellites)
+
+
+def list_scan_next_nucleus(available_messages: List[Message]) -> Tuple[Optional[Message], float]:
+    available_messages.sort(key=lambda message: message.score, reverse=True)
+    if not available_messages:
+        return None, 0
+    return available_messages[0], available_messages[0].score
+
+
+def list_scan_satellites(nucleus: Message, available_messages: List[Message]) -> List[Message]:
+    satellites: List[Message] = []
+    available_messages = available_messages[:]
+    while True:
+        scored_available = [
+            (message.score, message)
+            for message in available_messages
+            if message.score > 0
+            and message.main_fact.value_type.split(":")[0] == nucleus.main_fact.value_type.split(":")[0]
+        ]
+        scored_available.sort(key=lambda pair: pair[0], reverse=True)
+        if not scored_available:
+            return satellites
+        score, selected_satellite = scored_available[0]
+        satellites.append(selected_satellite)
+        available_messages = [message for message in available_messages if message != selected_satellite]
+
+
+def random_messages(seed: int) -> List[Message]:
+    rng = pyrandom.Random(seed)
+    prefixes = ["sentiment", "stats", "topic", "hate_speech", "summary", "p{}".format(seed)][: rng.randint(1, 6)]
+    messages = []
+    for idx in range(rng.randint(1, 80)):
+        value_type = "{}:{}".format(rng.choice(prefixes), rng.choice(["mean", "count", "x"]))
+        # Few distinct scores, so that there are plenty of ties
+        score = rng.choice([-0.2, 0, 0.1, 0.3, 0.5, 0.7, 1, 2])
+        messages.append(Message(Fact(idx, value_type, 0), score=score))
+    return messages
+
+
+def paragraphs(document_plan: DocumentPlanNode) -> List[List[Message]]:
+    return [list(paragraph.children) for paragraph in document_plan.children]
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_same_plans_as_list_scan(seed):
+    messages = random_messages(seed)
+    random = np.random.default_rng(seed)
+
+    body, _ = CommentReportBodyDocumentPlanner().run(Registry(), random, "en", messages[:])
+    assert paragraphs(body) == list_scan_body_plan(messages[:])
+
+    headline, _ = CommentReportHeadlineDocumentPlanner().run(Registry(), random, "en", messages[:])
+    assert paragraphs(headline) == [[list_scan_next_nucleus(messages[:])[0]]]
+
+
+def test_available_messages():
+    messages = random_messages(3)
+    available = AvailableMessages(messages)
+    by_score = sorted(messages, key=lambda message: message.score, reverse=True)
+    assert available.best() is by_score[0]
+
+    removed = by_score[0::3]
+    for message in removed:
+        available.remove(message)
+    # Removing a message twice, or one that was never available, changes nothing
+    available.remove(removed[0])
+    available.remove(Message(Fact(0, "stats:count", 0)))
+    assert len(available) == len(messages) - len(removed)
+
+    remaining = [message for message in by_score if all(message is not r for r in removed)]
+    assert available.best() is remaining[0]
+    for prefix in ["sentiment", "stats", "topic"]:
+        expected = [message for message in remaining if message.main_fact.value_type.startswith(prefix + ":")]
+        assert available.with_prefix(prefix) == expected
+        assert available.with_prefix(prefix) == expected
+    assert available.with_prefix("unknown") == []
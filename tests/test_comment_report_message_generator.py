@@ -0,0 +1,54 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from comment_reporter.comment_report_message_generator import CommentReportMessageGenerator
+from comment_reporter.core.models import Fact, Message
+from comment_reporter.core.registry import Registry
+from comment_reporter.resources.http_client import AnalyzerUnavailableError
+
+
+def working_parser(language, comments):
+    return [Message(Fact(len(comments), "stats:count", 1.0))]
+
+
+def unavailable_parser(language, comments):
+    raise AnalyzerUnavailableError("Analyzer at http://localhost/ responded with 500")
+
+
+def run(message_parsers, deadline=None, concurrent=True):
+    registry = Registry()
+    registry.register("message-parsers", message_parsers)
+    registry.register("omitted-sections", [])
+    if deadline is not None:
+        registry.register("deadline", deadline)
+    (messages,) = CommentReportMessageGenerator(concurrent=concurrent).run(
+        registry, np.random.default_rng(0), "en", ["a", "b"], "all"
+    )
+    return messages, registry.get("omitted-sections")
+
+
+@pytest.mark.parametrize("concurrent", [True, False])
+def test_unavailable_analyzer_is_omitted(concurrent):
+    messages, omitted = run([working_parser, unavailable_parser], concurrent=concurrent)
+    assert [message.main_fact.value for message in messages] == [2]
+    assert omitted == ["unavailable_parser (Analyzer at http://localhost/ responded with 500)"]
+
+
+def test_parser_failing_after_the_deadline_is_omitted_once():
+    finished = threading.Event()
+
+    def slow_parser(language, comments):
+        try:
+            time.sleep(0.3)
+            raise AnalyzerUnavailableError("Analyzer timed out")
+        finally:
+            finished.set()
+
+    messages, omitted = run([working_parser, slow_parser], deadline=time.monotonic() + 0.1)
+    assert finished.wait(5)
+    time.sleep(0.05)
+    assert [message.main_fact.value for message in messages] == [2]
+    assert omitted == ["slow_parser (deadline exceeded)"]
@@ -0,0 +1,107 @@
+from comment_reporter.comment_report_nlg_service import CommentReportNlgService
+from comment_reporter.constants import get_error_message
+
+from .mocks import FakeAnalyzers, mocked_analyzers
+
+COMMENTS = [
+    "This is a bad comment. Really bad.",
+    "I love this article",
+    "Great job everyone!",
+    "bad bad bad",
+    "The weather is nice today. Sunny.",
+    "Politics again, ugh",
+    "Another fine comment here",
+]
+
+HATE_SPEECH_URL = "hate_speech"
+
+
+def _assert_only_hate_speech_omitted(report, expected_status):
+    assert report.body != get_error_message("en", "general-error")
+    assert report.body.startswith("<p>")
+    assert len(report.errors) == 1
+    assert report.errors[0].startswith("OmittedSection: HateSpeechResource")
+    assert "responded with {}".format(expected_status) in report.errors[0]
+
+
+def test_report_without_failing_analyzers():
+    with mocked_analyzers():
+        report = CommentReportNlgService(random_seed=1).run_pipeline("en", COMMENTS, None)
+    assert report.errors == []
+    assert report.body.startswith("<p>")
+
+
+def test_analyzer_error_omits_section():
+    analyzers = FakeAnalyzers(status_codes={HATE_SPEECH_URL: 500})
+    with mocked_analyzers(analyzers):
+        report = CommentReportNlgService(random_seed=1).run_pipeline("en", COMMENTS, None)
+    _assert_only_hate_speech_omitted(report, 500)
+    # Errors that are not temporary are not retried
+    assert len([url for (url, _) in analyzers.calls if HATE_SPEECH_URL in url]) == 1
+
+
+def test_exhausted_retries_omit_section():
+    analyzers = FakeAnalyzers(status_codes={HATE_SPEECH_URL: 503})
+    with mocked_analyzers(analyzers, config_overrides={"HTTP__RETRIES": "2"}):
+        report = CommentReportNlgService(random_seed=1).run_pipeline("en", COMMENTS, None)
+    _assert_only_hate_speech_omitted(report, 503)
+    assert len([url for (url, _) in analyzers.calls if HATE_SPEECH_URL in url]) == 3
+
+
+def test_headline_does_not_change_body_or_queries():
+    without_analyzers, with_analyzers = FakeAnalyzers(), FakeAnalyzers()
+    with mocked_analyzers(without_analyzers):
+        without_headline = CommentReportNlgService(random_seed=1).run_pipeline("en", COMMENTS, None)
+    with mocked_analyzers(with_analyzers):
+        with_headline = CommentReportNlgService(random_seed=1).run_pipeline("en", COMMENTS, None, headline=True)
+
+    assert without_headline.headline is None
+    assert with_headline.errors == []
+    assert with_headline.headline
+    assert with_headline.headline != get_error_message("en", "general-error")
+    assert not with_headline.headline.startswith("<p>")
+    # The headline is realized from the messages of the body, without querying the analyzers again
+    assert with_headline.body == without_headline.body
+    assert sorted(with_analyzers.calls) == sorted(without_analyzers.calls)
+
+
+def test_reports_in_several_languages_share_the_analysis():
+    single_analyzers, multi_analyzers = FakeAnalyzers(), FakeAnalyzers()
+    with mocked_analyzers(single_analyzers):
+        single = CommentReportNlgService(random_seed=1).run_pipeline("en", COMMENTS, None)
+    with mocked_analyzers(multi_analyzers):
+        reports = CommentReportNlgService(random_seed=1).run_pipelines(["en", "fi", "en"], COMMENTS, None)
+
+    # Duplicates are dropped, keeping the order
+    assert list(reports) == ["en", "fi"]
+    assert reports["en"]._replace(timings=None) == single._replace(timings=None)
+    # There are no templates for Finnish, so its realization fails without affecting the English report
+    assert reports["fi"].body == get_error_message("fi", "general-error")
+    assert reports["fi"].errors == ["KeyError: 'fi'"]
+    # The comments are analyzed only once
+    assert sorted(multi_analyzers.calls) == sorted(single_analyzers.calls)
+
+
+def test_timings_cover_stages_resources_and_analyzers():
+    analyzers = FakeAnalyzers(status_codes={HATE_SPEECH_URL: 500})
+    with mocked_analyzers(analyzers):
+        service = CommentReportNlgService(random_seed=1)
+        timings = service.run_pipeline("en", COMMENTS, None, headline=True).timings
+
+    stages = timings["stages"]
+    for pipeline_type in ["body", "headline"]:
+        assert "{}/TemplateSelector".format(pipeline_type) in stages
+        assert "{}/MorphologicalRealizer".format(pipeline_type) in stages
+    assert stages["analysis/CommentReportMessageGenerator"]["calls"] == 1
+    assert all(entry["wall_seconds"] <= timings["total_seconds"] for entry in stages.values())
+
+    assert set(timings["resources"]) == {type(resource).__name__ for resource in service.processor_resources}
+    assert timings["resources"]["HateSpeechResource"]["errors"] == 1
+    assert "errors" not in timings["resources"]["SentimentStatsResource"]
+
+    # Every analyzer query is timed, and the failed ones are counted
+    assert {url: entry["calls"] for url, entry in timings["analyzers"].items()} == {
+        url: len([call for call in analyzers.calls if call[0] == url]) for (url, _) in analyzers.calls
+    }
+    for url, entry in timings["analyzers"].items():
+        assert entry.get("errors", 0) == (1 if HATE_SPEECH_URL in url else 0)
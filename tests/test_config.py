@@ -0,0 +1,86 @@
+import os
+from unittest import mock
+
+import pytest
+
+from comment_reporter import config as config_module
+from comment_reporter.config import ConfigurationError, load_config
+
+CONFIG = """
+[SENTIMENTANALYSIS]
+all = http://localhost:8082/analyze
+fi = http://localhost:8084/analyze
+
+[HTTP]
+retries = 2
+read_timeout = 60
+
+[CACHE]
+enabled = true
+
+[CONFIG]
+watch = {watch}
+watch_interval = 0
+"""
+
+
+def write_config(path, watch=False, retries=2):
+    path.write_text(CONFIG.format(watch=str(watch).lower()).replace("retries = 2", "retries = {}".format(retries)))
+
+
+def test_environment_overrides(tmp_path):
+    path = tmp_path / "config.ini"
+    write_config(path)
+    prefix = config_module.ENVIRONMENT_PREFIX
+    config = load_config(
+        path,
+        environ={
+            prefix + "HTTP__RETRIES": "5",
+            prefix + "http__Read_Timeout": "1.5",
+            prefix + "CACHE__ENABLED": "off",
+            prefix + "SENTIMENTANALYSIS__EN": "http://localhost:9000/analyze",
+            prefix + "NEW_SECTION__KEY": "value",
+            prefix + "MALFORMED": "ignored",
+            prefix + "__KEY": "ignored",
+            "HTTP__RETRIES": "ignored without the prefix",
+        },
+    )
+    assert config.http.retries == 5
+    assert config.http.read_timeout == 1.5
+    assert config.http.connect_timeout == config_module.HttpConfig().connect_timeout
+    assert config.cache.enabled is False
+    assert config.get_language_value("SENTIMENTANALYSIS", "en") == "http://localhost:9000/analyze"
+    assert config.get_language_value("SENTIMENTANALYSIS", "fi") == "http://localhost:8084/analyze"
+    assert config.get_language_value("SENTIMENTANALYSIS", "hr") == "http://localhost:8082/analyze"
+    assert config.get("new_section", "KEY") == "value"
+    assert config.get("MALFORMED", "") is None
+
+
+def test_invalid_override_raises(tmp_path):
+    path = tmp_path / "config.ini"
+    write_config(path)
+    with pytest.raises(ConfigurationError):
+        load_config(path, environ={config_module.ENVIRONMENT_PREFIX + "HTTP__RETRIES": "many"})
+
+
+@pytest.mark.parametrize("watch", [True, False])
+def test_reload_when_file_changes(tmp_path, watch):
+    path = tmp_path / "config.ini"
+    write_config(path, watch=watch)
+    with mock.patch.object(config_module, "_config", load_config(path, environ={})), mock.patch.object(
+        config_module, "_config_checked_at", 0.0
+    ):
+        config = config_module.get_config()
+        assert config.http.retries == 2
+        assert config_module.get_config() is config
+
+        write_config(path, watch=watch, retries=7)
+        # Make sure the modification time changes, however coarse the file system's timestamps are
+        os.utime(str(path), (config.mtime + 10, config.mtime + 10))
+        reloaded = config_module.get_config()
+        if watch:
+            assert reloaded is not config
+            assert reloaded.http.retries == 7
+            assert config_module.get_config() is reloaded
+        else:
+            assert reloaded is config
@@ -0,0 +1,36 @@
+import pytest
+
+from comment_reporter.resources.http_client import AnalyzerClient, AnalyzerUnavailableError, CircuitOpenError
+
+from .mocks import FakeAnalyzers, mocked_analyzers
+
+URL = "http://localhost:8082/analyze"
+
+
+def test_successful_response_is_returned():
+    with mocked_analyzers():
+        response = AnalyzerClient().post(URL, json={"comments": ["Hello"]})
+    assert response.status_code == 200
+    assert len(response.json()["sentiments"]) == 1
+
+
+@pytest.mark.parametrize("status_code", [400, 500, 503])
+def test_error_response_raises(status_code):
+    with mocked_analyzers(FakeAnalyzers(status_codes={"analyze": status_code})):
+        client = AnalyzerClient(retries=1, backoff_factor=0)
+        with pytest.raises(AnalyzerUnavailableError, match="responded with {}".format(status_code)):
+            client.post(URL, json={"comments": ["Hello"]})
+
+
+def test_error_responses_open_the_circuit():
+    analyzers = FakeAnalyzers(status_codes={"analyze": 500})
+    with mocked_analyzers(analyzers):
+        client = AnalyzerClient(retries=0, circuit_failure_threshold=3)
+        for _ in range(3):
+            with pytest.raises(AnalyzerUnavailableError):
+                client.post(URL, json={"comments": ["Hello"]})
+        assert client.circuit_breaker(URL).is_open
+
+        with pytest.raises(CircuitOpenError):
+            client.post(URL, json={"comments": ["Hello"]})
+    assert len(analyzers.calls) == 3
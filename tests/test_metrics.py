@@ -0,0 +1,69 @@
+import re
+from typing import Dict
+
+from comment_reporter import metrics
+from comment_reporter.comment_report_nlg_service import CommentReportNlgService
+
+from .mocks import mocked_analyzers
+from .test_comment_report_nlg_service import COMMENTS
+
+SAMPLE = re.compile(r"^([a-z_]+)(\{.*\})? (\S+)$")
+
+
+def samples(rendered: str) -> Dict[str, float]:
+    """
+    The values of the rendered metrics, keyed by the metric name and labels as rendered.
+    """
+    output = {}
+    for line in rendered.splitlines():
+        if line.startswith("#"):
+            continue
+        match = SAMPLE.match(line)
+        assert match, line
+        output[match.group(1) + (match.group(2) or "")] = float(match.group(3))
+    return output
+
+
+def test_metrics_of_served_reports():
+    request_metrics = metrics.RequestMetrics()
+    with mocked_analyzers():
+        service = CommentReportNlgService(random_seed=1)
+        for _ in range(2):
+            with request_metrics.track("POST", "/report") as status:
+                service.run_pipeline("en", COMMENTS, None)
+                status.code = 200
+        try:
+            with request_metrics.track("GET", "/health"):
+                raise ValueError()
+        except ValueError:
+            pass
+        rendered = metrics.render(request_metrics, service.get_cache_stats())
+    values = samples(rendered)
+
+    assert values['comment_reporter_http_requests_total{method="POST",endpoint="/report",status="200"}'] == 2
+    # Requests that fail before their status is set are internal errors
+    assert values['comment_reporter_http_requests_total{method="GET",endpoint="/health",status="500"}'] == 1
+    assert values['comment_reporter_http_requests_in_flight{endpoint="/report"}'] == 0
+
+    # The second report is analyzed from the cache
+    assert values['comment_reporter_analysis_cache_hits_total{resource="HateSpeechResource"}'] == len(COMMENTS)
+    assert values['comment_reporter_analysis_cache_misses_total{resource="HateSpeechResource"}'] == len(COMMENTS)
+    assert values['comment_reporter_analysis_cache_hit_ratio{resource="HateSpeechResource"}'] == 0.5
+
+    # The pipeline, resource and analyzer histograms are process-wide, so other tests may have added to them
+    assert (
+        values['comment_reporter_pipeline_stage_duration_seconds_count{pipeline="body",stage="TemplateSelector"}'] >= 2
+    )
+    assert values['comment_reporter_resource_duration_seconds_count{resource="HateSpeechResource"}'] >= 2
+    assert any(key.startswith("comment_reporter_analyzer_request_duration_seconds_count{") for key in values)
+
+    # Histogram buckets are cumulative, the last one counting all observations
+    for key, count in values.items():
+        if "_duration_seconds_count" in key:
+            name, labels = key.split("_count", 1)
+            buckets = [value for bucket, value in values.items() if bucket.startswith(name + "_bucket" + labels[:-1])]
+            assert buckets == sorted(buckets)
+            assert buckets[-1] == count
+
+    if metrics._resident_memory_bytes() is not None:
+        assert values["process_resident_memory_bytes"] > 0
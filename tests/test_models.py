@@ -0,0 +1,154 @@
+from typing import Any, Callable, List, Tuple
+
+import pytest
+
+from comment_reporter.comment_report_nlg_service import CommentReportNlgService
+from comment_reporter.core.models import (
+    Choice,
+    Fact,
+    FactField,
+    FactFieldSource,
+    LhsExpr,
+    Literal,
+    Matcher,
+    ReferentialExpr,
+    Slot,
+    Template,
+    TemplateComponent,
+)
+from comment_reporter.core.template_reader import read_templates
+
+from .mocks import mocked_analyzers, synthetic_comments
+
+TEMPLATE = """
+en: There were [very many] {value} comments [, {value} of them] today.
+| value > 0
+"""
+
+
+def assert_shares_literals(original: List[TemplateComponent], copy: List[TemplateComponent]) -> None:
+    assert len(copy) == len(original)
+    for original_component, component in zip(original, copy):
+        assert type(component) is type(original_component)
+        if isinstance(original_component, Literal):
+            assert component is original_component
+        elif isinstance(original_component, Choice):
+            assert component is not original_component
+            for original_option, option in zip(original_component.options, component.options):
+                assert_shares_literals(original_option, option)
+        else:
+            assert component is not original_component
+            assert component.attributes == original_component.attributes
+            assert component.attributes is not original_component.attributes
+
+
+def test_copy_shares_literals_and_copies_slots():
+    source = FactFieldSource("value")
+    template = Template(
+        [
+            Literal("There"),
+            Slot(source, {"case": "genitive"}),
+            Choice([[Literal("very"), Slot(source)], []]),
+            Literal("comments"),
+        ]
+    )
+    literals = [component for component in template.components if isinstance(component, Literal)]
+
+    copy = template.copy()
+    assert_shares_literals(template.components, copy.components)
+    # Copying, or building another template of the same components, leaves the shared Literals untouched
+    Template(literals)
+    assert [(literal.value, literal.parent) for literal in literals] == [("There", None), ("comments", None)]
+    assert all(component.parent is copy for component in copy.components if not isinstance(component, Literal))
+    assert all(component.parent is template for component in template.components if not isinstance(component, Literal))
+
+    copy.components[1].attributes["case"] = "nominative"
+    assert template.components[1].attributes["case"] == "genitive"
+
+
+@pytest.mark.parametrize("variant", range(4))
+def test_resolve_shares_literals_and_copies_slots(variant):
+    (template,) = read_templates(TEMPLATE)[0]["en"]
+    assert template.variant_count == 4
+    resolved = template.resolve(variant)
+    chosen = []
+    remaining_variants = template.variant_count
+    for component in template.components:
+        if isinstance(component, Choice):
+            remaining_variants //= len(component.options)
+            chosen.extend(component.options[(variant // remaining_variants) % len(component.options)])
+        else:
+            chosen.append(component)
+    assert_shares_literals(chosen, resolved.components)
+    assert all(slot.fact is None for slot in resolved.slots)
+
+
+class DoubledValue(LhsExpr):
+    # An LHS expression that is not a plain fact field
+    def __call__(self, fact: Fact, all_facts: List[Fact]) -> Any:
+        return fact.value * 2
+
+    def __str__(self) -> str:
+        return "fact.value * 2"
+
+
+MATCHERS = [
+    Matcher(FactField("value_type"), "=", "stats:count"),
+    Matcher(FactField("value_type"), "=", "stats:.*"),
+    Matcher(FactField("value_type"), "=", "(stats|sentiment):mean"),
+    Matcher(FactField("value_type"), "=", "stats:("),
+    Matcher(FactField("value"), "=", "7"),
+    Matcher(FactField("value"), "=", 7),
+    Matcher(FactField("value"), "=", 0.5),
+    Matcher(FactField("value"), "!=", 7),
+    Matcher(FactField("value"), ">", 5),
+    Matcher(FactField("value"), "<=", 0.5),
+    Matcher(FactField("outlierness"), ">=", 1),
+    Matcher(FactField("value_type"), "in", {"stats:count", "sentiment:mean"}),
+    Matcher(FactField("value"), "in", {7, "7"}),
+    Matcher(FactField("value"), "in", "seven"),
+    Matcher(DoubledValue(), "=", "14"),
+    Matcher(DoubledValue(), "=", 14),
+    Matcher(DoubledValue(), "in", {14, 1.0}),
+    Matcher(DoubledValue(), ">", 10),
+    Matcher(ReferentialExpr(0, "value"), "=", 7),
+    Matcher(FactField("value"), "=", ReferentialExpr(0, "value")),
+    Matcher(FactField("value"), "<", ReferentialExpr(1, "value")),
+    Matcher(FactField("value_type"), "=", ReferentialExpr(0, "value_type")),
+]
+
+FACTS = [
+    Fact(value, value_type, outlierness)
+    for value in [7, 7.0, "7", 0.5, "seven", "even", None, 100]
+    for value_type in ["stats:count", "stats:count\n", "stats:mean", "sentiment:mean", "other", 7]
+    for outlierness in [0, 1.5]
+]
+
+
+def outcome(predicate: Callable[[Fact, List[Fact]], bool], fact: Fact, all_facts: List[Fact]) -> Tuple[str, Any]:
+    try:
+        return "result", predicate(fact, all_facts)
+    except Exception as ex:
+        return "error", type(ex)
+
+
+@pytest.mark.parametrize("matcher", MATCHERS, ids=str)
+def test_compiled_matcher_agrees_with_matcher(matcher):
+    compiled = matcher.compile()
+    for fact in FACTS:
+        for all_facts in ([Fact(7, "stats:count", 0), Fact(50, "other", 0)], [fact, fact]):
+            assert outcome(compiled, fact, all_facts) == outcome(matcher, fact, all_facts), fact
+
+
+def test_compiled_rules_of_bundled_templates_agree_with_matchers():
+    with mocked_analyzers():
+        service = CommentReportNlgService(random_seed=1)
+        (messages,) = service._analysis_pipeline.run(
+            (synthetic_comments(40), "all"), "en", prng_seed=1, registry=service.registry.child()
+        )
+    facts = [message.main_fact for message in messages] + FACTS
+    for template in service.registry.get("templates")["en"]:
+        for (matchers, _), rule in zip(template.rules, template.compiled_rules):
+            for fact in facts:
+                expected = outcome(lambda f, a: all(matcher(f, a) for matcher in matchers), fact, facts)
+                assert outcome(rule.matches, fact, facts) == expected, (template, fact)
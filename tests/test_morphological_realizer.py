@@ -0,0 +1,108 @@
+import json
+from typing import List, Optional
+from unittest import mock
+
+import pytest
+from uralicNLP import uralicApi
+
+from comment_reporter.core.models import LiteralSlot
+from comment_reporter.core.morphological_realizer import CachingMorphologicalRealizer, MorphologyCache
+from comment_reporter.english_uralicNLP_morphological_realizer import EnglishUralicNLPMorphologicalRealizer
+from comment_reporter.finnish_uralicNLP_morphological_realizer import FinnishUralicNLPMorphologicalRealizer
+
+from .mocks import mocked_analyzers
+
+
+class FakeRealizer(CachingMorphologicalRealizer):
+    def __init__(self, cache: Optional[MorphologyCache] = None) -> None:
+        super().__init__("xx", cache)
+        self.analyzed: List[str] = []
+        self.generated: List[str] = []
+
+    def normalize_case(self, case: str) -> str:
+        return case.upper()
+
+    def analyze(self, surface: str) -> Optional[str]:
+        self.analyzed.append(surface)
+        return None if surface == "unknown" else surface + "+N"
+
+    def generate(self, analysis: str, case: str) -> str:
+        self.generated.append(analysis)
+        return "{}-{}".format(analysis.split("+")[0], case)
+
+
+def slots(*specs):
+    return [LiteralSlot(surface, {"case": case} if case else {}) for (surface, case) in specs]
+
+
+def test_realize_batch_analyzes_each_word_once():
+    cache = MorphologyCache(100)
+    realizer = FakeRealizer(cache)
+    batch = slots(("cat", "gen"), ("dog", None), ("cat", "ine"), ("cat", "Gen"), ("unknown", "gen"), ("dog", "gen"))
+    assert realizer.realize_batch(batch) == ["cat-GEN", "dog", "cat-INE", "cat-GEN", "unknown", "dog-GEN"]
+    assert realizer.analyzed == ["cat", "unknown", "dog"]
+    assert realizer.generated == ["cat+N", "cat+N", "dog+N"]
+    assert cache.stats()["misses"] == 4
+
+    # Everything is now found in the cache
+    assert realizer.realize_batch(batch) == ["cat-GEN", "dog", "cat-INE", "cat-GEN", "unknown", "dog-GEN"]
+    assert len(realizer.analyzed) == 3
+    assert cache.stats()["hits"] == 4
+
+    assert FakeRealizer(cache=None).realize(slots(("cat", "gen"))[0]) == "cat-GEN"
+
+
+def test_cache_save_and_load(tmp_path):
+    path = tmp_path / "morphology.json"
+    cache = MorphologyCache(100)
+    cache.set(("fi", "kissa", "Gen"), "kissan")
+    cache.set(("en", "cat", "GEN"), "cat's")
+    # Only realizations of strings are saved
+    cache.set(("en", 7, "GEN"), "7's")
+    cache.save(path)
+    assert json.loads(path.read_text(encoding="utf-8")) == [
+        ["fi", "kissa", "Gen", "kissan"],
+        ["en", "cat", "GEN", "cat's"],
+    ]
+
+    loaded = MorphologyCache(100)
+    loaded.load(path)
+    assert loaded.get(("fi", "kissa", "Gen")) == "kissan"
+    assert loaded.get(("en", "cat", "GEN")) == "cat's"
+    assert loaded.get(("en", 7, "GEN")) is None
+    assert loaded.stats()["size"] == 2
+
+    # The least recently used realizations are saved first, so they are also the first to be evicted once loaded
+    small = MorphologyCache(1)
+    small.load(path)
+    assert small.get(("en", "cat", "GEN")) == "cat's"
+
+
+@pytest.mark.parametrize("content", [None, "not json", '[["fi", "kissa"]]'])
+def test_missing_or_invalid_cache_file_is_ignored(tmp_path, content):
+    path = tmp_path / "morphology.json"
+    if content is not None:
+        path.write_text(content, encoding="utf-8")
+    cache = MorphologyCache(100)
+    cache.load(path)
+    assert cache.stats()["size"] == 0
+
+
+@pytest.mark.parametrize(
+    "realizer_type, case, expected",
+    [
+        (EnglishUralicNLPMorphologicalRealizer, "genitive", "CAT+N+SG+NOM+GEN"),
+        (FinnishUralicNLPMorphologicalRealizer, "ssa", "CAT+N+SG+INE"),
+    ],
+)
+def test_uralicnlp_realizers_analyze_each_word_once(realizer_type, case, expected):
+    with mocked_analyzers():
+        with mock.patch.object(uralicApi, "analyze", wraps=uralicApi.analyze) as analyze, mock.patch.object(
+            uralicApi, "generate", side_effect=lambda analysis, language: [(analysis.upper(), 0.0)]
+        ) as generate:
+            realized = realizer_type(MorphologyCache(100)).realize_batch(
+                slots(("cat", case), ("cat", case), ("cat", None))
+            )
+    assert realized == [expected, expected, "cat"]
+    assert analyze.call_count == 1
+    assert generate.call_count == 1
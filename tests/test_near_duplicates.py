@@ -0,0 +1,77 @@
+import random
+from collections import Counter
+from typing import List
+
+import pytest
+
+from comment_reporter.resources.comment_batch import CommentBatch
+from comment_reporter.resources.near_duplicates import MinHashLSH
+
+from .mocks import mocked_analyzers
+
+WORDS = "the article weather politics team vote sunny game really love great match player score season city".split()
+
+
+def text(seed: int, length: int = 40) -> List[str]:
+    rng = random.Random(seed)
+    return [rng.choice(WORDS) for _ in range(length)]
+
+
+def edited(words: List[str], positions: List[int], marker: str) -> List[str]:
+    words = list(words)
+    for count, position in enumerate(positions):
+        words[position] = "{}{}".format(marker, count)
+    return words
+
+
+def test_near_duplicates_are_clustered():
+    original = text(0)
+    texts = [
+        " ".join(original),
+        " ".join(text(1)),
+        # Differs from the first by a single word, and by whitespace and case
+        "  " + " ".join(edited(original, [20], "edit")).upper(),
+        " ".join(text(2)),
+        " ".join(text(1)),
+    ]
+    assert MinHashLSH().cluster(texts) == [[0, 2], [1, 4], [3]]
+    assert MinHashLSH().cluster([]) == []
+
+
+def test_clusters_are_joined_transitively():
+    first = text(0)
+    second = edited(first, [0, 3], "first")
+    third = edited(second, [39, 36], "second")
+    texts = [" ".join(first), " ".join(second), " ".join(third)]
+    lsh = MinHashLSH()
+
+    # The first and the last text are not near-duplicates by themselves, but both are near-duplicates of the second
+    assert lsh.cluster([texts[0], texts[2]]) == [[0], [1]]
+    assert lsh.cluster(texts) == [[0, 1, 2]]
+
+
+def test_expand_clusters_weights_by_cluster_size():
+    original = text(0)
+    near_duplicate = " ".join(edited(original, [20], "edit"))
+    comments = [" ".join(original), " ".join(text(1)), near_duplicate, " ".join(original), near_duplicate]
+    with mocked_analyzers():
+        batch = CommentBatch(comments)
+        assert batch.near_duplicate_clusters() == [[0, 2, 3, 4], [1]]
+        assert batch.cluster_representatives() == [comments[0], comments[1]]
+        assert batch.cluster_sizes() == [4, 1]
+
+        labels = batch.expand_clusters(["weather", "sports"])
+        assert labels == ["weather", "sports", "weather", "weather", "weather"]
+        assert Counter(labels) == {"weather": 4, "sports": 1}
+
+        with pytest.raises(ValueError):
+            batch.expand_clusters(["weather"])
+
+
+def test_clusters_without_near_duplicate_detection():
+    original = " ".join(text(0))
+    comments = [original, " ".join(edited(text(0), [20], "edit")), original]
+    with mocked_analyzers(config_overrides={"NEAR_DUPLICATES__ENABLED": "false"}):
+        batch = CommentBatch(comments)
+        assert batch.near_duplicate_clusters() == [[0], [1], [2]]
+        assert batch.expand_clusters(["a", "b", "c"]) == ["a", "b", "c"]
@@ -0,0 +1,116 @@
+import threading
+from typing import Any, Dict, List
+from unittest import mock
+
+import pytest
+
+from comment_reporter import config as config_module
+from comment_reporter.core.models import Message
+from comment_reporter.resources.comment_batch import CommentBatch
+from comment_reporter.resources.http_client import AnalyzerClient
+from comment_reporter.resources.processor_resource import ProcessorResource
+
+from .mocks import mocked_analyzers
+
+
+def test_http_client_is_replaced_and_closed_when_config_changes():
+    with mocked_analyzers():
+        client = ProcessorResource.http_client()
+        assert ProcessorResource.http_client() is client
+
+        reloaded_config = config_module.load_config(environ={config_module.ENVIRONMENT_PREFIX + "HTTP__RETRIES": "5"})
+        with mock.patch.object(config_module, "_config", reloaded_config), mock.patch.object(
+            AnalyzerClient, "close", autospec=True
+        ) as close:
+            new_client = ProcessorResource.http_client()
+            assert new_client is not client
+            assert new_client.retries == 5
+            close.assert_called_once_with(client)
+
+
+class FakeResource(ProcessorResource):
+    ANALYZER_CONFIG_GROUP = "FAKE"
+    CACHE_ANALYSIS_RESULTS = True
+
+    def __init__(self, short_response: bool = False) -> None:
+        super().__init__()
+        self.short_response = short_response
+        # The comments of each query made, in order
+        self.queries: List[List[str]] = []
+        self._lock = threading.Lock()
+
+    def templates_string(self) -> str:
+        return ""
+
+    def generate_messages(self, language: str, comments: List[str]) -> List[Message]:
+        return []
+
+    def slot_realizer_components(self):
+        return []
+
+    def query(self, language: str, comments: List[str]) -> Dict[str, List[Any]]:
+        with self._lock:
+            self.queries.append(list(comments))
+        lengths = [len(comment) for comment in comments]
+        if self.short_response:
+            lengths = lengths[:-1]
+        return {"length": lengths, "upper": [comment.upper() for comment in comments]}
+
+    def analyze(self, comments: List[str]) -> Dict[str, List[Any]]:
+        return self.analyze_comments("en", comments, ["length", "upper"], self.query)
+
+
+def expected(comments: List[str]) -> Dict[str, List[Any]]:
+    return {"length": [len(comment) for comment in comments], "upper": [comment.upper() for comment in comments]}
+
+
+def test_cache_hits_and_misses_are_merged_in_order():
+    with mocked_analyzers():
+        resource = FakeResource()
+        assert resource.analyze(["a", "bb"]) == expected(["a", "bb"])
+
+        comments = ["ccc", "a", "dddd", "bb", "eeeee"]
+        assert resource.analyze(comments) == expected(comments)
+        # Only the comments not in the cache were sent to the analyzer
+        assert resource.queries == [["a", "bb"], ["ccc", "dddd", "eeeee"]]
+
+        batch = CommentBatch(["bb", "ffffff", "a", "ffffff", "ccc"])
+        assert resource.analyze(batch) == expected(list(batch))
+        assert resource.queries[2:] == [["ffffff"]]
+        assert resource.cache_stats()["hits"] == 2 + 3
+
+
+def test_short_response_for_cache_misses_raises():
+    with mocked_analyzers():
+        resource = FakeResource()
+        resource.analyze(["a"])
+        resource.short_response = True
+        with pytest.raises(Exception, match="Analyzer returned 2 results for 3 comments"):
+            resource.analyze(["a", "bb", "ccc", "dddd"])
+
+        # Nothing from the failed query was cached
+        resource.short_response = False
+        resource.analyze(["a", "bb", "ccc", "dddd"])
+        assert resource.queries[-1] == ["bb", "ccc", "dddd"]
+
+
+class UncachedFakeResource(FakeResource):
+    CACHE_ANALYSIS_RESULTS = False
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 13, 50, 100])
+def test_chunked_results_are_joined_in_order(chunk_size):
+    comments = ["comment number {}".format(idx) * (idx % 4 + 1) for idx in range(50)]
+    with mocked_analyzers(config_overrides={"CHUNKING__FAKE": str(chunk_size), "CHUNKING__MAX_PARALLEL_CHUNKS": "3"}):
+        resource = UncachedFakeResource()
+        assert resource.analyze(comments) == expected(comments)
+    assert sorted(resource.queries) == sorted(
+        comments[start : start + chunk_size] for start in range(0, 50, chunk_size)
+    )
+
+
+def test_short_response_for_a_chunk_raises():
+    with mocked_analyzers(config_overrides={"CHUNKING__FAKE": "7"}):
+        resource = UncachedFakeResource(short_response=True)
+        with pytest.raises(Exception, match="Analyzer returned 6 length for 7 comments"):
+            resource.analyze(["comment {}".format(idx) for idx in range(20)])
@@ -0,0 +1,135 @@
+import random as pyrandom
+from typing import List, Tuple
+
+import numpy as np
+import pytest
+from numpy.random import Generator
+
+from comment_reporter.core.models import (
+    DocumentPlanNode,
+    Fact,
+    FactFieldSource,
+    Literal,
+    LiteralSlot,
+    Message,
+    Slot,
+    Template,
+    TemplateComponent,
+)
+from comment_reporter.core.realize_slots import NumberRealizer, RegexRealizer, SlotRealizer, SlotRealizerComponent
+from comment_reporter.core.registry import Registry
+
+
+class CascadingSlotRealizer(object):
+    """
+    The SlotRealizer as it was before it realized slots from a worklist: the whole document plan is walked again, and
+    every slot offered to every realizer, until a walk no longer changes anything. Used as the reference the worklist
+    based SlotRealizer must produce identical output to.
+    """
+
+    def run(self, registry: Registry, random: Generator, language: str, document_plan: DocumentPlanNode) -> None:
+        slot_realizers = list(registry.get("slot-realizers")) + [NumberRealizer()]
+        while self._recurse(slot_realizers, random, document_plan, language.split("-")[0]):
+            pass
+
+    def _recurse(
+        self, slot_realizers: List[SlotRealizerComponent], random: Generator, this: DocumentPlanNode, language: str
+    ) -> bool:
+        if not isinstance(this, Message):
+            return any(self._recurse(slot_realizers, random, child, language) for child in this.children)
+        any_modified = False
+        idx = 0
+        while idx < len(this.children):
+            child = this.children[idx]
+            if not isinstance(child, Slot):
+                idx += 1
+                continue
+            modified_components = self._realize_slot(slot_realizers, random, language, child)
+            if modified_components != [child]:
+                any_modified = True
+            this.children[idx : idx + 1] = modified_components
+            idx += len(modified_components)
+        return any_modified
+
+    @staticmethod
+    def _realize_slot(
+        slot_realizers: List[SlotRealizerComponent], random: Generator, language: str, slot: Slot
+    ) -> List[TemplateComponent]:
+        for slot_realizer in slot_realizers:
+            if language in slot_realizer.supported_languages() or "ANY" in slot_realizer.supported_languages():
+                success, components = slot_realizer.realize(slot, random)
+                if success:
+                    return components
+        return [slot]
+
+
+def build_plan(seed: int, message_count: int) -> Tuple[Registry, DocumentPlanNode]:
+    """
+    A document plan of messages with random slots, and regex realizers whose output is realized further by the other
+    realizers.
+    """
+    rng = pyrandom.Random(seed)
+    registry = Registry()
+    registry.register(
+        "slot-realizers",
+        [
+            RegexRealizer(registry, "en", r"(\d+) apples", 1, ["{0} fruit X{0}", "many X{0} things", "{0} {0}"]),
+            RegexRealizer(registry, ["fi"], r"(\d+) apples", 1, ["FI {0}"]),
+            RegexRealizer(
+                registry,
+                "en",
+                r"X(\d+)",
+                1,
+                ["Y{0} z", "w{0}"],
+                attach_attributes_to=[0],
+                add_attributes={1: {"case": "genitive"}},
+            ),
+            RegexRealizer(registry, "en", r"Y(\d+)", 1, ["{0}"], group_requirements=lambda group: int(group) % 2 == 0),
+        ],
+    )
+
+    messages = []
+    for _ in range(message_count):
+        components: List[TemplateComponent] = []
+        for idx in range(rng.randint(1, 6)):
+            kind = rng.random()
+            if kind < 0.3:
+                components.append(Literal("literal{}".format(idx)))
+            elif kind < 0.6:
+                components.append(LiteralSlot("{} apples".format(rng.randint(0, 9)), {"case": "inessive"}))
+            elif kind < 0.8:
+                value = rng.choice([1.0, 2.5, 0.0031, 7, "text"])
+                components.append(Slot(FactFieldSource("value"), fact=Fact(value, "test", 0)))
+            else:
+                components.append(LiteralSlot("X{}".format(rng.randint(0, 9))))
+        message = Message(Fact(1, "test", 0))
+        message.template = Template(components)
+        messages.append(message)
+    middle = message_count // 2
+    return registry, DocumentPlanNode([DocumentPlanNode(messages[:middle]), DocumentPlanNode(messages[middle:])])
+
+
+def render(document_plan: DocumentPlanNode) -> List[str]:
+    output = []
+    for node in document_plan.children:
+        for message in node.children:
+            output.append(
+                " ".join(
+                    "{}{}".format(component.value, sorted(getattr(component, "attributes", {}).items()))
+                    for component in message.children
+                )
+            )
+    return output
+
+
+@pytest.mark.parametrize("language", ["en", "en-GB", "fi"])
+@pytest.mark.parametrize("seed", range(25))
+def test_identical_to_cascading_realization(seed, language):
+    outputs = []
+    for slot_realizer in (CascadingSlotRealizer(), SlotRealizer()):
+        registry, document_plan = build_plan(seed, 30)
+        random = np.random.default_rng(seed)
+        slot_realizer.run(registry, random, language, document_plan)
+        # Also compare the state of the PRNG, as later pipeline components draw from it too
+        outputs.append((render(document_plan), random.random()))
+    assert outputs[0] == outputs[1]
@@ -0,0 +1,77 @@
+import shutil
+from pathlib import Path
+from unittest import mock
+
+from comment_reporter import comment_report_nlg_service
+from comment_reporter import config as config_module
+from comment_reporter.comment_report_nlg_service import CommentReportNlgService
+from comment_reporter.core import models, template_cache
+from comment_reporter.core.template_reader import read_templates
+
+from .mocks import mocked_analyzers
+
+SOURCES = [
+    """
+en: There were {value} comments [today] in total.
+| value_type = stats:count
+""",
+    """
+en: The mean sentiment was {value}.
+| value_type = sentiment:mean
+""",
+]
+
+
+def displayed(templates):
+    return {language: [template.display_template() for template in ts] for (language, ts) in templates.items()}
+
+
+def test_resolve_path():
+    assert config_module.resolve_path("cache/templates.pickle") == config_module.ROOT_PATH / "cache/templates.pickle"
+    assert config_module.resolve_path("/tmp/templates.pickle") == Path("/tmp/templates.pickle")
+
+
+def test_save_and_load(tmp_path):
+    path = tmp_path / "cache" / "templates.pickle"
+    key = template_cache.cache_key(SOURCES)
+    templates = read_templates("".join(SOURCES))[0]
+
+    assert template_cache.load(path, key) is None
+    template_cache.save(path, key, templates)
+    loaded = template_cache.load(path, key)
+    assert displayed(loaded) == displayed(templates)
+    assert [template.variant_count for template in loaded["en"]] == [2, 1]
+    # A cache written for other sources is skipped
+    assert template_cache.load(path, template_cache.cache_key(SOURCES[:1])) is None
+
+
+def test_key_changes_with_sources_and_code(tmp_path):
+    key = template_cache.cache_key(SOURCES)
+    assert template_cache.cache_key(SOURCES) == key
+    assert template_cache.cache_key([SOURCES[0], SOURCES[1].replace("mean", "median")]) != key
+    # Moving text from one source to another changes the key too
+    assert template_cache.cache_key([SOURCES[0] + SOURCES[1], ""]) != key
+
+    changed_models = tmp_path / "models.py"
+    shutil.copy(models.__file__, str(changed_models))
+    with changed_models.open("a") as models_file:
+        models_file.write("\n# changed\n")
+    with mock.patch.object(models, "__file__", str(changed_models)):
+        assert template_cache.cache_key(SOURCES) != key
+
+
+def test_service_uses_cache_relative_to_root(tmp_path, monkeypatch):
+    # The cache is found wherever the service is started from
+    monkeypatch.chdir(tmp_path)
+    root = tmp_path / "root"
+    with mock.patch.object(config_module, "ROOT_PATH", root), mocked_analyzers(
+        config_overrides={"TEMPLATES__CACHE_PATH": "cache/templates.pickle"}
+    ):
+        parsed = CommentReportNlgService(random_seed=1).registry.get("templates")
+        assert (root / "cache" / "templates.pickle").exists()
+        assert not (tmp_path / "cache").exists()
+
+        with mock.patch.object(comment_report_nlg_service, "read_templates") as read:
+            cached = CommentReportNlgService(random_seed=1).registry.get("templates")
+        read.assert_not_called()
+        assert displayed(cached) == displayed(parsed)
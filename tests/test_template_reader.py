@@ -0,0 +1,55 @@
+from typing import List, Tuple
+
+import pytest
+
+from comment_reporter.core.models import Choice, Template
+from comment_reporter.core.template_reader import expand_alternatives, parse_template_text, read_templates
+
+RULES = """
+| value_type = stats:count
+| value_type = sentiment:mean
+"""
+
+
+def eager_expansion(template_line: str, template: Template) -> List[Tuple[str, List[List[int]]]]:
+    # What read_template_group did before optional parts were kept as Choices: a template per alternative
+    rules = [matchers for (matchers, _) in template.rules]
+    expanded = []
+    for alternative in expand_alternatives(template_line):
+        components, rule_to_slot = parse_template_text(alternative, rules)
+        expanded.append((Template(components).display_template(), rule_to_slot))
+    return expanded
+
+
+def resolved_versions(template: Template) -> List[Tuple[str, List[List[int]]]]:
+    versions = []
+    for variant in range(template.variant_count):
+        resolved = template.resolve(variant)
+        assert not any(isinstance(component, Choice) for component in resolved.components)
+        versions.append((resolved.display_template(), [slot_indices for (_, slot_indices) in resolved.rules]))
+    return versions
+
+
+@pytest.mark.parametrize(
+    "template_line",
+    [
+        "There were [many] comments.",
+        "[Overall,] there were {value} [relevant] comments [in total] today.",
+        "There were {value} comments [with a mean sentiment of {2.value}] [, {value, case=genitive} of them] today.",
+        "[{value}] [{2.value}] [{value} and {2.value}]",
+        "[The count was {value}.]",
+    ],
+)
+def test_choices_resolve_to_eager_expansion(template_line):
+    templates = read_templates("en: {}{}".format(template_line, RULES))[0]["en"]
+    assert len(templates) == 1
+    (template,) = templates
+    assert template.variant_count == 2 ** template_line.count("[")
+    assert resolved_versions(template) == eager_expansion(template_line, template)
+
+
+def test_optional_part_within_a_word_is_expanded_eagerly():
+    template_line = "There were {value}[,] and [a mean of ]{2.value}."
+    templates = read_templates("en: {}{}".format(template_line, RULES))[0]["en"]
+    assert [template.variant_count for template in templates] == [1, 1, 1, 1]
+    assert [resolved_versions(template)[0] for template in templates] == eager_expansion(template_line, templates[0])
@@ -0,0 +1,68 @@
+from typing import List
+
+import pytest
+
+from comment_reporter.comment_report_nlg_service import CommentReportNlgService
+from comment_reporter.core.models import Fact, Message, Template
+from comment_reporter.core.template_reader import read_templates
+from comment_reporter.core.template_selector import TemplateIndex, TemplateMessageChecker
+
+from .mocks import mocked_analyzers, synthetic_comments
+
+TEMPLATES = """
+${sentiments}: sentiment:mean, sentiment:median
+
+en: Exactly {value}.
+| value_type = stats:count
+
+en: In a group, {value}.
+| value_type in {sentiments}
+
+en: By regex, {value}.
+| value_type = stats:.*
+
+en: Anything large, {value}.
+| value > 100
+
+en: Count {value} and mean {value, fact=2}.
+| value_type = stats:count
+| value_type = sentiment:mean
+"""
+
+
+def full_scan(templates: List[Template], message: Message, all_messages: List[Message]) -> List[Template]:
+    # What TemplateMessageChecker did before the templates were indexed
+    return [template for template in templates if template.check(message, all_messages)]
+
+
+def assert_same_as_full_scan(templates: List[Template], messages: List[Message]) -> None:
+    checker = TemplateMessageChecker(TemplateIndex(templates), messages)
+    for message in messages:
+        assert list(checker.all_templates_for_message(message)) == full_scan(templates, message, messages), message
+
+
+def test_candidates_cover_all_constraint_types():
+    templates = read_templates(TEMPLATES)[0]["en"]
+    messages = [
+        Message(Fact(value, value_type, 0.5))
+        for value_type in ["stats:count", "stats:other", "sentiment:mean", "sentiment:median", "unknown", 7]
+        for value in [1, 1000]
+    ]
+    assert_same_as_full_scan(templates, messages)
+    # Only the templates without a fixed value_type are candidates for other value_types
+    assert len(TemplateIndex(templates).candidates("unknown")) == 2
+
+
+@pytest.mark.parametrize("comment_language", [None, "hr"])
+def test_candidates_of_bundled_templates(comment_language):
+    with mocked_analyzers():
+        service = CommentReportNlgService(random_seed=1)
+        for seed in range(5):
+            (messages,) = service._analysis_pipeline.run(
+                (synthetic_comments(40, seed=seed), comment_language or "all"),
+                "en",
+                prng_seed=seed,
+                registry=service.registry.child(),
+            )
+            assert messages
+            assert_same_as_full_scan(service.registry.get("templates")["en"], messages)